@@ -0,0 +1,311 @@
+# backend/cache.py
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from prometheus_client import Counter
+
+from .config import (
+    CACHE_BACKEND, CACHE_DEFAULT_TTL, CACHE_MEMORY_MAX_ENTRIES, CACHE_REDIS_URL, CACHE_SQLITE_PATH,
+)
+
+try:
+    import redis
+except ImportError:  # opcional: sólo si CACHE_BACKEND=redis
+    redis = None
+
+"""
+Caché compartida del backend (respuestas de API, PSI, catálogo de issues).
+
+Dos niveles:
+- local: LRU + TTL en memoria del proceso (MemoryCache), sin coste de red;
+- compartido (opcional, CACHE_BACKEND): SQLite en disco local (SQLiteCache)
+  o cualquier servidor con protocolo Redis (RedisCache), para que varios
+  workers de uvicorn vean las mismas entradas en lugar de duplicarlas.
+
+TieredCache.get_or_load() añade single-flight: si varios hilos fallan a la vez
+en la misma clave, sólo uno ejecuta el loader y el resto espera su resultado.
+SingleFlight también se usa sin caché (crawls en curso, lecturas no cacheables).
+
+Los valores son bytes (quien cachea decide la codificación: orjson, msgpack...).
+Aciertos y fallos por espacio de nombres y nivel en seo_cache_requests_total.
+"""
+
+CACHE_REQUESTS = Counter(
+    "seo_cache_requests_total", "Consultas a la caché por resultado",
+    ["namespace", "tier", "result"],
+)
+CACHE_LOADS = Counter(
+    "seo_cache_loads_total", "Cargas tras un fallo de caché (coalesced = esperó a otra carga)",
+    ["namespace", "mode"],
+)
+
+
+# -------------------------------------------------------------------
+# NIVELES
+# -------------------------------------------------------------------
+
+class MemoryCache:
+    """
+    LRU con TTL por entrada, seguro entre hilos.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = CACHE_MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + ttl if ttl else 0.0
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache:
+    """
+    Nivel compartido entre procesos de la misma máquina (fichero SQLite en WAL).
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = CACHE_SQLITE_PATH):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at and expires_at < time.time():
+            self.delete(key)
+            return None
+        return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl else 0.0
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at),
+        )
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM cache")
+
+
+class RedisCache:
+    """
+    Nivel compartido sobre cualquier servidor con protocolo Redis.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = CACHE_REDIS_URL, prefix: str = "seo:"):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requiere el paquete 'redis' (pip install redis)")
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self._client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(f"{self.prefix}*"):
+            self._client.delete(key)
+
+
+# -------------------------------------------------------------------
+# CACHÉ EN DOS NIVELES + SINGLE-FLIGHT
+# -------------------------------------------------------------------
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Fusiona llamadas concurrentes con la misma clave dentro del proceso:
+    la primera (líder) ejecuta fn y las demás esperan y reciben su resultado
+    o su excepción. No guarda nada cuando termina.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Devuelve (valor, líder); líder=False si se reutilizó otra llamada en curso.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, False
+
+        try:
+            flight.value = fn()
+            return flight.value, True
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def wait(self, key: str, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que termine la llamada en curso con esa clave, si la hay.
+        Devuelve False si no había ninguna en este proceso.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+        if flight is None:
+            return False
+        return flight.done.wait(timeout)
+
+
+class TieredCache:
+    def __init__(self, local: MemoryCache, shared=None, default_ttl: float = CACHE_DEFAULT_TTL):
+        self.local = local
+        self.shared = shared
+        self.default_ttl = default_ttl
+        self._flights = SingleFlight()
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        full_key = f"{namespace}:{key}"
+        value = self.local.get(full_key)
+        if value is not None:
+            CACHE_REQUESTS.labels(namespace, self.local.name, "hit").inc()
+            return value
+        CACHE_REQUESTS.labels(namespace, self.local.name, "miss").inc()
+        if self.shared is None:
+            return None
+
+        value = self.shared.get(full_key)
+        CACHE_REQUESTS.labels(namespace, self.shared.name, "hit" if value is not None else "miss").inc()
+        if value is not None:
+            # Se promociona al nivel local con un TTL corto: el compartido manda.
+            self.local.set(full_key, value, self.default_ttl)
+        return value
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        full_key = f"{namespace}:{key}"
+        ttl = self.default_ttl if ttl is None else ttl
+        self.local.set(full_key, value, ttl)
+        if self.shared is not None:
+            self.shared.set(full_key, value, ttl)
+
+    def delete(self, namespace: str, key: str) -> None:
+        full_key = f"{namespace}:{key}"
+        self.local.delete(full_key)
+        if self.shared is not None:
+            self.shared.delete(full_key)
+
+    def get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], bytes],
+        ttl: Optional[float] = None,
+    ) -> bytes:
+        """
+        Devuelve el valor cacheado o lo carga con `loader`. Las cargas
+        concurrentes de la misma clave en este proceso se fusionan en una.
+        ttl <= 0 desactiva la caché para esa llamada.
+        """
+        if ttl is not None and ttl <= 0:
+            return loader()
+
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+
+        def load() -> bytes:
+            loaded = loader()
+            self.set(namespace, key, loaded, ttl)
+            return loaded
+
+        value, leader = self._flights.do(f"{namespace}:{key}", load)
+        CACHE_LOADS.labels(namespace, "loaded" if leader else "coalesced").inc()
+        return value
+
+
+def _build_shared():
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCache(CACHE_SQLITE_PATH)
+    if CACHE_BACKEND == "redis":
+        return RedisCache(CACHE_REDIS_URL)
+    if CACHE_BACKEND not in ("", "memory"):
+        raise RuntimeError(f"CACHE_BACKEND desconocido: {CACHE_BACKEND}")
+    return None
+
+
+cache = TieredCache(MemoryCache(CACHE_MEMORY_MAX_ENTRIES), _build_shared())
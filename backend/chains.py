@@ -0,0 +1,84 @@
+# backend/chains.py
+from typing import Dict, Hashable, List, NamedTuple, Optional
+
+"""
+Resolución en memoria de cadenas de redirección y de canonicalización.
+
+Se construye una vez por crawl un mapa URL -> siguiente URL (Location de una
+redirección o canonical que apunta a otra URL) y se resuelven todas las cadenas
+en tiempo lineal: cada nodo se visita una sola vez gracias a la memoización
+(compresión de caminos) y los ciclos se detectan con la pila del recorrido.
+Ninguna consulta a la BD por URL.
+"""
+
+# Nº máximo de URLs que se guardan en `details` al describir una cadena.
+MAX_CHAIN_IN_DETAILS = 10
+
+
+class Resolution(NamedTuple):
+    final: Optional[Hashable]  # destino final (None si la cadena acaba en bucle)
+    hops: int                  # saltos hasta el destino final (o tamaño del bucle)
+    loop: bool                 # la cadena entra en un bucle
+
+
+class ChainResolver:
+    def __init__(self, targets: Dict[Hashable, Hashable]):
+        # Los autoenlaces (canonical a sí misma) no son un salto.
+        self.targets = {k: v for k, v in targets.items() if v is not None and v != k}
+        self._state: Dict[Hashable, Resolution] = {}
+        self._resolve_all()
+
+    def _resolve_all(self) -> None:
+        state = self._state
+        for start in self.targets:
+            if start in state:
+                continue
+
+            stack: List[Hashable] = []
+            on_stack: Dict[Hashable, int] = {}
+            node = start
+            while True:
+                if node in state:
+                    base = state[node]
+                    break
+                if node in on_stack:
+                    # Ciclo: todos sus miembros quedan marcados como bucle.
+                    idx = on_stack[node]
+                    cycle = stack[idx:]
+                    for member in cycle:
+                        state[member] = Resolution(None, len(cycle), True)
+                    del stack[idx:]
+                    base = state[node]
+                    break
+                nxt = self.targets.get(node)
+                if nxt is None:
+                    base = state[node] = Resolution(node, 0, False)
+                    break
+                on_stack[node] = len(stack)
+                stack.append(node)
+                node = nxt
+
+            # Propagación hacia atrás: cada nodo queda a un salto más que el siguiente.
+            for member in reversed(stack):
+                base = Resolution(base.final, base.hops + 1, base.loop)
+                state[member] = base
+
+    def resolve(self, node: Hashable) -> Resolution:
+        return self._state.get(node, Resolution(node, 0, False))
+
+    def chain(self, node: Hashable, limit: int = MAX_CHAIN_IN_DETAILS) -> List[Hashable]:
+        """
+        Camino explícito desde `node` (incluido), cortado en `limit` elementos o
+        al volver a un nodo ya visitado.
+        """
+        path = [node]
+        seen = {node}
+        while len(path) < limit:
+            nxt = self.targets.get(path[-1])
+            if nxt is None:
+                break
+            path.append(nxt)
+            if nxt in seen:
+                break
+            seen.add(nxt)
+        return path
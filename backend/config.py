@@ -20,8 +20,78 @@ DATAFORSEO_TASK_GET_ENDPOINT = os.getenv(
     "DATAFORSEO_TASK_GET_ENDPOINT",
     "https://api.dataforseo.com/v3/on_page/tasks_ready"
 )
+DATAFORSEO_LINKS_ENDPOINT = os.getenv(
+    "DATAFORSEO_LINKS_ENDPOINT",
+    "https://api.dataforseo.com/v3/on_page/links"
+)
 
 PAGESPEED_API_KEY = os.getenv("PAGESPEED_API_KEY")
-PAGESPEED_ENDPOINT = "https://www.googleapis.com/pagespeedonline/v5/runPagespeed"
+PAGESPEED_ENDPOINT = os.getenv(
+    "PAGESPEED_ENDPOINT",
+    "https://www.googleapis.com/pagespeedonline/v5/runPagespeed"
+)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./seo_auditor.db")
+
+# Configuración de crawl por proyecto (crawl_config.py): valores por defecto y
+# modelo de coste / duración para la estimación previa a cada crawl.
+CRAWL_MAX_PAGES_DEFAULT = int(os.getenv("CRAWL_MAX_PAGES_DEFAULT", "500"))
+# Precio por página de DataForSEO On-Page (USD): base y suplementos por opción.
+# Valores de lista orientativos: ajústalos a tu contrato.
+DATAFORSEO_COST_PER_PAGE = float(os.getenv("DATAFORSEO_COST_PER_PAGE", "0.000125"))
+DATAFORSEO_COST_PER_PAGE_RESOURCES = float(os.getenv("DATAFORSEO_COST_PER_PAGE_RESOURCES", "0.000375"))
+DATAFORSEO_COST_PER_PAGE_JS = float(os.getenv("DATAFORSEO_COST_PER_PAGE_JS", "0.00125"))
+# Duración sin histórico del proyecto: segundos por página (x factor con JS) y por llamada PSI
+CRAWL_SECONDS_PER_PAGE = float(os.getenv("CRAWL_SECONDS_PER_PAGE", "0.2"))
+CRAWL_JS_DURATION_FACTOR = float(os.getenv("CRAWL_JS_DURATION_FACTOR", "4"))
+PSI_SECONDS_PER_CALL = float(os.getenv("PSI_SECONDS_PER_CALL", "15"))
+
+# Muestreo de PageSpeed por plantilla: nº de URLs representativas que se miden
+# por cada grupo de URLs con la misma plantilla. 0 = medir todas las URLs.
+PSI_SAMPLES_PER_TEMPLATE = int(os.getenv("PSI_SAMPLES_PER_TEMPLATE", "3"))
+
+# Grafo de enlaces internos (link_graph.py): directorio de los ficheros .npz por crawl
+LINK_GRAPH_DIR = os.getenv("LINK_GRAPH_DIR", "./link_graphs")
+CRAWL_DEPTH_MAX = int(os.getenv("CRAWL_DEPTH_MAX", "4"))
+TOO_MANY_LINKS_MAX = int(os.getenv("TOO_MANY_LINKS_MAX", "300"))
+# Reglas de texto de URL (url_rules.py)
+URL_MAX_LENGTH = int(os.getenv("URL_MAX_LENGTH", "115"))
+URL_MAX_PARAMS = int(os.getenv("URL_MAX_PARAMS", "3"))
+# A partir de RULES_PARALLEL_MIN_URLS URLs, las reglas de texto se reparten en
+# RULES_WORKERS procesos (0 = nº de CPUs)
+RULES_WORKERS = int(os.getenv("RULES_WORKERS", "0"))
+RULES_PARALLEL_MIN_URLS = int(os.getenv("RULES_PARALLEL_MIN_URLS", "50000"))
+# Análisis de sitemaps / robots.txt (sitemap.py): informe comprimido por crawl
+SITEMAPS_DIR = os.getenv("SITEMAPS_DIR", "./sitemaps")
+# Trazas por crawl (tracing.py) y perfiles cProfile de los crawls con ?profile=1
+TRACES_DIR = os.getenv("TRACES_DIR", "./traces")
+PROFILES_DIR = os.getenv("PROFILES_DIR", "./profiles")
+# Un crawl "running" más antiguo que esto se da por muerto (proceso caído) y deja
+# de bloquear nuevos crawls del proyecto
+CRAWL_STALE_AFTER_MINUTES = int(os.getenv("CRAWL_STALE_AFTER_MINUTES", "360"))
+# Stream de eventos de un crawl (events.py): latido para proxies y sondeo del
+# estado cuando el crawl no corre en este proceso
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_POLL_SECONDS = float(os.getenv("SSE_POLL_SECONDS", "5"))
+# Caché (cache.py): LRU en memoria por proceso + nivel compartido opcional
+# CACHE_BACKEND = memory (sólo local) | sqlite (fichero compartido) | redis
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_MEMORY_MAX_ENTRIES = int(os.getenv("CACHE_MEMORY_MAX_ENTRIES", "1024"))
+CACHE_DEFAULT_TTL = float(os.getenv("CACHE_DEFAULT_TTL", "300"))
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", "./cache/cache.db")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+# TTL (s) de las respuestas PSI por URL/estrategia y de las de crawls terminados; 0 = sin caché
+PSI_CACHE_TTL = float(os.getenv("PSI_CACHE_TTL", "86400"))
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", "3600"))
+# Retención de datos de crawl (retention.py). Por proyecto se conservan con
+# detalle (urls / issues) los RETENTION_FULL_CRAWLS últimos crawls terminados y
+# los de los últimos RETENTION_FULL_DAYS días; los anteriores se compactan a sus
+# rollups. Se puede cambiar por proyecto en la configuración de crawl.
+RETENTION_FULL_CRAWLS = int(os.getenv("RETENTION_FULL_CRAWLS", "4"))
+RETENTION_FULL_DAYS = int(os.getenv("RETENTION_FULL_DAYS", "30"))
+# Cada cuántas horas corre el job de mantenimiento en segundo plano (0 = desactivado)
+MAINTENANCE_INTERVAL_HOURS = float(os.getenv("MAINTENANCE_INTERVAL_HOURS", "24"))
+# Sólo Postgres: urls e issues particionadas por rangos de crawl_id al crear las
+# tablas (DB_PARTITIONING=1), con PARTITION_CRAWLS crawls por partición
+DB_PARTITIONING = os.getenv("DB_PARTITIONING", "0") == "1"
+PARTITION_CRAWLS = int(os.getenv("PARTITION_CRAWLS", "100"))
@@ -0,0 +1,250 @@
+# backend/crawl_config.py
+import json
+import math
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import (
+    CRAWL_JS_DURATION_FACTOR, CRAWL_MAX_PAGES_DEFAULT, CRAWL_SECONDS_PER_PAGE,
+    DATAFORSEO_COST_PER_PAGE, DATAFORSEO_COST_PER_PAGE_JS, DATAFORSEO_COST_PER_PAGE_RESOURCES,
+    PSI_SAMPLES_PER_TEMPLATE, PSI_SECONDS_PER_CALL, RETENTION_FULL_CRAWLS, RETENTION_FULL_DAYS,
+)
+from .issues_logic import SQL_RULES
+from .rule_dsl import effective_thresholds, validate_thresholds
+
+"""
+Configuración de crawl por proyecto y estimación de coste / duración.
+
+Cada proyecto puede fijar (tabla crawl_configs, PATCH /projects/{id}/crawl-config):
+- max_pages: presupuesto de páginas de DataForSEO;
+- enable_javascript / load_resources: las opciones más caras de On-Page
+  (el renderizado JS multiplica precio y duración; por defecto va apagado);
+- psi_samples_per_template: URLs medidas por plantilla (0 = todas);
+- psi_strategies: mobile y/o desktop;
+- include_patterns / exclude_patterns: globs sobre la ruta ("/blog/*").
+  DataForSEO rastrea igualmente esas páginas (cuentan en el presupuesto),
+  pero las excluidas no se guardan, no se miden con PSI ni generan issues.
+- rule_thresholds: umbrales de las reglas con "condition" del catálogo
+  (issues_logic.SQL_RULES), p.ej. {"TITLE_TOO_LONG": {"max_length": 70}}.
+- retention_full_crawls / retention_full_days: qué crawls conservan sus urls
+  e issues; los demás se compactan a sus rollups (retention.py).
+
+Antes de lanzar un crawl se estima su coste (precio por página de config.py) y
+su duración: con el histórico del proyecto (segundos por URL del último crawl
+terminado con el mismo modo JS y nº de plantillas) o, si no lo hay, con los
+valores por defecto de config.py.
+"""
+
+PSI_STRATEGIES = ("mobile", "desktop")
+
+# Plantillas supuestas por página cuando el proyecto no tiene crawls previos
+_ASSUMED_URLS_PER_TEMPLATE = 50
+# Crawls terminados que se miran para el histórico
+_HISTORY_CRAWLS = 10
+
+
+# -------------------------------------------------------------------
+# CONFIGURACIÓN
+# -------------------------------------------------------------------
+
+def default_config(project_id: int) -> models.CrawlConfig:
+    return models.CrawlConfig(
+        project_id=project_id,
+        max_pages=CRAWL_MAX_PAGES_DEFAULT,
+        enable_javascript=False,
+        load_resources=True,
+        psi_samples_per_template=None,
+        psi_strategies="mobile",
+    )
+
+
+def get_crawl_config(db: Session, project_id: int) -> models.CrawlConfig:
+    """
+    Configuración guardada o, si no hay, la de por defecto (sin añadir a la sesión).
+    """
+    return db.query(models.CrawlConfig).filter_by(project_id=project_id).first() or default_config(project_id)
+
+
+def update_crawl_config(db: Session, project_id: int, changes: Dict[str, Any]) -> models.CrawlConfig:
+    """
+    Aplica los campos presentes en `changes` (ValueError si alguno no es válido).
+    """
+    config = db.query(models.CrawlConfig).filter_by(project_id=project_id).first()
+    if config is None:
+        config = default_config(project_id)
+        db.add(config)
+
+    if changes.get("max_pages") is not None:
+        if changes["max_pages"] < 1:
+            raise ValueError("max_pages must be >= 1")
+        config.max_pages = changes["max_pages"]
+    for flag in ("enable_javascript", "load_resources"):
+        if changes.get(flag) is not None:
+            setattr(config, flag, changes[flag])
+    if "psi_samples_per_template" in changes:
+        samples = changes["psi_samples_per_template"]
+        if samples is not None and samples < 0:
+            raise ValueError("psi_samples_per_template must be >= 0")
+        config.psi_samples_per_template = samples
+    if changes.get("psi_strategies") is not None:
+        strategies = [s for s in PSI_STRATEGIES if s in changes["psi_strategies"]]
+        if not strategies or len(strategies) != len(set(changes["psi_strategies"])):
+            raise ValueError(f"psi_strategies must be a non-empty subset of {PSI_STRATEGIES}")
+        config.psi_strategies = ",".join(strategies)
+    for field in ("include_patterns", "exclude_patterns"):
+        if changes.get(field) is not None:
+            patterns = [p.strip() for p in changes[field] if p and p.strip()]
+            setattr(config, field, json.dumps(patterns) if patterns else None)
+    if changes.get("retention_full_crawls") is not None:
+        if changes["retention_full_crawls"] < 1:
+            raise ValueError("retention_full_crawls must be >= 1")
+        config.retention_full_crawls = changes["retention_full_crawls"]
+    if changes.get("retention_full_days") is not None:
+        if changes["retention_full_days"] < 0:
+            raise ValueError("retention_full_days must be >= 0")
+        config.retention_full_days = changes["retention_full_days"]
+    if changes.get("rule_thresholds") is not None:
+        validate_thresholds(SQL_RULES, changes["rule_thresholds"])
+        # Se fusiona con lo guardado; un valor null vuelve al valor por defecto
+        thresholds = _overrides_of(config)
+        for code, values in changes["rule_thresholds"].items():
+            merged = {**thresholds.get(code, {}), **values}
+            thresholds[code] = {k: v for k, v in merged.items() if v is not None}
+        thresholds = {code: values for code, values in thresholds.items() if values}
+        config.rule_thresholds = json.dumps(thresholds) if thresholds else None
+
+    db.commit()
+    db.refresh(config)
+    return config
+
+
+def config_to_dict(config: models.CrawlConfig) -> Dict[str, Any]:
+    """
+    Forma de schemas.CrawlConfigOut (y la copia que se guarda en Crawl.config).
+    """
+    return {
+        "max_pages": config.max_pages,
+        "enable_javascript": bool(config.enable_javascript),
+        "load_resources": bool(config.load_resources),
+        "psi_samples_per_template": config.psi_samples_per_template,
+        "psi_strategies": strategies_of(config),
+        "include_patterns": json.loads(config.include_patterns) if config.include_patterns else [],
+        "exclude_patterns": json.loads(config.exclude_patterns) if config.exclude_patterns else [],
+        "rule_thresholds": effective_thresholds(SQL_RULES, _overrides_of(config)),
+        "retention_full_crawls": RETENTION_FULL_CRAWLS if config.retention_full_crawls is None
+        else config.retention_full_crawls,
+        "retention_full_days": RETENTION_FULL_DAYS if config.retention_full_days is None
+        else config.retention_full_days,
+    }
+
+
+def _overrides_of(config: models.CrawlConfig) -> Dict[str, Dict[str, float]]:
+    return json.loads(config.rule_thresholds) if config.rule_thresholds else {}
+
+
+def strategies_of(config: models.CrawlConfig) -> List[str]:
+    return [s for s in (config.psi_strategies or "mobile").split(",") if s]
+
+
+def psi_samples_of(config: models.CrawlConfig) -> int:
+    samples = config.psi_samples_per_template
+    return PSI_SAMPLES_PER_TEMPLATE if samples is None else samples
+
+
+def url_filter(config: models.CrawlConfig) -> Optional[Callable[[str], bool]]:
+    """
+    Predicado url -> se guarda, o None si la configuración no filtra nada.
+    """
+    include = json.loads(config.include_patterns) if config.include_patterns else []
+    exclude = json.loads(config.exclude_patterns) if config.exclude_patterns else []
+    if not include and not exclude:
+        return None
+
+    def keep(url: str) -> bool:
+        path = urlsplit(url).path or "/"
+        if include and not any(fnmatchcase(path, p) for p in include):
+            return False
+        return not any(fnmatchcase(path, p) for p in exclude)
+
+    return keep
+
+
+# -------------------------------------------------------------------
+# ESTIMACIÓN DE COSTE Y DURACIÓN
+# -------------------------------------------------------------------
+
+def _history(db: Session, project_id: int, enable_javascript: bool) -> Optional[Dict[str, float]]:
+    """
+    Segundos por URL y URLs por plantilla del último crawl terminado con el mismo
+    modo JS. Los crawls compactados (retention.py) ya no tienen filas Url de las
+    que contar plantillas y se saltan.
+    """
+    crawls = (
+        db.query(models.Crawl)
+        .filter(
+            models.Crawl.project_id == project_id,
+            models.Crawl.status == "finished",
+            models.Crawl.url_count > 0,
+            models.Crawl.compacted_at.is_(None),
+        )
+        .order_by(models.Crawl.finished_at.desc())
+        .limit(_HISTORY_CRAWLS)
+        .all()
+    )
+    for crawl in crawls:
+        # Crawls anteriores a la configuración por proyecto: siempre con JS
+        used_js = json.loads(crawl.config).get("enable_javascript", True) if crawl.config else True
+        if used_js != enable_javascript or not crawl.started_at or not crawl.finished_at:
+            continue
+        templates = (
+            db.query(func.count(func.distinct(models.Url.template_key)))
+            .filter(models.Url.crawl_id == crawl.id)
+            .scalar()
+        ) or 1
+        return {
+            "crawl_id": crawl.id,
+            "seconds_per_url": (crawl.finished_at - crawl.started_at).total_seconds() / crawl.url_count,
+            "urls_per_template": crawl.url_count / templates,
+        }
+    return None
+
+
+def estimate_crawl(db: Session, project_id: int, config: models.CrawlConfig) -> Dict[str, Any]:
+    """
+    Coste (USD) y duración (s) esperados con esta configuración. Forma de
+    schemas.CrawlEstimate.
+    """
+    pages = config.max_pages
+    strategies = strategies_of(config)
+    samples = psi_samples_of(config)
+    history = _history(db, project_id, bool(config.enable_javascript))
+
+    urls_per_template = history["urls_per_template"] if history else _ASSUMED_URLS_PER_TEMPLATE
+    templates = max(1, math.ceil(pages / urls_per_template))
+    measured = pages if samples <= 0 else min(pages, templates * samples)
+    psi_calls = measured * len(strategies)
+
+    per_page = DATAFORSEO_COST_PER_PAGE
+    if config.load_resources:
+        per_page += DATAFORSEO_COST_PER_PAGE_RESOURCES
+    if config.enable_javascript:
+        per_page += DATAFORSEO_COST_PER_PAGE_JS
+
+    if history:
+        duration = history["seconds_per_url"] * pages
+    else:
+        factor = CRAWL_JS_DURATION_FACTOR if config.enable_javascript else 1.0
+        duration = pages * CRAWL_SECONDS_PER_PAGE * factor + psi_calls * PSI_SECONDS_PER_CALL
+
+    return {
+        "pages": pages,
+        "psi_calls": psi_calls,
+        "cost_usd": round(pages * per_page, 4),  # PSI no tiene coste, sólo cuota
+        "duration_s": round(duration, 1),
+        "basis": f"crawl {history['crawl_id']}" if history else "defaults",
+    }
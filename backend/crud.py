@@ -1,11 +1,14 @@
 # backend/crud.py
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from . import models, schemas
+from .url_norm import normalize_domain
 
 
 def create_project(db: Session, data: schemas.ProjectCreate) -> models.Project:
-    proj = models.Project(name=data.name, domain=data.domain)
+    proj = models.Project(name=data.name, domain=normalize_domain(data.domain))
     db.add(proj)
     db.commit()
     db.refresh(proj)
@@ -27,3 +30,51 @@ def get_last_crawl_for_project(db: Session, project_id: int) -> Optional[models.
         .order_by(models.Crawl.started_at.desc())
         .first()
     )
+
+
+def get_crawl(db: Session, crawl_id: int) -> Optional[models.Crawl]:
+    return db.query(models.Crawl).filter_by(id=crawl_id).first()
+
+
+def get_crawl_by_idempotency_key(db: Session, project_id: int, key: str) -> Optional[models.Crawl]:
+    """
+    Crawl creado con esa Idempotency-Key o al que se unió una petición con ella.
+    """
+    crawl = db.query(models.Crawl).filter_by(project_id=project_id, idempotency_key=key).first()
+    if crawl is None:
+        crawl = (
+            db.query(models.Crawl)
+            .join(models.CrawlIdempotencyKey, models.CrawlIdempotencyKey.crawl_id == models.Crawl.id)
+            .filter(
+                models.CrawlIdempotencyKey.project_id == project_id,
+                models.CrawlIdempotencyKey.idempotency_key == key,
+            )
+            .first()
+        )
+    return crawl
+
+
+def add_crawl_idempotency_key(db: Session, crawl: models.Crawl, key: str) -> None:
+    """
+    Asocia la Idempotency-Key de una petición que se unió a `crawl`. Si otra
+    petición con la misma clave la registró a la vez, gana la primera.
+    """
+    db.add(models.CrawlIdempotencyKey(project_id=crawl.project_id, crawl_id=crawl.id, idempotency_key=key))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+
+def get_running_crawl(db: Session, project_id: int, stale_after: timedelta) -> Optional[models.Crawl]:
+    """
+    Crawl en curso del proyecto. Si lleva más de `stale_after` en "running"
+    (el proceso que lo lanzó murió) se marca como failed y no cuenta.
+    """
+    crawl = db.query(models.Crawl).filter_by(project_id=project_id, status="running").first()
+    if crawl and crawl.started_at and crawl.started_at < datetime.utcnow() - stale_after:
+        crawl.status = "failed"
+        crawl.finished_at = datetime.utcnow()
+        db.commit()
+        return None
+    return crawl
@@ -1,8 +1,13 @@
 # backend/dataforseo_client.py
 import time
 import requests
-from typing import List, Dict, Any
-from .config import DATAFORSEO_LOGIN, DATAFORSEO_PASSWORD, DATAFORSEO_ENDPOINT, DATAFORSEO_TASK_GET_ENDPOINT
+from typing import Iterator, List
+from .config import (
+    DATAFORSEO_LOGIN, DATAFORSEO_PASSWORD, DATAFORSEO_ENDPOINT, DATAFORSEO_TASK_GET_ENDPOINT,
+    DATAFORSEO_LINKS_ENDPOINT,
+)
+from .metrics import count_retry, external_request
+from .payloads import OnPageLink, OnPagePage, decode_dataforseo, decode_dataforseo_links
 
 
 class DataForSEOClient:
@@ -12,44 +17,53 @@ class DataForSEOClient:
 
         self.auth = (DATAFORSEO_LOGIN, DATAFORSEO_PASSWORD)
 
-    def create_onpage_task(self, domain: str, max_pages: int = 500) -> str:
+    def create_onpage_task(
+        self,
+        domain: str,
+        max_pages: int = 500,
+        enable_javascript: bool = False,
+        load_resources: bool = True,
+    ) -> str:
         """
-        Crea tarea de rastreo on_page.
+        Crea tarea de rastreo on_page (opciones por proyecto en crawl_config.py).
         Devuelve ID de tarea.
         """
         payload = [
             {
                 "target": domain,
                 "max_crawl_pages": max_pages,
-                "load_resources": True,
-                "enable_javascript": True,
+                "load_resources": load_resources,
+                "enable_javascript": enable_javascript,
                 "custom_js": "",
             }
         ]
 
-        resp = requests.post(DATAFORSEO_ENDPOINT, auth=self.auth, json=payload)
-        resp.raise_for_status()
-        data = resp.json()
+        with external_request("dataforseo", "task_post"):
+            resp = requests.post(DATAFORSEO_ENDPOINT, auth=self.auth, json=payload)
+            resp.raise_for_status()
+        data = decode_dataforseo(resp.content)
 
         # DataForSEO suele devolver results con tasks. Ajusta según tu contrato exacto.
-        task_id = data["tasks"][0]["id"]
+        task_id = data.tasks[0].id
         return task_id
 
-    def wait_for_task_and_get_results(self, task_id: str, sleep_seconds: int = 10, max_attempts: int = 30) -> List[Dict[str, Any]]:
+    def wait_for_task_and_get_results(self, task_id: str, sleep_seconds: int = 10, max_attempts: int = 30) -> List[OnPagePage]:
         """
         Polling simple para esperar a que la tarea termine y obtener resultados.
-        Devuelve lista de URLs con sus datos on-page.
+        Devuelve lista de URLs con sus datos on-page (sólo los campos de payloads.OnPagePage).
         """
-        for _ in range(max_attempts):
-            ready_resp = requests.get(DATAFORSEO_TASK_GET_ENDPOINT, auth=self.auth)
-            ready_resp.raise_for_status()
-            ready_data = ready_resp.json()
-
-            tasks = ready_data.get("tasks", [])
-            for t in tasks:
-                if t.get("id") == task_id:
+        for attempt in range(max_attempts):
+            if attempt:
+                count_retry("dataforseo", "tasks_ready")
+            with external_request("dataforseo", "tasks_ready"):
+                ready_resp = requests.get(DATAFORSEO_TASK_GET_ENDPOINT, auth=self.auth)
+                ready_resp.raise_for_status()
+            ready_data = decode_dataforseo(ready_resp.content)
+
+            for t in ready_data.tasks:
+                if t.id == task_id:
                     # Aquí se suelen devolver resultados en results
-                    result = t.get("result", [])
+                    result = t.result or []
                     # Debes adaptar la estructura a tu contrato concreto
                     # Supongamos que viene como lista de URLs con onpage_score, meta, etc.
                     return result
@@ -57,3 +71,26 @@ class DataForSEOClient:
             time.sleep(sleep_seconds)
 
         raise TimeoutError("La tarea de DataForSEO no se completó a tiempo")
+
+    def iter_links(self, task_id: str, page_size: int = 1000) -> Iterator[List[OnPageLink]]:
+        """
+        Recorre paginando todos los enlaces (internos y externos) encontrados en la tarea.
+        Devuelve un lote de enlaces por página de la API.
+        """
+        offset = 0
+        while True:
+            payload = [{"id": task_id, "limit": page_size, "offset": offset}]
+            with external_request("dataforseo", "links"):
+                resp = requests.post(DATAFORSEO_LINKS_ENDPOINT, auth=self.auth, json=payload)
+                resp.raise_for_status()
+            data = decode_dataforseo_links(resp.content)
+
+            result = (data.tasks[0].result or [None])[0] if data.tasks else None
+            items = (result.items or []) if result else []
+            if not items:
+                return
+
+            yield items
+            offset += len(items)
+            if result.total_items_count is not None and offset >= result.total_items_count:
+                return
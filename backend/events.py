@@ -0,0 +1,213 @@
+# backend/events.py
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import orjson
+
+from .config import SSE_HEARTBEAT_SECONDS, SSE_POLL_SECONDS
+
+"""
+Progreso en vivo de los crawls: pub/sub en proceso + Server-Sent Events
+(GET /crawls/{id}/events).
+
+El pipeline publica eventos en el canal de su crawl (crawl_events() abre el
+canal; publish() no hace nada fuera de un crawl, igual que tracing.span()):
+- stage:  {"stage", "state": started|finished|failed, "duration_ms"}
+- psi:    {"clusters", "clusters_total", "measured", "estimated", "failed"}
+- issues: {"rule_set", "issues", "by_severity"} (totales parciales del motor de reglas)
+- status: {"status", "site_health", "finished_at"} al empezar y al terminar
+- estimate: coste y duración estimados (crawl_config.estimate_crawl) al empezar
+
+Cada evento se reparte a todos los suscriptores sin tocar la BD: el coste
+es por evento, no por espectador. El canal guarda el último estado de cada
+etapa / contador, así que quien se conecta tarde (o reconecta con
+Last-Event-ID) recibe primero el estado actual y luego los eventos nuevos.
+
+Los suscriptores lentos no acumulan progreso viejo: los eventos psi / issues
+pendientes se compactan y sólo se envía el último.
+
+Si el crawl no se está ejecutando en este proceso (ya terminó o lo lleva otro
+worker), el stream consulta su estado cada SSE_POLL_SECONDS a través de la
+caché compartida, así que también ahí es una consulta por intervalo y no una
+por espectador.
+"""
+
+Event = Tuple[int, str, Dict[str, Any]]  # (id, tipo, datos)
+
+# Eventos de progreso: sólo importa el último
+PROGRESS_EVENTS = ("psi", "issues")
+
+
+class _Channel:
+    def __init__(self, crawl_id: int):
+        self.crawl_id = crawl_id
+        self.seq = 0
+        self.state: Dict[str, Event] = {}  # último evento por etapa / contador
+        self.subscribers: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+
+
+class EventBus:
+    def __init__(self):
+        self._channels: Dict[int, _Channel] = {}
+        self._lock = threading.Lock()
+
+    def open(self, crawl_id: int) -> None:
+        with self._lock:
+            self._channels.setdefault(crawl_id, _Channel(crawl_id))
+
+    def publish(self, crawl_id: int, kind: str, data: Dict[str, Any]) -> None:
+        """
+        Seguro desde cualquier hilo (el pipeline corre en el threadpool de FastAPI).
+        """
+        with self._lock:
+            channel = self._channels.get(crawl_id)
+            if channel is None:
+                return
+            channel.seq += 1
+            event = (channel.seq, kind, data)
+            state_key = f"stage:{data.get('stage')}" if kind == "stage" else kind
+            channel.state[state_key] = event
+            subscribers = list(channel.subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def close(self, crawl_id: int) -> None:
+        with self._lock:
+            channel = self._channels.pop(crawl_id, None)
+            subscribers = list(channel.subscribers) if channel else []
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    def subscribe(self, crawl_id: int, last_event_id: int = 0) -> Optional[Tuple[asyncio.Queue, List[Event]]]:
+        """
+        Desde el event loop. Devuelve (cola, estado actual posterior a
+        last_event_id), o None si el crawl no está en curso en este proceso.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            channel = self._channels.get(crawl_id)
+            if channel is None:
+                return None
+            channel.subscribers.add((asyncio.get_running_loop(), queue))
+            replay = sorted(e for e in channel.state.values() if e[0] > last_event_id)
+        return queue, replay
+
+    def unsubscribe(self, crawl_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            channel = self._channels.get(crawl_id)
+            if channel is not None:
+                channel.subscribers = {s for s in channel.subscribers if s[1] is not queue}
+
+
+event_bus = EventBus()
+
+_current_crawl: ContextVar[Optional[int]] = ContextVar("current_crawl_events", default=None)
+
+
+@contextmanager
+def crawl_events(crawl_id: int) -> Iterator[None]:
+    """
+    Canal de eventos del crawl mientras dura el bloque.
+    """
+    event_bus.open(crawl_id)
+    token = _current_crawl.set(crawl_id)
+    try:
+        yield
+    finally:
+        _current_crawl.reset(token)
+        event_bus.close(crawl_id)
+
+
+def publish(kind: str, **data: Any) -> None:
+    crawl_id = _current_crawl.get()
+    if crawl_id is not None:
+        event_bus.publish(crawl_id, kind, data)
+
+
+# -------------------------------------------------------------------
+# SERVER-SENT EVENTS
+# -------------------------------------------------------------------
+
+def format_sse(event: Optional[Event] = None, kind: Optional[str] = None, data: Any = None) -> bytes:
+    if event is not None:
+        event_id, kind, data = event
+        head = f"id: {event_id}\nevent: {kind}\n".encode()
+    else:
+        head = f"event: {kind}\n".encode()
+    return head + b"data: " + orjson.dumps(data, default=str) + b"\n\n"
+
+
+_HEARTBEAT = b": ping\n\n"
+
+
+def _compact(events: List[Event]) -> List[Event]:
+    """
+    Quita los eventos de progreso superados por otro posterior del mismo tipo.
+    """
+    last = {kind: event_id for event_id, kind, _ in events if kind in PROGRESS_EVENTS}
+    return [e for e in events if e[1] not in PROGRESS_EVENTS or e[0] == last[e[1]]]
+
+
+async def stream_crawl_events(
+    crawl_id: int,
+    last_event_id: int,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    load_status: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+) -> AsyncIterator[bytes]:
+    """
+    Cuerpo text/event-stream. Termina con un evento "end" cuando el crawl deja
+    de estar en curso o cuando el cliente se desconecta.
+    """
+    subscription = event_bus.subscribe(crawl_id, last_event_id)
+    if subscription is None:
+        async for chunk in _poll_status(load_status, is_disconnected):
+            yield chunk
+        return
+
+    queue, replay = subscription
+    try:
+        for event in _compact(replay):
+            yield format_sse(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                yield _HEARTBEAT
+                continue
+
+            pending = [event]
+            while not queue.empty():
+                pending.append(queue.get_nowait())
+            finished = None in pending
+            for item in _compact([e for e in pending if e is not None]):
+                yield format_sse(item)
+            if finished:
+                yield format_sse(kind="end", data={"crawl_id": crawl_id})
+                return
+    finally:
+        event_bus.unsubscribe(crawl_id, queue)
+
+
+async def _poll_status(
+    load_status: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    is_disconnected: Callable[[], Awaitable[bool]],
+) -> AsyncIterator[bytes]:
+    previous = None
+    while True:
+        status = await load_status()
+        if status != previous:
+            yield format_sse(kind="status", data=status)
+            previous = status
+        else:
+            yield _HEARTBEAT
+        if status is None or status.get("status") != "running":
+            yield format_sse(kind="end", data={"crawl_id": status and status.get("crawl_id")})
+            return
+        await asyncio.sleep(SSE_POLL_SECONDS)
+        if await is_disconnected():
+            return
@@ -0,0 +1,198 @@
+# backend/export.py
+import csv
+import io
+from typing import Any, Iterator, List, Sequence
+
+import orjson
+from sqlalchemy.orm import Session
+
+from . import models
+
+"""
+Exportación en streaming de un crawl completo (URLs + issues).
+
+Una sola consulta une Url, Issue e IssueType en SQL (LEFT JOIN: las URLs sin
+issues aparecen una vez con las columnas del issue vacías) y se lee con un
+cursor de servidor (yield_per), de modo que la memoria es constante y el primer
+bloque sale en cuanto llega el primer lote de filas.
+"""
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+EXPORT_COLUMNS = (
+    models.Url.id.label("url_id"),
+    models.Url.url,
+    models.Url.status_code,
+    models.Url.title,
+    models.Url.word_count,
+    models.Url.performance_score_mobile,
+    models.Url.lcp,
+    models.Url.cls,
+    models.Url.tbt,
+    models.Url.psi_estimated,
+    models.Issue.id.label("issue_id"),
+    models.IssueType.code.label("issue_code"),
+    models.IssueType.severity,
+    models.IssueType.category,
+    models.Issue.status,
+    models.Issue.implemented,
+    models.Issue.details,
+    models.Issue.comment,
+)
+
+EXPORT_KEYS = tuple(c.key for c in EXPORT_COLUMNS)
+
+# Filas por lote leído del cursor y por bloque enviado al cliente.
+BATCH_SIZE = 2000
+
+
+def _export_rows(db: Session, crawl_id: int):
+    return (
+        db.query(*EXPORT_COLUMNS)
+        .select_from(models.Url)
+        .outerjoin(models.Issue, models.Issue.url_id == models.Url.id)
+        .outerjoin(models.IssueType, models.IssueType.id == models.Issue.issue_type_id)
+        .filter(models.Url.crawl_id == crawl_id)
+        .order_by(models.Url.id, models.Issue.id)
+        .yield_per(BATCH_SIZE)
+    )
+
+
+def _batches(rows: Iterator[Sequence[Any]]) -> Iterator[List[Sequence[Any]]]:
+    batch: List[Sequence[Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# -------------------------------------------------------------------
+# ENCODERS POR FORMATO
+# -------------------------------------------------------------------
+
+def _csv_chunks(rows: Iterator[Sequence[Any]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_KEYS)
+    # El encabezado sale de inmediato, antes de esperar al primer lote.
+    yield buf.getvalue().encode("utf-8")
+
+    for batch in _batches(rows):
+        buf.seek(0)
+        buf.truncate(0)
+        writer.writerows(batch)
+        yield buf.getvalue().encode("utf-8")
+
+
+def _ndjson_chunks(rows: Iterator[Sequence[Any]]) -> Iterator[bytes]:
+    for batch in _batches(rows):
+        yield b"".join(orjson.dumps(dict(zip(EXPORT_KEYS, row))) + b"\n" for row in batch)
+
+
+class _ChunkSink:
+    """
+    Destino tipo fichero para pyarrow que acumula lo escrito y lo entrega por
+    bloques. Mantiene la posición absoluta (tell) que el writer de Parquet
+    necesita para calcular los offsets del footer.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_chunks(rows: Iterator[Sequence[Any]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("url_id", pa.int64()),
+        ("url", pa.string()),
+        ("status_code", pa.int32()),
+        ("title", pa.string()),
+        ("word_count", pa.int32()),
+        ("performance_score_mobile", pa.float64()),
+        ("lcp", pa.float64()),
+        ("cls", pa.float64()),
+        ("tbt", pa.float64()),
+        ("psi_estimated", pa.bool_()),
+        ("issue_id", pa.int64()),
+        ("issue_code", pa.string()),
+        ("severity", pa.string()),
+        ("category", pa.string()),
+        ("status", pa.string()),
+        ("implemented", pa.bool_()),
+        ("details", pa.string()),
+        ("comment", pa.string()),
+    ])
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        # Cada lote se escribe como un row group y se envía al terminarlo.
+        for batch in _batches(rows):
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+_ENCODERS = {
+    "csv": _csv_chunks,
+    "ndjson": _ndjson_chunks,
+    "parquet": _parquet_chunks,
+}
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def stream_crawl_export(session_factory, crawl_id: int, fmt: str) -> Iterator[bytes]:
+    """
+    Genera el export del crawl en el formato pedido.
+    Abre su propia sesión: el generador sigue vivo mientras se envía la
+    respuesta, después de que la sesión de la petición ya se haya cerrado.
+    """
+    db = session_factory()
+    try:
+        yield from _ENCODERS[fmt](iter(_export_rows(db, crawl_id)))
+    finally:
+        db.close()
@@ -0,0 +1,92 @@
+# backend/http_cache.py
+from typing import Any, Callable, Optional
+
+import orjson
+from fastapi import Request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import SingleFlight, cache
+from .config import HTTP_CACHE_TTL
+from .metrics import COALESCED_REQUESTS
+
+"""
+Caché HTTP de las lecturas de crawls terminados (ETag + 304 + caché en servidor).
+
+Los datos de un crawl terminado sólo cambian por los campos de workflow de sus
+issues (update_issue). Cada cambio incrementa Crawl.issues_version, así que
+(crawl_id, issues_version) identifica una versión concreta de las respuestas:
+
+- ETag fuerte "crawl-<id>-v<version>": si el cliente manda If-None-Match con
+  ese valor se responde 304 sin tocar más la BD;
+- cuerpos ya serializados en la caché compartida (cache.py), con la versión
+  en la clave: una versión nueva nunca sirve un cuerpo antiguo, aunque otro
+  worker haya hecho el cambio. Las versiones viejas caducan por TTL.
+
+Los crawls en curso no se cachean, pero las lecturas idénticas simultáneas
+se fusionan (coalesced_read): con muchos usuarios abriendo el mismo proyecto
+la consulta se ejecuta una vez.
+"""
+
+CACHE_CONTROL = "private, no-cache"  # el cliente puede guardar, pero revalida siempre
+
+read_flights = SingleFlight()
+
+
+def coalesced_read(key: str, build: Callable[[], Any]) -> Any:
+    """
+    build() una sola vez para todas las peticiones con la misma clave que
+    lleguen mientras se ejecuta; el resultado se comparte y no se guarda.
+    """
+    value, leader = read_flights.do(key, build)
+    if not leader:
+        COALESCED_REQUESTS.labels(key.split(":", 1)[0], "single_flight").inc()
+    return value
+
+
+def crawl_etag(crawl: models.Crawl) -> str:
+    return f'"crawl-{crawl.id}-v{crawl.issues_version or 0}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def cached_crawl_response(
+    request: Request,
+    crawl: models.Crawl,
+    endpoint: str,
+    build: Callable[[], Any],
+) -> Response:
+    """
+    Devuelve la respuesta JSON de `endpoint` para el crawl: 304 si el cliente ya
+    tiene la versión actual, el cuerpo cacheado o build() (una sola vez aunque
+    lleguen varias peticiones a la vez).
+    """
+    if crawl.status != "finished":
+        body = coalesced_read(f"{endpoint}:{crawl.id}", lambda: orjson.dumps(build()))
+        return Response(body, media_type="application/json", headers={"Cache-Control": "no-store"})
+
+    etag = crawl_etag(crawl)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    key = f"{endpoint}:{crawl.id}:{crawl.issues_version or 0}"
+    body = cache.get_or_load("http", key, lambda: orjson.dumps(build()), HTTP_CACHE_TTL)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def invalidate_crawl(db: Session, crawl_id: int) -> None:
+    """
+    Nueva versión de las respuestas del crawl (sin commit): se llama desde
+    update_issue dentro de la misma transacción que el cambio.
+    """
+    db.query(models.Crawl).filter(models.Crawl.id == crawl_id).update(
+        {models.Crawl.issues_version: func.coalesce(models.Crawl.issues_version, 0) + 1},
+        synchronize_session=False,
+    )
@@ -0,0 +1,234 @@
+# backend/issue_lifecycle.py
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import Session, aliased
+
+from . import models
+
+"""
+Ciclo de vida de los issues entre crawls (nuevo / persistente / resuelto).
+
+Cada crawl crea filas Issue nuevas; para no perder el trabajo de los
+implementadores (status, implemented, comment) cada issue lleva una huella
+estable:
+
+    fingerprint = hash64(clave normalizada de la URL | código del issue | detalle)
+
+donde "detalle" sólo se usa en los issues que pueden repetirse sobre la misma
+URL (p.ej. un issue por sitemap colgado de la home, ver FINGERPRINT_DETAIL_KEYS).
+
+Al terminar el crawl, carry_over_issues() copia el estado del crawl anterior en
+una sola sentencia UPDATE (subconsultas correlacionadas por fingerprint), y
+crawl_diff() clasifica los issues con un GROUP BY fingerprint sobre los dos
+crawls, sin comparar listas en Python.
+"""
+
+# Campo de `details` que distingue varios issues del mismo tipo sobre la misma URL
+FINGERPRINT_DETAIL_KEYS: Dict[str, str] = {
+    "SITEMAP_XML_INACCESSIBLE": "sitemap",
+    "SITEMAP_TOO_LARGE": "sitemap",
+}
+
+CHANGE_KINDS = ("new", "persisting", "resolved")
+
+
+def issue_fingerprint(url_ident: str, code: str, detail: str = "") -> int:
+    """
+    Hash de 64 bits con signo (cabe en BigInteger).
+    """
+    digest = hashlib.blake2b(f"{url_ident}|{code}|{detail}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _url_ident(url_id: int, url_key_id: Optional[int], url_hash: Optional[int]) -> str:
+    if url_key_id is not None:
+        return f"k{url_key_id}"
+    if url_hash is not None:
+        return f"h{url_hash}"
+    return f"u{url_id}"  # sin clave normalizada: sólo estable dentro del crawl
+
+
+def assign_fingerprints(db: Session, crawl: models.Crawl, rows: List[dict], code_by_type_id: Dict[int, str]) -> None:
+    """
+    Añade "fingerprint" y "first_seen_crawl_id" a las filas de issues antes de insertarlas.
+    """
+    url_ident = {
+        url_id: _url_ident(url_id, url_key_id, url_hash)
+        for url_id, url_key_id, url_hash in (
+            db.query(models.Url.id, models.Url.url_key_id, models.Url.url_hash)
+            .filter(models.Url.crawl_id == crawl.id)
+        )
+    }
+
+    for row in rows:
+        code = code_by_type_id[row["issue_type_id"]]
+        detail = ""
+        detail_key = FINGERPRINT_DETAIL_KEYS.get(code)
+        if detail_key and row["details"]:
+            detail = str(json.loads(row["details"]).get(detail_key) or "")
+        row["fingerprint"] = issue_fingerprint(url_ident[row["url_id"]], code, detail)
+        row["first_seen_crawl_id"] = crawl.id
+
+
+def fill_fingerprints(db: Session, crawl: models.Crawl, code_by_type_id: Dict[int, str]) -> int:
+    """
+    Huella de los issues insertados directamente en la BD (rule_dsl.py), que
+    llegan sin ella: sólo se leen (id del issue, tipo, clave de la URL) de esos
+    issues. Sin commit. Devuelve el nº de issues actualizados.
+    """
+    pending = (
+        db.query(models.Issue.id, models.Issue.issue_type_id, models.Url.id, models.Url.url_key_id, models.Url.url_hash)
+        .join(models.Url, models.Url.id == models.Issue.url_id)
+        .filter(models.Issue.crawl_id == crawl.id, models.Issue.fingerprint.is_(None))
+        .all()
+    )
+    if pending:
+        db.bulk_update_mappings(models.Issue, [
+            {
+                "id": issue_id,
+                "fingerprint": issue_fingerprint(_url_ident(url_id, url_key_id, url_hash), code_by_type_id[type_id]),
+            }
+            for issue_id, type_id, url_id, url_key_id, url_hash in pending
+        ])
+    return len(pending)
+
+
+def previous_crawl(db: Session, crawl: models.Crawl) -> Optional[models.Crawl]:
+    """
+    Último crawl terminado del mismo proyecto anterior a `crawl`.
+    """
+    return (
+        db.query(models.Crawl)
+        .filter(
+            models.Crawl.project_id == crawl.project_id,
+            models.Crawl.status == "finished",
+            models.Crawl.id < crawl.id,
+        )
+        .order_by(models.Crawl.id.desc())
+        .first()
+    )
+
+
+def carry_over_issues(db: Session, crawl: models.Crawl, previous: Optional[models.Crawl]) -> int:
+    """
+    Copia el estado de flujo de trabajo de los issues persistentes desde `previous`.
+    Un issue que estaba "done" y sigue apareciendo se reabre (pending, no implementado)
+    conservando el comentario. Devuelve el nº de issues actualizados.
+    """
+    if previous is None:
+        return 0
+
+    prev = aliased(models.Issue)
+
+    def from_previous(column):
+        return (
+            select(column)
+            .where(prev.crawl_id == previous.id, prev.fingerprint == models.Issue.fingerprint)
+            .order_by(prev.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    reopened = prev.status == "done"
+    stmt = (
+        update(models.Issue)
+        .where(
+            models.Issue.crawl_id == crawl.id,
+            models.Issue.fingerprint.in_(select(prev.fingerprint).where(prev.crawl_id == previous.id)),
+        )
+        .values(
+            status=from_previous(case((reopened, "pending"), else_=prev.status)),
+            implemented=from_previous(case((reopened, False), else_=prev.implemented)),
+            comment=from_previous(prev.comment),
+            first_seen_crawl_id=from_previous(func.coalesce(prev.first_seen_crawl_id, previous.id)),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    result = db.execute(stmt)
+    db.commit()
+    return result.rowcount
+
+
+# -------------------------------------------------------------------
+# DIFF ENTRE CRAWLS
+# -------------------------------------------------------------------
+
+def _classified(crawl_id: int, previous_id: int):
+    """
+    Subconsulta: una fila por fingerprint con el issue actual y/o el anterior.
+    """
+    issue = models.Issue
+    return (
+        select(
+            issue.fingerprint.label("fingerprint"),
+            func.max(case((issue.crawl_id == crawl_id, issue.id))).label("current_id"),
+            func.max(case((issue.crawl_id == previous_id, issue.id))).label("previous_id"),
+            func.max(issue.issue_type_id).label("issue_type_id"),
+        )
+        .where(issue.crawl_id.in_((crawl_id, previous_id)), issue.fingerprint.isnot(None))
+        .group_by(issue.fingerprint)
+        .subquery()
+    )
+
+
+def _change_expr(classified):
+    return case(
+        (classified.c.previous_id.is_(None), "new"),
+        (classified.c.current_id.is_(None), "resolved"),
+        else_="persisting",
+    )
+
+
+def crawl_diff(
+    db: Session,
+    crawl_id: int,
+    previous_id: int,
+    change: Optional[str] = None,
+    limit: int = 100,
+) -> dict:
+    """
+    Resumen del diff (total y por tipo de issue) y, si se pide `change`, los
+    primeros `limit` issues de esa clase.
+    """
+    classified = _classified(crawl_id, previous_id)
+    change_col = _change_expr(classified).label("change")
+
+    counts = db.execute(
+        select(models.IssueType.code, models.IssueType.severity, change_col, func.count())
+        .join(models.IssueType, models.IssueType.id == classified.c.issue_type_id)
+        .group_by(models.IssueType.code, models.IssueType.severity, change_col)
+    ).all()
+
+    summary = {kind: 0 for kind in CHANGE_KINDS}
+    by_type: Dict[str, dict] = {}
+    for code, severity, kind, count in counts:
+        summary[kind] += count
+        entry = by_type.setdefault(code, {"code": code, "severity": severity, **{k: 0 for k in CHANGE_KINDS}})
+        entry[kind] = count
+
+    result = {
+        "crawl_id": crawl_id,
+        "previous_crawl_id": previous_id,
+        "summary": summary,
+        "by_type": sorted(by_type.values(), key=lambda e: e["code"]),
+    }
+
+    if change is not None:
+        issue_id = func.coalesce(classified.c.current_id, classified.c.previous_id)
+        rows = db.execute(
+            select(models.Issue.id, models.Issue.crawl_id, models.Url.url, models.IssueType.code, models.Issue.status)
+            .join(classified, models.Issue.id == issue_id)
+            .join(models.Url, models.Url.id == models.Issue.url_id)
+            .join(models.IssueType, models.IssueType.id == models.Issue.issue_type_id)
+            .where(_change_expr(classified) == change)
+            .order_by(models.Issue.id)
+            .limit(limit)
+        ).all()
+        result["items"] = [
+            {"issue_id": id_, "crawl_id": c_id, "url": url, "code": code, "status": status}
+            for id_, c_id, url, code, status in rows
+        ]
+    return result
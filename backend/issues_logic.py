@@ -1,7 +1,27 @@
 # backend/issues_logic.py
-from typing import List
+import json
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from sqlalchemy import case, func
+import orjson
 from sqlalchemy.orm import Session
 from . import models
+from .cache import cache
+from .chains import ChainResolver
+from .config import CRAWL_DEPTH_MAX, TOO_MANY_LINKS_MAX
+from .events import publish
+from .issue_lifecycle import assign_fingerprints, fill_fingerprints
+from .link_graph import find_home, load_link_graph
+from .robots import RobotsMatcher
+from .rule_dsl import compile_rules, run_sql_rules
+from .serialization import ISSUE_TYPE_COLUMNS, ISSUE_TYPE_KEYS
+from .sitemap import SITEMAP_MAX_BYTES, SITEMAP_MAX_URLS, load_report as load_sitemap_report
+from .url_norm import url_key
+from .url_rules import evaluate_url_text_rules
+from .pagespeed_client import (
+    AUDIT_NUMERIC_VALUE, AUDIT_SAVINGS_BYTES, AUDIT_SAVINGS_MS, AUDIT_SCORE, unpack_audits,
+)
 
 """
 Este archivo define el CATÁLOGO de tipos de issues que tu auditoría puede detectar.
@@ -12,6 +32,11 @@ en función de los datos que traigas de DataForSEO + PageSpeed Insights.
 # -------------------------------------------------------------------
 # CATÁLOGO DE ISSUE TYPES
 # -------------------------------------------------------------------
+# "condition" (opcional): predicado declarativo sobre columnas de `urls` que
+# rule_dsl.py compila a INSERT ... SELECT; esos issues se generan en la BD.
+
+# Páginas que respondieron 2xx (las reglas de contenido no aplican a errores)
+_STATUS_2XX = ("status_code", "between", 200, 299)
 
 DEFAULT_ISSUE_TYPES: List[dict] = [
     # ===============================================================
@@ -22,6 +47,10 @@ DEFAULT_ISSUE_TYPES: List[dict] = [
         "name": "Errores 4xx en páginas",
         "severity": "critical",
         "category": "technical",
+        "condition": {
+            "where": [("status_code", "between", 400, 499)],
+            "details": {"status_code": "status_code"},
+        },
         "description": "La URL devuelve un código de estado HTTP 4xx (404, 403, 401, etc.).",
         "fix_template_for_impl": (
             "Verifica si la página debe existir. Si debe estar disponible, corrige el contenido para que "
@@ -39,6 +68,10 @@ DEFAULT_ISSUE_TYPES: List[dict] = [
         "name": "Errores 5xx en servidor",
         "severity": "critical",
         "category": "technical",
+        "condition": {
+            "where": [("status_code", ">=", 500)],
+            "details": {"status_code": "status_code"},
+        },
         "description": "La URL devuelve un error 5xx (500, 502, 503, 504, etc.).",
         "fix_template_for_impl": (
             "Reporta al equipo de infraestructura o hosting. Revisa errores de servidor, timeouts, "
@@ -139,6 +172,7 @@ DEFAULT_ISSUE_TYPES: List[dict] = [
         "name": "Título de página faltante",
         "severity": "major",
         "category": "content",
+        "condition": {"where": [_STATUS_2XX, ("title", "empty")]},
         "description": "La página no tiene etiqueta <title> definida.",
         "fix_template_for_impl": (
             "Añade un título claro que describa el contenido de la página e incluya la palabra clave principal "
@@ -169,6 +203,11 @@ DEFAULT_ISSUE_TYPES: List[dict] = [
         "name": "Títulos demasiado largos",
         "severity": "minor",
         "category": "content",
+        "condition": {
+            "where": [_STATUS_2XX, ("title_length", ">", "max_length")],
+            "params": {"max_length": 60},
+            "details": {"length": "title_length", "max": "max_length"},
+        },
         "description": "El título supera la longitud recomendada.",
         "fix_template_for_impl": (
             "Reduce el título a aproximadamente 50-60 caracteres, manteniendo idea principal y palabra clave "
@@ -184,6 +223,11 @@ DEFAULT_ISSUE_TYPES: List[dict] = [
         "name": "Títulos demasiado cortos",
         "severity": "minor",
         "category": "content",
+        "condition": {
+            "where": [_STATUS_2XX, ("title_length", ">", 0), ("title_length", "<", "min_length")],
+            "params": {"min_length": 30},
+            "details": {"length": "title_length", "min": "min_length"},
+        },
         "description": "El título es demasiado breve o poco descriptivo.",
         "fix_template_for_impl": (
             "Añade información que aclare el contexto (producto, categoría, beneficio, marca) manteniendo claridad."
@@ -196,6 +240,7 @@ DEFAULT_ISSUE_TYPES: List[dict] = [
         "name": "Meta descripción faltante",
         "severity": "minor",
         "category": "content",
+        "condition": {"where": [_STATUS_2XX, ("meta_description", "empty")]},
         "description": "La página no tiene meta description.",
         "fix_template_for_impl": (
             "Redacta una meta descripción de 120-155 caracteres que resuma el contenido y destaque un beneficio "
@@ -227,6 +272,11 @@ DEFAULT_ISSUE_TYPES: List[dict] = [
         "name": "Meta descripciones demasiado largas",
         "severity": "minor",
         "category": "content",
+        "condition": {
+            "where": [_STATUS_2XX, ("meta_description_length", ">", "max_length")],
+            "params": {"max_length": 160},
+            "details": {"length": "meta_description_length", "max": "max_length"},
+        },
         "description": "La meta descripción excede la longitud recomendada.",
         "fix_template_for_impl": (
             "Recorta la meta descripción a unos 120-155 caracteres, priorizando el beneficio principal y CTA."
@@ -239,6 +289,15 @@ DEFAULT_ISSUE_TYPES: List[dict] = [
         "name": "Meta descripciones demasiado cortas",
         "severity": "minor",
         "category": "content",
+        "condition": {
+            "where": [
+                _STATUS_2XX,
+                ("meta_description_length", ">", 0),
+                ("meta_description_length", "<", "min_length"),
+            ],
+            "params": {"min_length": 70},
+            "details": {"length": "meta_description_length", "min": "min_length"},
+        },
         "description": "La meta descripción es demasiado breve o poco informativa.",
         "fix_template_for_impl": (
             "Añade contexto sobre qué encontrará el usuario, integrando beneficios y términos relevantes."
@@ -306,6 +365,11 @@ DEFAULT_ISSUE_TYPES: List[dict] = [
         "name": "Contenido delgado (thin content)",
         "severity": "major",
         "category": "content",
+        "condition": {
+            "where": [_STATUS_2XX, ("word_count", ">=", "empty_below"), ("word_count", "<", "min_words")],
+            "params": {"min_words": 300, "empty_below": 50},
+            "details": {"words": "word_count", "min": "min_words"},
+        },
         "description": "La página tiene muy poco texto o no aporta contenido suficiente.",
         "fix_template_for_impl": (
             "Amplía el contenido incluyendo información útil, FAQs, detalles de producto/servicio, ejemplos y "
@@ -322,6 +386,11 @@ DEFAULT_ISSUE_TYPES: List[dict] = [
         "name": "Páginas sin contenido",
         "severity": "critical",
         "category": "content",
+        "condition": {
+            "where": [_STATUS_2XX, ("word_count", "<", "min_words")],
+            "params": {"min_words": 50},
+            "details": {"words": "word_count", "min": "min_words"},
+        },
         "description": "La página prácticamente no tiene contenido visible.",
         "fix_template_for_impl": (
             "Definir si esta página debe existir. Si sí, añade contenido relevante. Si no, redirecciona a la "
@@ -1085,6 +1154,11 @@ DEFAULT_ISSUE_TYPES: List[dict] = [
         "name": "LCP (Largest Contentful Paint) lento",
         "severity": "major",
         "category": "performance",
+        "condition": {
+            "where": [_STATUS_2XX, ("lcp", ">", "max_ms")],
+            "params": {"max_ms": 2500},
+            "details": {"value": "lcp", "threshold": "max_ms", "estimated": "psi_estimated"},
+        },
         "description": "El LCP está por encima del umbral recomendado.",
         "fix_template_for_impl": (
             "Optimiza el elemento principal de la página (imagen héroe, bloque principal). Comprime imágenes, "
@@ -1122,6 +1196,11 @@ DEFAULT_ISSUE_TYPES: List[dict] = [
         "name": "Total Blocking Time (TBT) alto",
         "severity": "major",
         "category": "performance",
+        "condition": {
+            "where": [_STATUS_2XX, ("tbt", ">", "max_ms")],
+            "params": {"max_ms": 200},
+            "details": {"value": "tbt", "threshold": "max_ms", "estimated": "psi_estimated"},
+        },
         "description": "El tiempo en que la página permanece bloqueada por tareas JS largas es elevado.",
         "fix_template_for_impl": (
             "Divide tareas JS largas en trozos más pequeños, aplaza scripts no críticos y elimina JS no utilizado."
@@ -1134,6 +1213,11 @@ DEFAULT_ISSUE_TYPES: List[dict] = [
         "name": "CLS (Cumulative Layout Shift) alto",
         "severity": "minor",
         "category": "performance",
+        "condition": {
+            "where": [_STATUS_2XX, ("cls", ">", "max")],
+            "params": {"max": 0.1},
+            "details": {"value": "cls", "threshold": "max", "estimated": "psi_estimated"},
+        },
         "description": "La página tiene cambios bruscos de layout durante la carga.",
         "fix_template_for_impl": (
             "Reserva espacio para imágenes, anuncios y componentes dinámicos. Evita insertar elementos por encima "
@@ -1236,27 +1320,580 @@ def ensure_issue_types(db: Session):
         if it["code"] in existing_by_code:
             # Si quisieras actualizar textos automáticamente, podrías hacerlo aquí.
             continue
-        db.add(models.IssueType(**it))
+        db.add(models.IssueType(**{k: v for k, v in it.items() if k != "condition"}))
 
     db.commit()
+    cache.delete("catalog", "issue_types")
+
+
+def issue_type_catalog(db: Session) -> Dict[str, dict]:
+    """
+    code -> columnas de IssueTypeOut. El catálogo sólo cambia en
+    ensure_issue_types(), así que se sirve desde la caché compartida.
+    """
+    def load() -> bytes:
+        rows = db.query(*ISSUE_TYPE_COLUMNS).all()
+        return orjson.dumps({row.code: dict(zip(ISSUE_TYPE_KEYS, row)) for row in rows})
+
+    return orjson.loads(cache.get_or_load("catalog", "issue_types", load))
 
 
 # -------------------------------------------------------------------
-# HOOKS PARA LÓGICA DE GENERACIÓN DE ISSUES Y SITE HEALTH
+# PESOS POR SEVERIDAD
 # -------------------------------------------------------------------
-# NOTA:
-# Aquí puedes conectar la lógica que ya tenías (generate_issues_for_crawl, compute_site_health)
-# o crear una versión nueva que aproveche este catálogo extendido.
-#
-# Ejemplo:
-#
-# def generate_issues_for_crawl(db: Session, crawl: models.Crawl):
-#     urls = db.query(models.Url).filter_by(crawl_id=crawl.id).all()
-#     issue_types = {it.code: it for it in db.query(models.IssueType).all()}
-#     ...
-#
-# def compute_site_health(db: Session, crawl: models.Crawl) -> float:
-#     ...
+# Se usan para priorizar issues (severidad x PageRank de la URL) y para el Site Health.
+
+SEVERITY_WEIGHTS: Dict[str, float] = {
+    "critical": 10.0,
+    "major": 5.0,
+    "minor": 1.0,
+}
+
+
+def severity_weight(severity_column=models.IssueType.severity):
+    """
+    Expresión SQL con el peso de la severidad (1.0 para severidades desconocidas).
+    """
+    return case(
+        *[(severity_column == sev, weight) for sev, weight in SEVERITY_WEIGHTS.items()],
+        else_=1.0,
+    )
+
+
+# -------------------------------------------------------------------
+# UTILIDADES PARA REGLAS
+# -------------------------------------------------------------------
+
+def _issue_row(crawl: models.Crawl, url_id: int, issue_type_id: int, details: Optional[dict] = None) -> dict:
+    now = datetime.utcnow()
+    return {
+        "crawl_id": crawl.id,
+        "url_id": url_id,
+        "issue_type_id": issue_type_id,
+        "status": "pending",
+        "implemented": False,
+        "details": json.dumps(details, ensure_ascii=False) if details else None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+# -------------------------------------------------------------------
+# REGLAS DE PERFORMANCE (LIGHTHOUSE)
+# -------------------------------------------------------------------
+# Cada regla se evalúa sobre las auditorías compactas guardadas en
+# Url.lighthouse_audits (ver pagespeed_client.extract_lighthouse_audits):
+# - "numeric": dispara si numericValue de alguna auditoría supera `threshold`.
+# - "score":   dispara si el score de alguna auditoría es menor que `threshold`
+#              (auditorías de tipo oportunidad: 1 = sin problemas).
+# PERF_LCP_SLOW, PERF_TBT_HIGH y PERF_CLS_HIGH se evalúan en SQL sobre
+# Url.lcp / tbt / cls (condition en el catálogo). Sus details son
+# {"value", "threshold", "estimated"}: el score y los ahorros por auditoría
+# sólo están en el blob comprimido. Los issues de esos códigos de crawls
+# anteriores conservan la forma {"audits": {...}, "threshold", "estimated"};
+# el frontend (IssueTable) lee ambas.
+
+PERF_RULES: List[dict] = [
+    {"code": "PERF_FCP_SLOW", "kind": "numeric", "audits": ["first-contentful-paint"], "threshold": 1800},
+    {"code": "PERF_SI_SLOW", "kind": "numeric", "audits": ["speed-index"], "threshold": 3400},
+    {"code": "SERVER_RESPONSE_SLOW", "kind": "numeric", "audits": ["server-response-time"], "threshold": 600},
+    {"code": "PAGE_LOAD_SLOW", "kind": "numeric", "audits": ["interactive"], "threshold": 7300},
+    {"code": "PERF_RENDER_BLOCKING_RESOURCES", "kind": "score", "audits": ["render-blocking-resources"], "threshold": 0.9},
+    {"code": "PERF_UNUSED_JS", "kind": "score", "audits": ["unused-javascript"], "threshold": 0.9},
+    {"code": "PERF_LARGE_JS_BUNDLES", "kind": "score", "audits": ["bootup-time", "duplicated-javascript"], "threshold": 0.9},
+    {
+        "code": "PERF_LARGE_IMAGES",
+        "kind": "score",
+        "audits": ["uses-optimized-images", "modern-image-formats", "uses-responsive-images"],
+        "threshold": 0.9,
+    },
+    {"code": "PERF_TEXT_NOT_COMPRESSED", "kind": "score", "audits": ["uses-text-compression"], "threshold": 0.9},
+    {"code": "PERF_CACHE_POLICY_ISSUES", "kind": "score", "audits": ["uses-long-cache-ttl"], "threshold": 0.9},
+]
+
+
+def _perf_rule_hits(rule: dict, audits: Dict[str, list]) -> Dict[str, list]:
+    """
+    Devuelve las auditorías (id -> fila compacta) que disparan la regla.
+    """
+    hits = {}
+    for audit_id in rule["audits"]:
+        row = audits.get(audit_id)
+        if row is None:
+            continue
+        if rule["kind"] == "numeric":
+            value = row[AUDIT_NUMERIC_VALUE]
+            if value is not None and value > rule["threshold"]:
+                hits[audit_id] = row
+        else:
+            score = row[AUDIT_SCORE]
+            if score is not None and score < rule["threshold"]:
+                hits[audit_id] = row
+    return hits
+
+
+def generate_performance_issues(
+    db: Session, crawl: models.Crawl, issue_type_ids: Dict[str, int]
+) -> List[dict]:
+    """
+    Evalúa todas las PERF_RULES en bloque sobre las auditorías guardadas del crawl.
+    Sólo lee las columnas necesarias y descomprime cada blob una vez.
+    """
+    rows = (
+        db.query(models.Url.id, models.Url.lighthouse_audits, models.Url.psi_estimated)
+        .filter(models.Url.crawl_id == crawl.id, models.Url.lighthouse_audits.isnot(None))
+        .all()
+    )
+
+    issues: List[dict] = []
+    for url_id, blob, estimated in rows:
+        audits = unpack_audits(blob)
+        if not audits:
+            continue
+        for rule in PERF_RULES:
+            hits = _perf_rule_hits(rule, audits)
+            if not hits:
+                continue
+            details = {
+                "audits": {
+                    audit_id: {
+                        "score": row[AUDIT_SCORE],
+                        "value": row[AUDIT_NUMERIC_VALUE],
+                        "savings_ms": row[AUDIT_SAVINGS_MS],
+                        "savings_bytes": row[AUDIT_SAVINGS_BYTES],
+                    }
+                    for audit_id, row in hits.items()
+                },
+                "threshold": rule["threshold"],
+                "estimated": bool(estimated),
+            }
+            issues.append(_issue_row(crawl, url_id, issue_type_ids[rule["code"]], details))
+    return issues
+
+
+# -------------------------------------------------------------------
+# REGLAS DE ENLACES INTERNOS (GRAFO CSR)
+# -------------------------------------------------------------------
+
+def generate_link_issues(
+    db: Session, crawl: models.Crawl, issue_type_ids: Dict[str, int]
+) -> List[dict]:
+    """
+    ORPHAN_PAGE, CRAWL_DEPTH_EXCESSIVE, TOO_MANY_LINKS, INTERNAL_BROKEN_LINK,
+    EXTERNAL_BROKEN_LINK y OUTBOUND_TO_ERROR_PAGE a partir del grafo de enlaces
+    guardado del crawl (link_graph.py). Todas las métricas se calculan en pasadas
+    vectorizadas; sólo se itera en Python sobre los nodos que disparan reglas.
+    """
+    graph = load_link_graph(crawl.id)
+    if graph is None:
+        return []
+
+    crawled = graph.url_ids >= 0
+    in_degree = graph.in_degree()
+    out_degree = graph.out_degree()
+    depth = graph.bfs_depth()
+
+    error_edges = graph.error_edges()
+    internal_errors = np.bincount(graph.edge_sources()[error_edges], minlength=graph.num_nodes)
+    total_links = out_degree + graph.external_out
+
+    not_home = np.arange(graph.num_nodes) != graph.home
+    checks = [
+        (
+            "ORPHAN_PAGE",
+            crawled & not_home & (in_degree == 0) & (graph.status == 200),
+            lambda n: {"inlinks": 0},
+        ),
+        (
+            "CRAWL_DEPTH_EXCESSIVE",
+            crawled & (depth > CRAWL_DEPTH_MAX),
+            lambda n: {"depth": int(depth[n]), "max_depth": CRAWL_DEPTH_MAX},
+        ),
+        (
+            "TOO_MANY_LINKS",
+            crawled & (total_links > TOO_MANY_LINKS_MAX),
+            lambda n: {"links": int(total_links[n]), "max_links": TOO_MANY_LINKS_MAX},
+        ),
+        (
+            "INTERNAL_BROKEN_LINK",
+            crawled & (internal_errors > 0),
+            lambda n: {"broken_internal_links": int(internal_errors[n])},
+        ),
+        (
+            "EXTERNAL_BROKEN_LINK",
+            crawled & (graph.external_broken > 0),
+            lambda n: {"broken_external_links": int(graph.external_broken[n])},
+        ),
+        (
+            "OUTBOUND_TO_ERROR_PAGE",
+            crawled & ((internal_errors + graph.external_broken) > 0),
+            lambda n: {
+                "internal_error_links": int(internal_errors[n]),
+                "external_error_links": int(graph.external_broken[n]),
+            },
+        ),
+    ]
+
+    if graph.num_edges == 0:
+        # Sin aristas (la consulta de enlaces falló o no devolvió nada) no se
+        # sabe qué páginas son huérfanas: todas lo parecerían salvo la home.
+        checks = [check for check in checks if check[0] != "ORPHAN_PAGE"]
+
+    issues: List[dict] = []
+    for code, mask, details in checks:
+        issue_type_id = issue_type_ids[code]
+        for node in np.flatnonzero(mask):
+            issues.append(_issue_row(crawl, int(graph.url_ids[node]), issue_type_id, details(node)))
+    return issues
+
+
+# -------------------------------------------------------------------
+# REGLAS DE CADENAS DE REDIRECCIÓN Y CANONICAL
+# -------------------------------------------------------------------
+
+def generate_chain_issues(
+    db: Session, crawl: models.Crawl, issue_type_ids: Dict[str, int]
+) -> List[dict]:
+    """
+    REDIRECT_CHAIN, REDIRECT_LOOP, CANONICAL_CHAIN y CANONICAL_TO_ERROR.
+    Se construyen los mapas URL -> destino una vez y se resuelven todas las
+    cadenas en memoria (chains.ChainResolver). La cadena y los saltos van en details.
+    """
+    rows = (
+        db.query(
+            models.Url.id, models.Url.url, models.Url.url_hash, models.Url.status_code,
+            models.Url.redirect_url, models.Url.canonical_url,
+        )
+        .filter(models.Url.crawl_id == crawl.id)
+        .all()
+    )
+
+    # Todo se cruza por el hash de la URL normalizada; `display` permite volver
+    # a la URL original para los details.
+    display: Dict[int, str] = {}
+    status_by_key: Dict[int, int] = {}
+    redirect_targets: Dict[int, int] = {}
+    canonical_targets: Dict[int, int] = {}
+    keyed_rows = []
+    for url_id, url, key, status, redirect, canonical in rows:
+        key = key if key is not None else url_key(url)
+        display[key] = url
+        status_by_key[key] = status
+        if redirect and status and 300 <= status < 400:
+            redirect_targets[key] = url_key(redirect)
+            display.setdefault(redirect_targets[key], redirect)
+        if canonical:
+            canonical_targets[key] = url_key(canonical)
+            display.setdefault(canonical_targets[key], canonical)
+        keyed_rows.append((url_id, key))
+
+    redirects = ChainResolver(redirect_targets)
+    canonicals = ChainResolver(canonical_targets)
+
+    def urls_of(keys):
+        return [display.get(k) for k in keys]
+
+    issues: List[dict] = []
+    for url_id, key in keyed_rows:
+        if key in redirects.targets:
+            res = redirects.resolve(key)
+            details = {
+                "chain": urls_of(redirects.chain(key)), "hops": res.hops,
+                "final_url": display.get(res.final),
+            }
+            if res.loop:
+                issues.append(_issue_row(crawl, url_id, issue_type_ids["REDIRECT_LOOP"], details))
+            elif res.hops > 1:
+                issues.append(_issue_row(crawl, url_id, issue_type_ids["REDIRECT_CHAIN"], details))
+
+        if key in canonicals.targets:
+            res = canonicals.resolve(key)
+            if res.hops > 1 or res.loop:
+                details = {
+                    "chain": urls_of(canonicals.chain(key)), "hops": res.hops,
+                    "final_url": display.get(res.final), "loop": res.loop,
+                }
+                issues.append(_issue_row(crawl, url_id, issue_type_ids["CANONICAL_CHAIN"], details))
+
+            # La canonical (tras seguir sus redirecciones) responde con error.
+            target = canonicals.targets[key]
+            target_final = redirects.resolve(target).final or target
+            target_status = status_by_key.get(target_final)
+            if target_status is not None and target_status >= 400:
+                details = {
+                    "canonical": display.get(target),
+                    "final_url": display.get(target_final),
+                    "status_code": target_status,
+                }
+                issues.append(_issue_row(crawl, url_id, issue_type_ids["CANONICAL_TO_ERROR"], details))
+    return issues
+
+
+# -------------------------------------------------------------------
+# REGLAS DE SITEMAPS Y ROBOTS.TXT
+# -------------------------------------------------------------------
+# Los problemas de sitio (robots.txt inaccesible, sitemap demasiado grande o
+# URLs del sitemap que no están en el crawl) se asocian a la URL de la home,
+# ya que todo issue necesita un url_id.
+
+# Nº máximo de URLs de ejemplo que se guardan en details en issues agregados.
+MAX_SAMPLE_URLS = 50
+
+
+def generate_sitemap_issues(
+    db: Session, crawl: models.Crawl, issue_type_ids: Dict[str, int]
+) -> List[dict]:
+    """
+    SITEMAP_URL_ERROR, SITEMAP_URL_MISSING, SITEMAP_URL_BLOCKED_ROBOTS,
+    SITEMAP_TOO_LARGE, SITEMAP_XML_INACCESSIBLE, ROBOTS_BLOCKING_INDEXABLE y
+    ROBOTS_TXT_INACCESSIBLE a partir del informe guardado del crawl (sitemap.py),
+    cruzando por conjuntos las URLs del sitemap con las filas Url del crawl.
+    """
+    report = load_sitemap_report(crawl.id)
+    if report is None:
+        return []
+
+    rows = (
+        db.query(
+            models.Url.id, models.Url.url, models.Url.url_hash, models.Url.status_code,
+            models.Url.redirect_url, models.Url.canonical_url,
+        )
+        .filter(models.Url.crawl_id == crawl.id)
+        .all()
+    )
+    home = find_home([url for _, url, *_ in rows])
+    if home < 0:
+        return []
+    home_id = rows[home][0]
+
+    robots = RobotsMatcher(report.robots_txt)
+    # Cruce por hash de URL normalizada (enteros), no por TEXT.
+    sitemap_keys: Dict[int, str] = {url_key(u): u for u in report.urls}
+    crawled_keys = {key if key is not None else url_key(url) for _, url, key, *_ in rows}
+    issues: List[dict] = []
+
+    def add(code: str, url_id: int, details: dict) -> None:
+        issues.append(_issue_row(crawl, url_id, issue_type_ids[code], details))
+
+    # --- Problemas de sitio (sobre la home) ---
+    # Sin respuesta, 5xx o 429: los buscadores no pueden leerlo. Un 4xx equivale
+    # a no tener robots.txt (se permite todo, RFC 9309 2.3.1.3): no es un problema.
+    status = report.robots_status
+    if status is None or status >= 500 or status == 429:
+        add("ROBOTS_TXT_INACCESSIBLE", home_id, {"status_code": status})
+
+    for stats in report.sitemaps:
+        if stats.error is not None:
+            add("SITEMAP_XML_INACCESSIBLE", home_id, {
+                "sitemap": stats.url, "status_code": stats.status_code, "error": stats.error,
+            })
+        elif stats.url_count > SITEMAP_MAX_URLS or stats.uncompressed_bytes > SITEMAP_MAX_BYTES:
+            add("SITEMAP_TOO_LARGE", home_id, {
+                "sitemap": stats.url, "urls": stats.url_count, "bytes": stats.uncompressed_bytes,
+            })
+
+    # URLs del sitemap que no se rastrearon: se agregan en un único issue.
+    blocked_not_crawled = [
+        u for k, u in sitemap_keys.items()
+        if k not in crawled_keys and not robots.is_allowed(u)
+    ]
+    if blocked_not_crawled:
+        add("SITEMAP_URL_BLOCKED_ROBOTS", home_id, {
+            "count": len(blocked_not_crawled), "urls": sorted(blocked_not_crawled)[:MAX_SAMPLE_URLS],
+        })
+
+    # --- Problemas por URL rastreada ---
+    for url_id, url, key, status, redirect, canonical in rows:
+        key = key if key is not None else url_key(url)
+        in_sitemap = key in sitemap_keys
+        allowed = robots.is_allowed(url)
+
+        if in_sitemap and status is not None and status >= 400:
+            add("SITEMAP_URL_ERROR", url_id, {"status_code": status})
+        if in_sitemap and not allowed:
+            add("SITEMAP_URL_BLOCKED_ROBOTS", url_id, {})
+
+        indexable = (
+            status == 200 and not redirect
+            and (not canonical or url_key(canonical) == key)
+        )
+        if indexable and not allowed:
+            add("ROBOTS_BLOCKING_INDEXABLE", url_id, {})
+        if indexable and allowed and report.sitemap_found and not in_sitemap:
+            add("SITEMAP_URL_MISSING", url_id, {})
+
+    return issues
+
+
+# -------------------------------------------------------------------
+# REGLAS DE TEXTO DE URL / CODIFICACIÓN (EN PARALELO, url_rules.py)
+# -------------------------------------------------------------------
+
+def generate_url_text_issues(
+    db: Session, crawl: models.Crawl, issue_type_ids: Dict[str, int]
+) -> List[dict]:
+    """
+    URL_TOO_LONG, URL_TOO_MANY_PARAMS, URL_SPECIAL_CHARS, URL_UPPERCASE,
+    URL_UNDERSCORES, HTTP_ON_HTTPS_SITE y CHARSET_ISSUES, con una máscara de
+    bits por URL en una sola pasada. En crawls grandes se evalúan por shards
+    en varios procesos (ver url_rules.evaluate_url_text_rules).
+    """
+    rows = (
+        db.query(models.Url.id, models.Url.url, models.Url.title, models.Url.meta_description)
+        .filter(models.Url.crawl_id == crawl.id)
+        .order_by(models.Url.id)
+        .all()
+    )
+    hits = evaluate_url_text_rules([(url, title, meta) for _, url, title, meta in rows])
+    return [
+        _issue_row(crawl, rows[index].id, issue_type_ids[code], details)
+        for index, code, details in hits
+    ]
+
+
+# -------------------------------------------------------------------
+# GENERACIÓN DE ISSUES
+# -------------------------------------------------------------------
+
+# Reglas con "condition" en el catálogo, compiladas a INSERT ... SELECT
+# (ValueError al importar si alguna condición no es válida).
+SQL_RULES = compile_rules(DEFAULT_ISSUE_TYPES)
+
+# Conjuntos de reglas que se ejecutan en cada crawl. Cada función recibe
+# (db, crawl, issue_type_ids) y devuelve filas listas para insertar en `issues`.
+RULE_SETS: List[Callable[[Session, models.Crawl, Dict[str, int]], List[dict]]] = [
+    generate_performance_issues,
+    generate_link_issues,
+    generate_chain_issues,
+    generate_sitemap_issues,
+    generate_url_text_issues,
+]
+
+
+def rule_thresholds_of(crawl: models.Crawl) -> Dict[str, Dict[str, float]]:
+    """
+    Umbrales por proyecto con los que se lanzó el crawl (copia de la
+    configuración en Crawl.config).
+    """
+    config = json.loads(crawl.config) if crawl.config else {}
+    return config.get("rule_thresholds") or {}
+
+
+def generate_issues_for_crawl(db: Session, crawl: models.Crawl) -> int:
+    """
+    Ejecuta todos los RULE_SETS sobre el crawl y guarda los issues con una única
+    inserción masiva, y después las SQL_RULES directamente en la BD (una
+    sentencia INSERT ... SELECT por regla). Devuelve el número de issues creados.
+    """
+    catalog = issue_type_catalog(db)
+    issue_type_ids = {code: it["id"] for code, it in catalog.items()}
+    severity_of = {it["id"]: it["severity"] for it in catalog.values()}
+
+    rows: List[dict] = []
+    by_severity: Dict[str, int] = {}
+    for rule_set in RULE_SETS:
+        found = rule_set(db, crawl, issue_type_ids)
+        rows.extend(found)
+        # Totales parciales para el stream de progreso (GET /crawls/{id}/events)
+        for row in found:
+            severity = severity_of[row["issue_type_id"]]
+            by_severity[severity] = by_severity.get(severity, 0) + 1
+        publish("issues", rule_set=rule_set.__name__, issues=len(rows), by_severity=dict(by_severity))
+
+    # Huella estable para arrastrar el estado entre crawls (issue_lifecycle.py)
+    assign_fingerprints(db, crawl, rows, {id_: code for code, id_ in issue_type_ids.items()})
+    if rows:
+        db.bulk_insert_mappings(models.Issue, rows)
+
+    total = len(rows)
+    for code, count in run_sql_rules(db, crawl, SQL_RULES, issue_type_ids, rule_thresholds_of(crawl)):
+        if count:
+            severity = catalog[code]["severity"]
+            by_severity[severity] = by_severity.get(severity, 0) + count
+            total += count
+    publish("issues", rule_set="sql_rules", issues=total, by_severity=dict(by_severity))
+    fill_fingerprints(db, crawl, {id_: code for code, id_ in issue_type_ids.items()})
+    db.commit()
+    return total
+
+
+# -------------------------------------------------------------------
+# SITE HEALTH
+# -------------------------------------------------------------------
+# penalización = suma de pesos de severidad de los issues abiertos
+# health = 100 / (1 + penalización / (nº URLs x SITE_HEALTH_SCALE))
 #
-# Mantengo estos fuera por claridad, para que los conectes con el
-# esquema real de datos y métricas que ya estás definiendo con DataForSEO + PSI.
+# Con SITE_HEALTH_SCALE = 10, una media de un issue crítico abierto por URL deja
+# el sitio en 50%. La penalización y el nº de URLs se guardan en el Crawl, de
+# modo que al cerrar o reabrir un issue basta con sumar/restar su peso.
+
+SITE_HEALTH_SCALE = 10.0
+
+
+def issue_is_open(status: Optional[str], implemented: Optional[bool]) -> bool:
+    return status != "done" and not implemented
+
+
+def _open_issue_filter():
+    return (models.Issue.status != "done") & (models.Issue.implemented.isnot(True))
+
+
+def _health_expr(penalty, url_count):
+    urls = case((url_count > 0, url_count), else_=1)
+    return 100.0 / (1.0 + penalty / (urls * SITE_HEALTH_SCALE))
+
+
+def site_health_from(penalty: float, url_count: int) -> float:
+    return 100.0 / (1.0 + penalty / (max(url_count, 1) * SITE_HEALTH_SCALE))
+
+
+def compute_site_health(db: Session, crawl: models.Crawl) -> float:
+    """
+    Recalcula penalización y Site Health del crawl con agregados SQL y los
+    guarda en el Crawl (sin commit). Devuelve el Site Health.
+    """
+    penalty = (
+        db.query(func.coalesce(func.sum(severity_weight()), 0.0))
+        .select_from(models.Issue)
+        .join(models.IssueType, models.IssueType.id == models.Issue.issue_type_id)
+        .filter(models.Issue.crawl_id == crawl.id, _open_issue_filter())
+        .scalar()
+    )
+    url_count = db.query(func.count(models.Url.id)).filter(models.Url.crawl_id == crawl.id).scalar()
+
+    crawl.health_penalty = float(penalty or 0.0)
+    crawl.url_count = url_count or 0
+    crawl.site_health = site_health_from(crawl.health_penalty, crawl.url_count)
+    return crawl.site_health
+
+
+def apply_issue_health_change(db: Session, issue: models.Issue, was_open: bool) -> None:
+    """
+    Actualización incremental tras cambiar el estado de un issue: suma o resta
+    su peso a la penalización del crawl en un único UPDATE atómico (sin commit).
+    """
+    is_open = issue_is_open(issue.status, issue.implemented)
+    if is_open == was_open:
+        return
+
+    weight = SEVERITY_WEIGHTS.get(issue.issue_type.severity, 1.0)
+    delta = weight if is_open else -weight
+    new_penalty = func.coalesce(models.Crawl.health_penalty, 0.0) + delta
+    db.query(models.Crawl).filter(models.Crawl.id == issue.crawl_id).update(
+        {
+            models.Crawl.health_penalty: new_penalty,
+            models.Crawl.site_health: _health_expr(new_penalty, func.coalesce(models.Crawl.url_count, 0)),
+        },
+        synchronize_session=False,
+    )
+    # El rollup de tendencias refleja también el health actual del crawl
+    db.query(models.CrawlRollup).filter(models.CrawlRollup.crawl_id == issue.crawl_id).update(
+        {
+            models.CrawlRollup.site_health: (
+                db.query(models.Crawl.site_health)
+                .filter(models.Crawl.id == issue.crawl_id)
+                .scalar_subquery()
+            ),
+        },
+        synchronize_session=False,
+    )
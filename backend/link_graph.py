@@ -0,0 +1,282 @@
+# backend/link_graph.py
+import os
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import LINK_GRAPH_DIR
+from .payloads import OnPageLink
+from .url_norm import url_key
+
+"""
+Grafo de enlaces internos de un crawl en formato CSR (compressed sparse row).
+
+Guardar millones de enlaces como filas ORM sería demasiado lento. En su lugar:
+- cada URL normalizada del crawl es un nodo entero 0..n-1 (en orden de Url.id);
+  si varias filas Url comparten URL normalizada ("/a" y "/a?utm_source=x"), el
+  nodo es la primera y las demás quedan como alias de ese nodo; los enlaces
+  internos hacia URLs no rastreadas añaden nodos extra con url_id = -1;
+- los enlaces internos se guardan como arrays indptr/indices (CSR) + un flag
+  por arista de "roto" según DataForSEO;
+- los enlaces externos sólo se cuentan por nodo (total y rotos).
+
+El grafo se persiste en LINK_GRAPH_DIR/crawl_<id>.npz y todas las métricas
+(profundidad BFS desde la home, grado de entrada/salida, destinos con error)
+se calculan con operaciones vectorizadas de numpy.
+"""
+
+
+@dataclass
+class LinkGraph:
+    url_ids: np.ndarray          # int64[n]: Url.id de cada nodo (-1 si no rastreada)
+    status: np.ndarray           # int16[n]: status_code de cada nodo (0 desconocido)
+    indptr: np.ndarray           # int64[n + 1]
+    indices: np.ndarray          # int32[m]: nodo destino de cada arista
+    broken: np.ndarray           # bool[m]: DataForSEO marcó el enlace como roto
+    external_out: np.ndarray     # int32[n]: nº de enlaces externos por nodo
+    external_broken: np.ndarray  # int32[n]: nº de enlaces externos rotos por nodo
+    home: int                    # nodo de la home (-1 si no se encontró)
+    # Filas Url con la misma URL normalizada que un nodo (Url.id, nodo)
+    alias_url_ids: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    alias_nodes: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int32))
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.url_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def in_degree(self) -> np.ndarray:
+        """
+        Enlaces internos recibidos, sin contar los autoenlaces.
+        """
+        sources = self.edge_sources()
+        not_self = sources != self.indices
+        return np.bincount(self.indices[not_self], minlength=self.num_nodes)
+
+    def edge_sources(self) -> np.ndarray:
+        return np.repeat(np.arange(self.num_nodes, dtype=np.int32), self.out_degree())
+
+    def error_edges(self) -> np.ndarray:
+        """
+        Máscara de aristas cuyo destino responde 4xx/5xx o que DataForSEO marcó rotas.
+        """
+        return (self.status[self.indices] >= 400) | self.broken
+
+    def bfs_depth(self, source: Optional[int] = None) -> np.ndarray:
+        """
+        Profundidad en clics desde `source` (la home por defecto). -1 = inalcanzable.
+        Cada nivel expande toda la frontera de una vez con operaciones vectorizadas.
+        """
+        source = self.home if source is None else source
+        depth = np.full(self.num_nodes, -1, dtype=np.int32)
+        if source < 0:
+            return depth
+
+        depth[source] = 0
+        frontier = np.array([source], dtype=np.int64)
+        level = 0
+        while frontier.size:
+            level += 1
+            starts = self.indptr[frontier]
+            lengths = self.indptr[frontier + 1] - starts
+            total = int(lengths.sum())
+            if total == 0:
+                break
+            # Índices de aristas de todos los nodos de la frontera, sin bucle Python.
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+            neighbours = self.indices[offsets + np.arange(total)]
+            neighbours = np.unique(neighbours[depth[neighbours] == -1])
+            depth[neighbours] = level
+            frontier = neighbours.astype(np.int64)
+        return depth
+
+
+# -------------------------------------------------------------------
+# CONSTRUCCIÓN DESDE DATAFORSEO
+# -------------------------------------------------------------------
+
+def find_home(urls: List[str]) -> int:
+    """
+    Índice de la home en `urls` (ruta / sin query); si no está, la URL más corta. -1 si vacía.
+    """
+    best, best_len = -1, None
+    for node, url in enumerate(urls):
+        parts = urlsplit(url)
+        if parts.path in ("", "/") and not parts.query:
+            return node
+        if best_len is None or len(url) < best_len:
+            best, best_len = node, len(url)
+    return best
+
+
+def build_link_graph(
+    url_rows: Iterable[tuple],
+    link_batches: Iterable[List[OnPageLink]],
+) -> LinkGraph:
+    """
+    Construye el grafo a partir de (Url.id, url, url_hash, status_code) del crawl
+    y de los lotes de enlaces de DataForSEO (DataForSEOClient.iter_links).
+    Los nodos se identifican por el hash de la URL normalizada (url_norm.py), así
+    que "/a", "/a/" o "/a?utm_source=x" son el mismo nodo.
+    """
+    url_ids = array("q")
+    status = array("h")
+    urls: List[str] = []
+    node_of: Dict[int, int] = {}
+    alias_url_ids = array("q")
+    alias_nodes = array("i")
+    for url_id, url, key, status_code in url_rows:
+        node = node_of.setdefault(key if key is not None else url_key(url), len(urls))
+        if node < len(urls):
+            # Misma URL normalizada que una fila anterior: un solo nodo para ambas
+            alias_url_ids.append(url_id)
+            alias_nodes.append(node)
+            continue
+        urls.append(url)
+        url_ids.append(url_id)
+        status.append(status_code or 0)
+
+    # Los mismos destinos (menú, footer) se repiten en casi todas las páginas:
+    # se normaliza cada cadena distinta una sola vez.
+    key_cache: Dict[str, int] = {}
+
+    def key_of(raw: str) -> int:
+        key = key_cache.get(raw)
+        if key is None:
+            key = key_cache[raw] = url_key(raw)
+        return key
+
+    home = find_home(urls)
+    src = array("i")
+    dst = array("i")
+    broken = array("b")
+    external_out: Dict[int, int] = {}
+    external_broken: Dict[int, int] = {}
+
+    for batch in link_batches:
+        for link in batch:
+            if link.type not in (None, "anchor") or not link.link_from or not link.link_to:
+                continue
+            s = node_of.get(key_of(link.link_from))
+            if s is None:
+                continue
+
+            if link.direction == "external":
+                external_out[s] = external_out.get(s, 0) + 1
+                if link.is_broken:
+                    external_broken[s] = external_broken.get(s, 0) + 1
+                continue
+
+            target = key_of(link.link_to)
+            d = node_of.get(target)
+            if d is None:
+                # Destino interno no rastreado: nodo extra sin Url asociada.
+                d = node_of[target] = len(urls)
+                urls.append(link.link_to)
+                url_ids.append(-1)
+                status.append(0)
+            src.append(s)
+            dst.append(d)
+            broken.append(1 if link.is_broken else 0)
+
+    n = len(urls)
+    src_np = np.frombuffer(src, dtype=np.int32) if len(src) else np.zeros(0, dtype=np.int32)
+    dst_np = np.frombuffer(dst, dtype=np.int32) if len(dst) else np.zeros(0, dtype=np.int32)
+    broken_np = np.frombuffer(broken, dtype=np.int8).astype(bool) if len(broken) else np.zeros(0, dtype=bool)
+
+    order = np.argsort(src_np, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src_np, minlength=n), out=indptr[1:])
+
+    ext_out = np.zeros(n, dtype=np.int32)
+    ext_broken = np.zeros(n, dtype=np.int32)
+    for node, count in external_out.items():
+        ext_out[node] = count
+    for node, count in external_broken.items():
+        ext_broken[node] = count
+
+    return LinkGraph(
+        url_ids=np.frombuffer(url_ids, dtype=np.int64).copy(),
+        status=np.frombuffer(status, dtype=np.int16).copy(),
+        indptr=indptr,
+        indices=dst_np[order],
+        broken=broken_np[order],
+        external_out=ext_out,
+        external_broken=ext_broken,
+        home=home,
+        alias_url_ids=np.frombuffer(alias_url_ids, dtype=np.int64).copy(),
+        alias_nodes=np.frombuffer(alias_nodes, dtype=np.int32).copy(),
+    )
+
+
+# -------------------------------------------------------------------
+# PERSISTENCIA
+# -------------------------------------------------------------------
+
+def graph_path(crawl_id: int) -> str:
+    return os.path.join(LINK_GRAPH_DIR, f"crawl_{crawl_id}.npz")
+
+
+def save_link_graph(crawl_id: int, graph: LinkGraph) -> str:
+    os.makedirs(LINK_GRAPH_DIR, exist_ok=True)
+    path = graph_path(crawl_id)
+    np.savez_compressed(
+        path,
+        url_ids=graph.url_ids,
+        status=graph.status,
+        indptr=graph.indptr,
+        indices=graph.indices,
+        broken=graph.broken,
+        external_out=graph.external_out,
+        external_broken=graph.external_broken,
+        home=np.array([graph.home]),
+        alias_url_ids=graph.alias_url_ids,
+        alias_nodes=graph.alias_nodes,
+    )
+    return path
+
+
+def load_link_graph(crawl_id: int) -> Optional[LinkGraph]:
+    path = graph_path(crawl_id)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return LinkGraph(
+            url_ids=data["url_ids"],
+            status=data["status"],
+            indptr=data["indptr"],
+            indices=data["indices"],
+            broken=data["broken"],
+            external_out=data["external_out"],
+            external_broken=data["external_broken"],
+            home=int(data["home"][0]),
+            # Grafos guardados antes de los alias no los tienen
+            alias_url_ids=data["alias_url_ids"] if "alias_url_ids" in data else np.zeros(0, dtype=np.int64),
+            alias_nodes=data["alias_nodes"] if "alias_nodes" in data else np.zeros(0, dtype=np.int32),
+        )
+
+
+def ingest_link_graph(db: Session, crawl: models.Crawl, link_batches: Iterable[List[OnPageLink]]) -> LinkGraph:
+    """
+    Construye y guarda el grafo de enlaces del crawl.
+    """
+    url_rows = (
+        db.query(models.Url.id, models.Url.url, models.Url.url_hash, models.Url.status_code)
+        .filter(models.Url.crawl_id == crawl.id)
+        .order_by(models.Url.id)
+        .all()
+    )
+    graph = build_link_graph(url_rows, link_batches)
+    save_link_graph(crawl.id, graph)
+    return graph
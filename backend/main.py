@@ -1,8 +1,14 @@
 # backend/main.py
-from datetime import datetime
-from typing import List, Dict
-
-from fastapi import FastAPI, Depends, HTTPException
+import json
+import os
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+
+import orjson
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
@@ -10,10 +16,39 @@ from .db import Base, engine, SessionLocal
 from . import models, schemas, crud
 from .dataforseo_client import DataForSEOClient
 from .pagespeed_client import fetch_pagespeed, extract_performance_metrics
-from .issues_logic import ensure_issue_types, generate_issues_for_crawl, compute_site_health
+from .payloads import OnPageMeta, OnPageContent
+from .psi_sampling import template_key, measure_sampled
+from .link_graph import ingest_link_graph
+from .pagerank import store_pagerank
+from .sitemap import analyze_site_files, save_report as save_sitemap_report
+from .rollups import build_crawl_rollup, load_trends
+from .issue_lifecycle import CHANGE_KINDS, carry_over_issues, crawl_diff, previous_crawl
+from .metrics import COALESCED_REQUESTS, crawl_run, instrument_engine, render_latest, stage
+from .cache import SingleFlight, cache
+from .http_cache import cached_crawl_response, coalesced_read, invalidate_crawl
+from .tracing import crawl_trace, profile_path, profiled, trace_path
+from .events import crawl_events, publish, stream_crawl_events
+from .export import EXPORT_FORMATS, parquet_available, stream_crawl_export
+from .url_norm import intern_urls, normalize_domain
+from .retention import MaintenanceJob, ensure_crawl_partitions, ensure_default_partitions, run_maintenance
+from .serialization import (
+    CRAWL_COLUMNS, CRAWL_KEYS, ISSUE_COLUMNS,
+    rows_to_dicts, issue_rows_to_dicts,
+)
+from .config import CRAWL_STALE_AFTER_MINUTES, SSE_POLL_SECONDS
+from .crawl_config import (
+    config_to_dict, estimate_crawl, get_crawl_config, psi_samples_of, strategies_of,
+    update_crawl_config, url_filter,
+)
+from .issues_logic import (
+    ensure_issue_types, generate_issues_for_crawl, compute_site_health,
+    apply_issue_health_change, issue_is_open, issue_type_catalog, severity_weight,
+)
 
 # Crear tablas
 Base.metadata.create_all(bind=engine)
+# Duración y nº de consultas SQL en /metrics
+instrument_engine(engine)
 
 app = FastAPI(
     title="SEO Auditor - DataForSEO + PageSpeed",
@@ -34,15 +69,25 @@ def get_db():
 
 
 # -------------------------------------------------------------------
-# STARTUP: asegurar catálogo de issues
+# STARTUP: asegurar catálogo de issues, particiones y job de mantenimiento
 # -------------------------------------------------------------------
+maintenance_job = MaintenanceJob(SessionLocal)
+
+
 @app.on_event("startup")
 def startup_event():
     db = SessionLocal()
     try:
         ensure_issue_types(db)
+        ensure_default_partitions(db)
     finally:
         db.close()
+    maintenance_job.start()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    maintenance_job.stop()
 
 
 # -------------------------------------------------------------------
@@ -53,7 +98,11 @@ def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)
     """
     Crear un proyecto (dominio).
     """
-    existing = db.query(models.Project).filter_by(domain=project.domain).first()
+    try:
+        domain = normalize_domain(project.domain)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    existing = db.query(models.Project).filter_by(domain=domain).first()
     if existing:
         raise HTTPException(status_code=400, detail="Domain already exists")
 
@@ -79,120 +128,419 @@ def get_project_detail(project_id: int, db: Session = Depends(get_db)):
     return project
 
 
+# -------------------------------------------------------------------
+# CONFIGURACIÓN DE CRAWL DEL PROYECTO
+# -------------------------------------------------------------------
+@app.get("/projects/{project_id}/crawl-config", response_model=schemas.CrawlConfigOut)
+def get_project_crawl_config(project_id: int, db: Session = Depends(get_db)):
+    """
+    Configuración de crawl del proyecto (los valores por defecto si no se ha tocado).
+    """
+    project = crud.get_project(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return config_to_dict(get_crawl_config(db, project.id))
+
+
+@app.patch("/projects/{project_id}/crawl-config", response_model=schemas.CrawlConfigOut)
+def update_project_crawl_config(
+    project_id: int, payload: schemas.CrawlConfigUpdate, db: Session = Depends(get_db)
+):
+    """
+    Cambia la configuración de crawl; sólo se aplican los campos enviados.
+    """
+    project = crud.get_project(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    try:
+        config = update_crawl_config(db, project.id, payload.dict(exclude_unset=True))
+    except ValueError as exc:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(exc))
+    return config_to_dict(config)
+
+
+@app.get("/projects/{project_id}/crawl-estimate", response_model=schemas.CrawlEstimate)
+def get_project_crawl_estimate(project_id: int, db: Session = Depends(get_db)):
+    """
+    Coste y duración esperados del próximo crawl con la configuración actual.
+    """
+    project = crud.get_project(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return estimate_crawl(db, project.id, get_crawl_config(db, project.id))
+
+
 # -------------------------------------------------------------------
 # CRAWL – EJECUCIÓN COMPLETA (DataForSEO + PageSpeed + Issues + Site Health)
 # -------------------------------------------------------------------
+# Crawls lanzados desde este proceso, por proyecto (dedup de peticiones simultáneas)
+crawl_flights = SingleFlight()
+
+
 @app.post("/projects/{project_id}/crawl", response_model=schemas.CrawlOut)
-def run_crawl(project_id: int, db: Session = Depends(get_db)):
+def run_crawl(
+    project_id: int,
+    profile: bool = False,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: Session = Depends(get_db),
+):
     """
     Ejecuta un crawl completo:
     1) Crea tarea en DataForSEO On-Page.
-    2) Espera resultados y guarda URLs.
-    3) Llama a PageSpeed por URL (estrategia mobile).
-    4) Genera issues (issues_logic.generate_issues_for_crawl).
-    5) Calcula Site Health.
+    2) Espera resultados y guarda URLs, el grafo de enlaces internos y el PageRank interno.
+       Analiza robots.txt y los sitemaps del dominio.
+    3) Llama a PageSpeed sobre URLs representativas de cada plantilla (estrategias de
+       la configuración del proyecto) y proyecta las métricas al resto de URLs de la plantilla.
+    4) Genera issues (issues_logic.generate_issues_for_crawl) y arrastra el estado
+       de los que persisten desde el crawl anterior (issue_lifecycle.py).
+    5) Calcula Site Health y guarda los rollups del crawl (tendencias).
+
+    Las opciones de DataForSEO, el muestreo PSI y los filtros de URLs salen de la
+    configuración de crawl del proyecto (crawl_config.py); el coste y la duración
+    estimados se guardan en el crawl antes de empezar.
+
+    Nunca hay dos crawls del mismo proyecto a la vez: si ya hay uno en curso se
+    devuelve ese (esperando a que termine si lo lanzó este mismo proceso). Con
+    la cabecera Idempotency-Key, repetir la petición devuelve siempre el crawl
+    que creó (o al que se unió) la primera, aunque ya haya terminado.
+
+    Cada etapa y llamada externa queda como span en la traza del crawl
+    (GET /crawls/{id}/trace). Con ?profile=1 se perfilan la ingesta y el motor
+    de reglas con cProfile (GET /crawls/{id}/profile).
     """
     project = crud.get_project(db, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    # 1. Crear registro de Crawl
-    crawl = models.Crawl(project_id=project.id, status="running")
+    flight_key = f"project:{project.id}"
+    if idempotency_key:
+        existing = crud.get_crawl_by_idempotency_key(db, project.id, idempotency_key)
+        if existing:
+            COALESCED_REQUESTS.labels("crawl", "idempotency_key").inc()
+            crawl_flights.wait(flight_key)
+            db.refresh(existing)
+            return existing
+
+    crawl_id, leader = crawl_flights.do(
+        flight_key, lambda: _start_crawl(db, project, idempotency_key, profile)
+    )
+    if not leader:
+        COALESCED_REQUESTS.labels("crawl", "in_flight").inc()
+    crawl = crud.get_crawl(db, crawl_id)
+    if idempotency_key and crawl.idempotency_key != idempotency_key:
+        # Se unió al crawl de otra petición: un reintento con su clave debe devolver éste
+        crud.add_crawl_idempotency_key(db, crawl, idempotency_key)
+    return crawl
+
+
+def _start_crawl(
+    db: Session, project: models.Project, idempotency_key: Optional[str], profile: bool
+) -> int:
+    """
+    Reserva el crawl del proyecto y lo ejecuta. Si otro worker ya tiene uno en
+    curso (o acaba de crear el de esta Idempotency-Key) devuelve su id sin
+    repetir nada; el índice único parcial de crawls resuelve la carrera.
+    """
+    stale_after = timedelta(minutes=CRAWL_STALE_AFTER_MINUTES)
+    running = crud.get_running_crawl(db, project.id, stale_after)
+    if running:
+        COALESCED_REQUESTS.labels("crawl", "in_flight").inc()
+        return running.id
+
+    # 1. Crear registro de Crawl con la configuración del proyecto y su estimación
+    config = get_crawl_config(db, project.id)
+    estimate = estimate_crawl(db, project.id, config)
+    crawl = models.Crawl(
+        project_id=project.id,
+        status="running",
+        idempotency_key=idempotency_key,
+        config=json.dumps(config_to_dict(config)),
+        estimated_cost_usd=estimate["cost_usd"],
+        estimated_duration_s=estimate["duration_s"],
+    )
     db.add(crawl)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        other = (idempotency_key and crud.get_crawl_by_idempotency_key(db, project.id, idempotency_key)) \
+            or crud.get_running_crawl(db, project.id, stale_after)
+        if other is None:
+            raise
+        COALESCED_REQUESTS.labels("crawl", "in_flight").inc()
+        return other.id
     db.refresh(crawl)
+    ensure_crawl_partitions(db, crawl.id)
+
+    with crawl_run(), crawl_trace(crawl.id, profile=profile), crawl_events(crawl.id):
+        publish("status", **_crawl_status(crawl))
+        publish("estimate", **estimate)
+        try:
+            _run_crawl_pipeline(db, project, crawl, config)
+        except Exception:
+            db.rollback()
+            crawl.status = "failed"
+            crawl.finished_at = datetime.utcnow()
+            db.commit()
+            _publish_final_status(crawl)
+            raise
+        _publish_final_status(crawl)
+
+    return crawl.id
+
+
+def _publish_final_status(crawl: models.Crawl) -> None:
+    publish("status", **_crawl_status(crawl))
+    # Quien sondea el estado (ver stream_crawl_progress) lo ve ya, sin esperar al TTL
+    cache.delete("crawl_status", str(crawl.id))
+
+
+def _crawl_status(crawl: models.Crawl) -> dict:
+    return {
+        "crawl_id": crawl.id,
+        "status": crawl.status,
+        "site_health": crawl.site_health,
+        "started_at": crawl.started_at,
+        "finished_at": crawl.finished_at,
+    }
+
 
+def _run_crawl_pipeline(
+    db: Session, project: models.Project, crawl: models.Crawl, config: models.CrawlConfig
+) -> None:
+    """
+    Etapas 2-7 de run_crawl; cada una se mide en seo_crawl_stage_seconds (ver metrics.py).
+    """
     # 2. DataForSEO – crear y ejecutar tarea
-    df_client = DataForSEOClient()
-    task_id = df_client.create_onpage_task(project.domain)
-    crawl.dataforseo_task_id = task_id
-    db.commit()
+    with stage("dataforseo_task"):
+        df_client = DataForSEOClient()
+        task_id = df_client.create_onpage_task(
+            project.domain,
+            max_pages=config.max_pages,
+            enable_javascript=bool(config.enable_javascript),
+            load_resources=bool(config.load_resources),
+        )
+        crawl.dataforseo_task_id = task_id
+        db.commit()
 
     # Esperar resultados
-    results = df_client.wait_for_task_and_get_results(task_id)
+    with stage("dataforseo_wait"):
+        results = df_client.wait_for_task_and_get_results(task_id)
 
     # 3. Mapear resultados -> tabla Url
     # NOTA: adapta los campos a la respuesta real de DataForSEO On-Page
-    for r in results:
-        page_url = r.get("url")
-        status_code = r.get("status_code")
-        meta = r.get("meta", {}) or {}
-        content = r.get("content", {}) or {}
-
-        title = meta.get("title")
-        meta_description = meta.get("description")
-        word_count = content.get("word_count")
-
-        url_obj = models.Url(
-            crawl_id=crawl.id,
-            url=page_url,
-            status_code=status_code,
-            title=title,
-            title_length=len(title) if title else None,
-            meta_description=meta_description,
-            meta_description_length=len(meta_description) if meta_description else None,
-            word_count=word_count,
-        )
-        db.add(url_obj)
+    with stage("ingest_urls"), profiled():
+        keep = url_filter(config)
+        url_objs = []
+        for r in results:
+            page_url = r.url
+            if keep is not None and page_url and not keep(page_url):
+                continue
+            status_code = r.status_code
+            meta = r.meta or OnPageMeta()
+            content = r.content or OnPageContent()
+
+            title = meta.title
+            meta_description = meta.description
+            word_count = content.word_count
+
+            url_obj = models.Url(
+                crawl_id=crawl.id,
+                url=page_url,
+                status_code=status_code,
+                title=title,
+                title_length=len(title) if title else None,
+                meta_description=meta_description,
+                meta_description_length=len(meta_description) if meta_description else None,
+                word_count=word_count,
+                redirect_url=r.location,
+                canonical_url=meta.canonical,
+                template_key=template_key(page_url, r) if page_url else None,
+            )
+            url_objs.append(url_obj)
+
+        # Cada URL se asocia a su clave normalizada del proyecto (id estable entre crawls)
+        url_keys = intern_urls(db, project.id, [u.url for u in url_objs if u.url])
+        for u in url_objs:
+            key = url_keys.get(u.url)
+            if key is not None:
+                u.url_key_id = key.id
+                u.url_hash = key.url_hash
+        db.add_all(url_objs)
+        db.commit()
+
+    # 3b. Grafo de enlaces internos (CSR en disco, ver link_graph.py)
+    with stage("link_graph"):
+        link_graph = ingest_link_graph(db, crawl, df_client.iter_links(task_id))
+    with stage("pagerank"):
+        store_pagerank(db, link_graph)
+
+    # 3c. robots.txt + sitemaps (informe en disco, ver sitemap.py)
+    with stage("site_files"):
+        save_sitemap_report(crawl.id, analyze_site_files(project.domain))
+
+    # 4. PageSpeed – muestreo por plantilla
+    # Sólo se miden psi_samples_per_template URLs por plantilla; el resto recibe
+    # la mediana del grupo marcada como estimada (Url.psi_estimated).
+    # LCP / CLS / TBT y auditorías salen de la primera estrategia configurada.
+    with stage("pagespeed"):
+        urls = db.query(models.Url).filter_by(crawl_id=crawl.id).all()
+        strategies = strategies_of(config)
+
+        def measure(url: str):
+            perf: Dict = {}
+            for strategy in strategies:
+                metrics = extract_performance_metrics(fetch_pagespeed(url, strategy=strategy))
+                score = metrics.pop("performance_score")
+                if not perf:
+                    perf = metrics
+                perf["performance_score" if strategy == "mobile" else "performance_score_desktop"] = score
+            return perf
+
+        def cluster_done(stats: Dict[str, int]) -> None:
+            db.commit()
+            publish("psi", **stats)
 
-    db.commit()
+        measure_sampled(urls, measure, psi_samples_of(config), on_cluster_done=cluster_done)
+        db.commit()
 
-    # 4. PageSpeed – performance por URL (mobile en MVP)
-    urls = db.query(models.Url).filter_by(crawl_id=crawl.id).all()
-    for u in urls:
-        # Puedes limitar el número de URLs por crawl para controlar cuotas/costos.
-        try:
-            psi = fetch_pagespeed(u.url, strategy="mobile")
-            perf = extract_performance_metrics(psi)
+    # 5. Generar issues a partir de datos de Url + PSI y arrastrar el estado
+    #    (status / implemented / comment) de los issues que ya existían en el crawl anterior
+    with stage("rules"), profiled():
+        generate_issues_for_crawl(db, crawl)
+    with stage("carry_over"):
+        carry_over_issues(db, crawl, previous_crawl(db, crawl))
 
-            u.performance_score_mobile = perf.get("performance_score")
-            u.lcp = perf.get("lcp")
-            u.cls = perf.get("cls")
-            u.tbt = perf.get("tbt")
+    # 6. Calcular Site Health
+    with stage("site_health"):
+        site_health = compute_site_health(db, crawl)
+        crawl.site_health = site_health
+        crawl.status = "finished"
+        crawl.finished_at = datetime.utcnow()
+        db.commit()
 
-            db.add(u)
-            db.commit()
-        except Exception:
-            # Si PSI falla, seguimos. Puedes loguear el error en la práctica.
-            continue
+    # 7. Rollup del crawl para GET /projects/{id}/trends
+    with stage("rollup"):
+        build_crawl_rollup(db, crawl)
 
-    # 5. Generar issues a partir de datos de Url + PSI
-    generate_issues_for_crawl(db, crawl)
 
-    # 6. Calcular Site Health
-    site_health = compute_site_health(db, crawl)
-    crawl.site_health = site_health
-    crawl.status = "finished"
-    crawl.finished_at = datetime.utcnow()
-    db.commit()
-    db.refresh(crawl)
+# -------------------------------------------------------------------
+# PROGRESO EN VIVO (SERVER-SENT EVENTS)
+# -------------------------------------------------------------------
+@app.get("/crawls/{crawl_id}/events")
+async def stream_crawl_progress(
+    crawl_id: int,
+    request: Request,
+    last_event_id: Optional[int] = Header(None),
+):
+    """
+    Stream text/event-stream con el progreso del crawl (ver events.py):
+    eventos stage, psi, issues y status, y "end" cuando termina.
+    Sustituye al sondeo de GET /crawls: los eventos salen del pipeline sin
+    consultar la BD por cada espectador.
+    """
+    def load_status() -> Optional[dict]:
+        # Compartido entre espectadores (y workers con caché compartida) durante SSE_POLL_SECONDS
+        def load() -> bytes:
+            db = SessionLocal()
+            try:
+                crawl = crud.get_crawl(db, crawl_id)
+                return orjson.dumps(_crawl_status(crawl) if crawl else None)
+            finally:
+                db.close()
+
+        return orjson.loads(cache.get_or_load("crawl_status", str(crawl_id), load, SSE_POLL_SECONDS))
+
+    async def load_status_async() -> Optional[dict]:
+        return await run_in_threadpool(load_status)
+
+    if await load_status_async() is None:
+        raise HTTPException(status_code=404, detail="Crawl not found")
+
+    return StreamingResponse(
+        stream_crawl_events(crawl_id, last_event_id or 0, request.is_disconnected, load_status_async),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
+# -------------------------------------------------------------------
+# TRAZAS Y PERFILES DE UN CRAWL
+# -------------------------------------------------------------------
+@app.get("/crawls/{crawl_id}/trace")
+def download_crawl_trace(crawl_id: int):
+    """
+    Spans del crawl en JSON Lines (uno por línea, ver tracing.py).
+    """
+    path = trace_path(crawl_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No trace for this crawl")
+    return FileResponse(path, media_type="application/x-ndjson", filename=f"crawl_{crawl_id}_trace.jsonl")
+
+
+@app.get("/crawls/{crawl_id}/profile")
+def download_crawl_profile(crawl_id: int):
+    """
+    Perfil cProfile (formato pstats) de un crawl lanzado con ?profile=1.
+    Se abre con `python -m pstats` o snakeviz.
+    """
+    path = profile_path(crawl_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No profile for this crawl")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"crawl_{crawl_id}.prof")
+
+
+# -------------------------------------------------------------------
+# MANTENIMIENTO (retención y compactación)
+# -------------------------------------------------------------------
+@app.post("/maintenance/retention", response_model=schemas.MaintenanceReport)
+def run_retention(dry_run: bool = False, db: Session = Depends(get_db)):
+    """
+    Pasada del job de mantenimiento ahora mismo (retention.py): compacta a sus
+    rollups los crawls fuera de la política de retención de cada proyecto.
+    Con ?dry_run=1 sólo devuelve qué crawls se compactarían.
+    """
+    return run_maintenance(db, dry_run=dry_run)
 
-    return crawl
+
+# -------------------------------------------------------------------
+# MÉTRICAS (Prometheus)
+# -------------------------------------------------------------------
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
 
 
 # -------------------------------------------------------------------
 # CRAWLS – LISTAR Y RESUMEN
 # -------------------------------------------------------------------
-@app.get("/projects/{project_id}/crawls", response_model=List[schemas.CrawlOut])
+@app.get(
+    "/projects/{project_id}/crawls",
+    response_model=List[schemas.CrawlOut],
+    response_class=ORJSONResponse,
+)
 def list_crawls(project_id: int, db: Session = Depends(get_db)):
     """
     Lista los crawls de un proyecto.
+    (Serializa directamente tuplas SQL con orjson, ver serialization.py)
     """
     project = crud.get_project(db, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    crawls = (
-        db.query(models.Crawl)
-        .filter_by(project_id=project.id)
+    rows = (
+        db.query(*CRAWL_COLUMNS)
+        .filter(models.Crawl.project_id == project.id)
         .order_by(models.Crawl.started_at.desc())
         .all()
     )
-    return crawls
+    return ORJSONResponse(rows_to_dicts(CRAWL_KEYS, rows))
 
 
 @app.get("/projects/{project_id}/crawls/latest/summary", response_model=schemas.CrawlSummary)
-def get_latest_crawl_summary(project_id: int, db: Session = Depends(get_db)):
+def get_latest_crawl_summary(project_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Devuelve un resumen del último crawl:
     - Site Health
@@ -200,40 +548,72 @@ def get_latest_crawl_summary(project_id: int, db: Session = Depends(get_db)):
     - Conteo de issues total
     - Issues por severidad
     - Issues por categoría
+    Con ETag / 304 y caché en servidor si el crawl está terminado (ver http_cache.py).
     """
     crawl = crud.get_last_crawl_for_project(db, project_id)
     if not crawl:
         raise HTTPException(status_code=404, detail="No crawl found")
 
-    total_urls = db.query(models.Url).filter_by(crawl_id=crawl.id).count()
-    total_issues = db.query(models.Issue).filter_by(crawl_id=crawl.id).count()
+    def build() -> dict:
+        total_urls = db.query(func.count(models.Url.id)).filter(models.Url.crawl_id == crawl.id).scalar()
 
-    issues = db.query(models.Issue).filter_by(crawl_id=crawl.id).all()
+        rows = (
+            db.query(models.IssueType.severity, models.IssueType.category, func.count(models.Issue.id))
+            .join(models.Issue, models.Issue.issue_type_id == models.IssueType.id)
+            .filter(models.Issue.crawl_id == crawl.id)
+            .group_by(models.IssueType.severity, models.IssueType.category)
+            .all()
+        )
+        issues_by_severity: Dict[str, int] = {}
+        issues_by_category: Dict[str, int] = {}
+        for sev, cat, count in rows:
+            issues_by_severity[sev] = issues_by_severity.get(sev, 0) + count
+            issues_by_category[cat] = issues_by_category.get(cat, 0) + count
+
+        return {
+            "crawl": dict(zip(CRAWL_KEYS, (getattr(crawl, key) for key in CRAWL_KEYS))),
+            "total_urls": total_urls,
+            "total_issues": sum(issues_by_severity.values()),
+            "issues_by_severity": issues_by_severity,
+            "issues_by_category": issues_by_category,
+            "site_health": crawl.site_health,
+        }
 
-    issues_by_severity: Dict[str, int] = {}
-    issues_by_category: Dict[str, int] = {}
+    return cached_crawl_response(request, crawl, "summary", build)
 
-    for i in issues:
-        sev = i.issue_type.severity
-        cat = i.issue_type.category
-        issues_by_severity[sev] = issues_by_severity.get(sev, 0) + 1
-        issues_by_category[cat] = issues_by_category.get(cat, 0) + 1
 
-    return schemas.CrawlSummary(
-        crawl=crawl,
-        total_urls=total_urls,
-        total_issues=total_issues,
-        issues_by_severity=issues_by_severity,
-        issues_by_category=issues_by_category,
-        site_health=crawl.site_health,
+@app.get(
+    "/projects/{project_id}/trends",
+    response_model=List[schemas.TrendPoint],
+    response_class=ORJSONResponse,
+)
+def get_project_trends(
+    project_id: int,
+    since: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Evolución entre crawls (Site Health, issues por severidad y tipo, percentiles PSI).
+    Se sirve desde los rollups escritos al terminar cada crawl (ver rollups.py).
+    - since: sólo crawls terminados a partir de esa fecha
+    - limit: sólo los N crawls más recientes
+    """
+    project = crud.get_project(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    points = coalesced_read(
+        f"trends:{project.id}:{since}:{limit}",
+        lambda: load_trends(db, project.id, since=since, limit=limit),
     )
+    return ORJSONResponse(points)
 
 
 # -------------------------------------------------------------------
 # ISSUES – AGRUPADOS POR TIPO Y LISTADO
 # -------------------------------------------------------------------
 @app.get("/crawls/{crawl_id}/issues/by-type")
-def issues_by_type(crawl_id: int, db: Session = Depends(get_db)):
+def issues_by_type(crawl_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Devuelve issues agrupados por tipo para un crawl:
     - code
@@ -241,54 +621,171 @@ def issues_by_type(crawl_id: int, db: Session = Depends(get_db)):
     - severity
     - category
     - count
+    Con ETag / 304 y caché en servidor si el crawl está terminado (ver http_cache.py).
+    """
+    crawl = db.query(models.Crawl).filter_by(id=crawl_id).first()
+    if not crawl:
+        raise HTTPException(status_code=404, detail="Crawl not found")
+
+    def build() -> list:
+        rows = (
+            db.query(
+                models.IssueType.code,
+                models.IssueType.name,
+                models.IssueType.severity,
+                models.IssueType.category,
+                func.count(models.Issue.id).label("count"),
+            )
+            .join(models.Issue, models.Issue.issue_type_id == models.IssueType.id)
+            .filter(models.Issue.crawl_id == crawl_id)
+            .group_by(
+                models.IssueType.code,
+                models.IssueType.name,
+                models.IssueType.severity,
+                models.IssueType.category,
+            )
+            .all()
+        )
+        return rows_to_dicts(("code", "name", "severity", "category", "count"), rows)
+
+    return cached_crawl_response(request, crawl, "issues_by_type", build)
+
+
+# Ordenaciones admitidas en los listados de issues
+ISSUE_SORTS = {
+    "id": (models.Issue.id,),
+    "pagerank": (models.Url.pagerank.is_(None), models.Url.pagerank.desc(), models.Issue.id),
+}
+
+
+@app.get("/crawls/{crawl_id}/issues/queue", response_model=List[schemas.IssueQueueItem])
+def issues_queue(crawl_id: int, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
     """
+    Cola priorizada de issues abiertos del crawl:
+    prioridad = peso de la severidad x PageRank interno de la URL.
+    Los issues de páginas con más equidad de enlaces aparecen primero.
+    """
+    if not db.query(models.Crawl.id).filter(models.Crawl.id == crawl_id).first():
+        raise HTTPException(status_code=404, detail="Crawl not found")
+
+    priority = (severity_weight() * func.coalesce(models.Url.pagerank, 1.0)).label("priority")
+
     rows = (
         db.query(
+            models.Issue.id,
+            models.Issue.url_id,
+            models.Url.url,
             models.IssueType.code,
-            models.IssueType.name,
-            models.IssueType.severity,
-            models.IssueType.category,
-            func.count(models.Issue.id).label("count"),
-        )
-        .join(models.Issue, models.Issue.issue_type_id == models.IssueType.id)
-        .filter(models.Issue.crawl_id == crawl_id)
-        .group_by(
-            models.IssueType.code,
-            models.IssueType.name,
             models.IssueType.severity,
-            models.IssueType.category,
+            models.Issue.status,
+            models.Url.pagerank,
+            priority,
         )
+        .join(models.Url, models.Url.id == models.Issue.url_id)
+        .join(models.IssueType, models.IssueType.id == models.Issue.issue_type_id)
+        .filter(models.Issue.crawl_id == crawl_id, models.Issue.status != "done")
+        .order_by(priority.desc(), models.Issue.id)
+        .limit(limit)
         .all()
     )
-
-    return [
-        {
-            "code": r[0],
-            "name": r[1],
-            "severity": r[2],
-            "category": r[3],
-            "count": r[4],
-        }
-        for r in rows
-    ]
+    return ORJSONResponse(rows_to_dicts(
+        ("id", "url_id", "url", "code", "severity", "status", "pagerank", "priority"), rows,
+    ))
 
 
-@app.get("/crawls/{crawl_id}/issues/{issue_code}", response_model=List[schemas.IssueOut])
-def list_issues_for_type(crawl_id: int, issue_code: str, db: Session = Depends(get_db)):
+@app.get(
+    "/crawls/{crawl_id}/issues/{issue_code}",
+    response_model=List[schemas.IssueOut],
+    response_class=ORJSONResponse,
+)
+def list_issues_for_type(
+    crawl_id: int,
+    issue_code: str,
+    sort: str = "id",
+    db: Session = Depends(get_db),
+):
     """
     Lista todos los issues de un tipo (issue_code) para un crawl,
     pensado para que el frontend muestre la tabla de URLs con checkboxes.
+    - sort: id | pagerank (URLs más importantes primero)
+    (Serializa directamente tuplas SQL con orjson, ver serialization.py)
     """
-    issue_type = db.query(models.IssueType).filter_by(code=issue_code).first()
+    if sort not in ISSUE_SORTS:
+        raise HTTPException(status_code=400, detail="Unsupported sort")
+
+    issue_type = issue_type_catalog(db).get(issue_code)
     if not issue_type:
         raise HTTPException(status_code=404, detail="Issue type not found")
 
-    issues = (
-        db.query(models.Issue)
-        .filter_by(crawl_id=crawl_id, issue_type_id=issue_type.id)
+    rows = (
+        db.query(*ISSUE_COLUMNS)
+        .join(models.Url, models.Url.id == models.Issue.url_id)
+        .filter(
+            models.Issue.crawl_id == crawl_id,
+            models.Issue.issue_type_id == issue_type["id"],
+        )
+        .order_by(*ISSUE_SORTS[sort])
         .all()
     )
-    return issues
+    return ORJSONResponse(issue_rows_to_dicts(rows, issue_type))
+
+
+# -------------------------------------------------------------------
+# ISSUES – DIFF ENTRE CRAWLS (nuevos / persistentes / resueltos)
+# -------------------------------------------------------------------
+@app.get("/crawls/{crawl_id}/diff", response_model=schemas.CrawlDiff, response_class=ORJSONResponse)
+def get_crawl_diff(
+    crawl_id: int,
+    against: Optional[int] = None,
+    change: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    """
+    Compara los issues del crawl con otro del mismo proyecto (por defecto, el
+    anterior terminado): nuevos, persistentes y resueltos, en total y por tipo.
+    - change=new|persisting|resolved: devuelve además los primeros `limit` issues de esa clase
+    """
+    crawl = db.query(models.Crawl).filter_by(id=crawl_id).first()
+    if not crawl:
+        raise HTTPException(status_code=404, detail="Crawl not found")
+    if change is not None and change not in CHANGE_KINDS:
+        raise HTTPException(status_code=400, detail=f"change must be one of: {', '.join(CHANGE_KINDS)}")
+
+    if against is None:
+        previous = previous_crawl(db, crawl)
+    else:
+        previous = db.query(models.Crawl).filter_by(id=against, project_id=crawl.project_id).first()
+    if not previous:
+        raise HTTPException(status_code=404, detail="No previous crawl to compare with")
+
+    return ORJSONResponse(crawl_diff(db, crawl.id, previous.id, change=change, limit=limit))
+
+
+# -------------------------------------------------------------------
+# EXPORT – CRAWL COMPLETO EN STREAMING (CSV / NDJSON / PARQUET)
+# -------------------------------------------------------------------
+@app.get("/crawls/{crawl_id}/export")
+def export_crawl(crawl_id: int, format: str = "csv", db: Session = Depends(get_db)):
+    """
+    Exporta todas las URLs del crawl con sus issues (una fila por URL+issue),
+    en streaming para hojas de cálculo y herramientas BI.
+    - format: csv | ndjson | parquet (parquet requiere pyarrow)
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported export format")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    crawl = db.query(models.Crawl.id).filter(models.Crawl.id == crawl_id).first()
+    if not crawl:
+        raise HTTPException(status_code=404, detail="Crawl not found")
+
+    return StreamingResponse(
+        stream_crawl_export(SessionLocal, crawl_id, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="crawl-{crawl_id}.{format}"'},
+    )
 
 
 # -------------------------------------------------------------------
@@ -324,6 +821,7 @@ def update_issue(issue_id: int, payload: schemas.IssueUpdate, db: Session = Depe
     issue = db.query(models.Issue).filter_by(id=issue_id).first()
     if not issue:
         raise HTTPException(status_code=404, detail="Issue not found")
+    was_open = issue_is_open(issue.status, issue.implemented)
 
     if payload.implemented is not None:
         issue.implemented = payload.implemented
@@ -337,6 +835,17 @@ def update_issue(issue_id: int, payload: schemas.IssueUpdate, db: Session = Depe
         issue.comment = payload.comment
 
     issue.updated_at = datetime.utcnow()
+    # Site Health incremental: sólo cambia si el issue se cierra o se reabre
+    apply_issue_health_change(db, issue, was_open)
+    # Nueva versión de summary / by-type del crawl (ETag y caché, ver http_cache.py)
+    invalidate_crawl(db, issue.crawl_id)
     db.commit()
-    db.refresh(issue)
-    return issue
+
+    # Misma forma que el listado por tipo (incluye el PageRank de la URL)
+    row = (
+        db.query(*ISSUE_COLUMNS)
+        .join(models.Url, models.Url.id == models.Issue.url_id)
+        .filter(models.Issue.id == issue_id)
+        .one()
+    )
+    return issue_rows_to_dicts([row], issue_type_catalog(db)[issue.issue_type.code])[0]
@@ -0,0 +1,202 @@
+# backend/metrics.py
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+import requests
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .events import publish
+from .tracing import span
+
+"""
+Métricas Prometheus del backend (expuestas en GET /metrics).
+
+- seo_crawl_stage_seconds{stage}: duración de cada etapa de run_crawl.
+- seo_external_request_seconds{api, operation}: latencia de DataForSEO / PSI,
+  con errores por clase (seo_external_request_errors_total), 429
+  (seo_external_rate_limited_total) y reintentos de polling
+  (seo_external_retries_total).
+- seo_db_query_seconds{statement}: consultas SQL por tipo, vía eventos de
+  SQLAlchemy (el _count del histograma es el nº de consultas).
+- seo_crawls_in_flight / seo_crawls_total{outcome}.
+- seo_coalesced_requests_total{operation, reason}: peticiones servidas con el
+  resultado de otra idéntica (crawl ya en curso, Idempotency-Key repetida o
+  lectura fusionada con SingleFlight, ver cache.py).
+- seo_retention_compacted_total{method}: job de mantenimiento (retention.py).
+
+Coste en caminos calientes: los hijos etiquetados de cada métrica se resuelven
+una vez y se cachean, así que cada medición es un perf_counter() y un observe().
+"""
+
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+_STAGE_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+
+CRAWL_STAGE_SECONDS = Histogram(
+    "seo_crawl_stage_seconds", "Duración de cada etapa del pipeline de crawl",
+    ["stage"], buckets=_STAGE_BUCKETS,
+)
+CRAWLS_IN_FLIGHT = Gauge("seo_crawls_in_flight", "Crawls en ejecución")
+CRAWLS_TOTAL = Counter("seo_crawls_total", "Crawls terminados por resultado", ["outcome"])
+COALESCED_REQUESTS = Counter(
+    "seo_coalesced_requests_total", "Peticiones que reutilizan el trabajo de otra idéntica",
+    ["operation", "reason"],
+)
+RETENTION_COMPACTED = Counter(
+    "seo_retention_compacted_total", "Crawls compactados (delete) y particiones eliminadas (drop_partition)",
+    ["method"],
+)
+
+EXTERNAL_REQUEST_SECONDS = Histogram(
+    "seo_external_request_seconds", "Latencia de las llamadas a APIs externas",
+    ["api", "operation"], buckets=_LATENCY_BUCKETS,
+)
+EXTERNAL_REQUEST_ERRORS = Counter(
+    "seo_external_request_errors_total", "Errores de APIs externas por clase",
+    ["api", "operation", "error"],
+)
+EXTERNAL_RATE_LIMITED = Counter(
+    "seo_external_rate_limited_total", "Respuestas 429 de APIs externas", ["api"],
+)
+EXTERNAL_RETRIES = Counter(
+    "seo_external_retries_total", "Reintentos contra APIs externas (polling incluido)",
+    ["api", "operation"],
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "seo_db_query_seconds", "Duración de las consultas SQL por tipo de sentencia",
+    ["statement"], buckets=_DB_BUCKETS,
+)
+
+# Tipos de sentencia con etiqueta propia; el resto cuenta como "other"
+_DB_STATEMENTS = ("select", "insert", "update", "delete")
+
+
+# -------------------------------------------------------------------
+# CACHÉ DE HIJOS ETIQUETADOS
+# -------------------------------------------------------------------
+
+_stage_children: Dict[str, Histogram] = {}
+_request_children: Dict[Tuple[str, str], Histogram] = {}
+_db_children = {name: DB_QUERY_SECONDS.labels(name) for name in _DB_STATEMENTS + ("other",)}
+
+
+def _stage_child(name: str) -> Histogram:
+    child = _stage_children.get(name)
+    if child is None:
+        child = _stage_children[name] = CRAWL_STAGE_SECONDS.labels(name)
+    return child
+
+
+def _request_child(api: str, operation: str) -> Histogram:
+    key = (api, operation)
+    child = _request_children.get(key)
+    if child is None:
+        child = _request_children[key] = EXTERNAL_REQUEST_SECONDS.labels(api, operation)
+    return child
+
+
+# -------------------------------------------------------------------
+# INSTRUMENTACIÓN
+# -------------------------------------------------------------------
+
+@contextmanager
+def crawl_run() -> Iterator[None]:
+    """
+    Envuelve un crawl completo: gauge de crawls en curso y contador por resultado.
+    """
+    CRAWLS_IN_FLIGHT.inc()
+    try:
+        yield
+    except BaseException:
+        CRAWLS_TOTAL.labels("failed").inc()
+        raise
+    else:
+        CRAWLS_TOTAL.labels("finished").inc()
+    finally:
+        CRAWLS_IN_FLIGHT.dec()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Mide una etapa del pipeline (se registra también si la etapa falla), abre
+    su span en la traza del crawl (tracing.py) y publica el cambio de etapa en
+    el stream de eventos del crawl (events.py).
+    """
+    publish("stage", stage=name, state="started")
+    start = time.perf_counter()
+    state = "failed"
+    try:
+        with span(f"stage.{name}"):
+            yield
+        state = "finished"
+    finally:
+        elapsed = time.perf_counter() - start
+        _stage_child(name).observe(elapsed)
+        publish("stage", stage=name, state=state, duration_ms=round(elapsed * 1000, 1))
+
+
+def error_class(exc: BaseException) -> str:
+    """
+    Etiqueta de error acotada: http_<status> para respuestas HTTP, si no el nombre de la excepción.
+    """
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return f"http_{exc.response.status_code}"
+    return type(exc).__name__
+
+
+@contextmanager
+def external_request(api: str, operation: str, **attributes) -> Iterator[None]:
+    """
+    Mide una llamada a una API externa (métrica + span) y clasifica el error si lo hay.
+    Debe envolver también raise_for_status() para ver los códigos HTTP.
+    """
+    start = time.perf_counter()
+    with span(f"{api}.{operation}", api=api, operation=operation, **attributes) as attributes:
+        try:
+            yield
+        except Exception as exc:
+            error = attributes["error"] = error_class(exc)
+            EXTERNAL_REQUEST_ERRORS.labels(api, operation, error).inc()
+            if error == "http_429":
+                EXTERNAL_RATE_LIMITED.labels(api).inc()
+            raise
+        finally:
+            _request_child(api, operation).observe(time.perf_counter() - start)
+
+
+def count_retry(api: str, operation: str) -> None:
+    EXTERNAL_RETRIES.labels(api, operation).inc()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start", None)
+    if start is None:
+        return
+    verb = statement.lstrip()[:6].lower()
+    _db_children.get(verb, _db_children["other"]).observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Registra los hooks de SQLAlchemy que alimentan seo_db_query_seconds.
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """
+    Cuerpo y content-type para GET /metrics.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,12 +1,19 @@
 # backend/models.py
 from sqlalchemy import (
     Column, Integer, String, Float, DateTime, Boolean,
-    ForeignKey, Text
+    ForeignKey, ForeignKeyConstraint, Text, LargeBinary, BigInteger, UniqueConstraint, Index, text
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from .config import DATABASE_URL, DB_PARTITIONING
 from .db import Base
 
+# Con DB_PARTITIONING en Postgres, urls e issues se particionan por rangos de
+# crawl_id (retention.py): la PK de la tabla incluye crawl_id y issues -> urls
+# pasa a ser una FK compuesta (url_id, crawl_id).
+PARTITIONED = DB_PARTITIONING and DATABASE_URL.startswith("postgresql")
+_PARTITION_BY = {"postgresql_partition_by": "RANGE (crawl_id)"} if PARTITIONED else {}
+
 
 class Project(Base):
     __tablename__ = "projects"
@@ -17,10 +24,45 @@ class Project(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     crawls = relationship("Crawl", back_populates="project")
+    crawl_config = relationship("CrawlConfig", uselist=False, cascade="all, delete-orphan")
+
+
+class CrawlConfig(Base):
+    """
+    Configuración de crawl del proyecto (crawl_config.py). Sin fila, se usan
+    los valores por defecto.
+    """
+    __tablename__ = "crawl_configs"
+
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    max_pages = Column(Integer, nullable=False)
+    enable_javascript = Column(Boolean, nullable=False, default=False)
+    load_resources = Column(Boolean, nullable=False, default=True)
+    psi_samples_per_template = Column(Integer, nullable=True)  # None = PSI_SAMPLES_PER_TEMPLATE
+    psi_strategies = Column(String(32), nullable=False, default="mobile")  # "mobile,desktop"
+    # Patrones glob sobre la ruta de la URL (JSON: lista de strings)
+    include_patterns = Column(Text, nullable=True)
+    exclude_patterns = Column(Text, nullable=True)
+    # Umbrales de las reglas SQL del catálogo (JSON: {"TITLE_TOO_LONG": {"max_length": 70}})
+    rule_thresholds = Column(Text, nullable=True)
+    # Retención (retention.py); None = RETENTION_FULL_CRAWLS / RETENTION_FULL_DAYS
+    retention_full_crawls = Column(Integer, nullable=True)
+    retention_full_days = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 class Crawl(Base):
     __tablename__ = "crawls"
+    __table_args__ = (
+        # Reintentos con la misma Idempotency-Key devuelven el mismo crawl
+        UniqueConstraint("project_id", "idempotency_key", name="uq_crawls_project_idempotency_key"),
+        # Como mucho un crawl en curso por proyecto, también entre workers
+        Index(
+            "uq_crawls_project_running", "project_id", unique=True,
+            sqlite_where=text("status = 'running'"),
+            postgresql_where=text("status = 'running'"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
@@ -29,18 +71,55 @@ class Crawl(Base):
     status = Column(String(50), default="running")  # running | finished | failed
     dataforseo_task_id = Column(String(255), nullable=True)
     site_health = Column(Float, default=0.0)
+    # Base del Site Health incremental (issues_logic.compute_site_health)
+    health_penalty = Column(Float, default=0.0)  # suma de pesos de severidad de issues abiertos
+    url_count = Column(Integer, default=0)
+    # Se incrementa en cada cambio de workflow de sus issues (ETag / caché, http_cache.py)
+    issues_version = Column(Integer, default=0)
+    idempotency_key = Column(String(255), nullable=True)
+    # Configuración usada (JSON) y estimación calculada antes de empezar (crawl_config.py)
+    config = Column(Text, nullable=True)
+    estimated_cost_usd = Column(Float, nullable=True)
+    estimated_duration_s = Column(Float, nullable=True)
+    # Fecha en que se borraron sus urls / issues (retention.py): sólo quedan los rollups
+    compacted_at = Column(DateTime, nullable=True)
 
     project = relationship("Project", back_populates="crawls")
     urls = relationship("Url", back_populates="crawl", cascade="all, delete-orphan")
-    issues = relationship("Issue", back_populates="crawl", cascade="all, delete-orphan")
+    issues = relationship(
+        "Issue", back_populates="crawl", cascade="all, delete-orphan",
+        foreign_keys="Issue.crawl_id",
+    )
+
+
+class CrawlIdempotencyKey(Base):
+    """
+    Idempotency-Key de una petición que se unió a un crawl ya en curso en vez
+    de crearlo (la de la petición que lo creó está en Crawl.idempotency_key):
+    reintentar con ella devuelve ese mismo crawl.
+    """
+    __tablename__ = "crawl_idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("project_id", "idempotency_key", name="uq_crawl_idempotency_keys_project_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    crawl_id = Column(Integer, ForeignKey("crawls.id"), nullable=False, index=True)
+    idempotency_key = Column(String(255), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 
 class Url(Base):
     __tablename__ = "urls"
+    __table_args__ = _PARTITION_BY
 
-    id = Column(Integer, primary_key=True, index=True)
-    crawl_id = Column(Integer, ForeignKey("crawls.id"), nullable=False)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    crawl_id = Column(Integer, ForeignKey("crawls.id"), nullable=False, index=True, primary_key=PARTITIONED)
     url = Column(Text, nullable=False)
+    # URL normalizada internada (url_norm.py): cruces y diffs por entero
+    url_key_id = Column(Integer, ForeignKey("url_keys.id"), nullable=True, index=True)
+    url_hash = Column(BigInteger, nullable=True, index=True)
 
     status_code = Column(Integer, nullable=True)
     title = Column(Text, nullable=True)
@@ -49,6 +128,8 @@ class Url(Base):
     meta_description_length = Column(Integer, nullable=True)
     h1 = Column(Text, nullable=True)
     word_count = Column(Integer, nullable=True)
+    redirect_url = Column(Text, nullable=True)   # Location de la respuesta 3xx
+    canonical_url = Column(Text, nullable=True)  # <link rel="canonical">
 
     # PageSpeed / performance
     performance_score_mobile = Column(Float, nullable=True)
@@ -56,9 +137,36 @@ class Url(Base):
     lcp = Column(Float, nullable=True)   # en ms
     cls = Column(Float, nullable=True)
     tbt = Column(Float, nullable=True)
+    # Todas las auditorías de Lighthouse en forma compacta (JSON + zlib),
+    # ver pagespeed_client.extract_lighthouse_audits / unpack_audits. Sólo en las
+    # URLs medidas: las estimadas por plantilla (psi_estimated) no lo tienen.
+    lighthouse_audits = Column(LargeBinary, nullable=True)
+
+    # Muestreo PSI por plantilla (psi_sampling.py)
+    template_key = Column(String(512), nullable=True, index=True)
+    psi_estimated = Column(Boolean, default=False)  # True si las métricas se proyectaron desde otra URL
+
+    # PageRank interno normalizado (media 1.0), ver pagerank.py
+    pagerank = Column(Float, nullable=True, index=True)
 
     crawl = relationship("Crawl", back_populates="urls")
-    issues = relationship("Issue", back_populates="url", cascade="all, delete-orphan")
+    issues = relationship("Issue", back_populates="url", cascade="all, delete-orphan", overlaps="issues")
+
+    # Identidad ORM por id también cuando la PK de la tabla es (id, crawl_id)
+    __mapper_args__ = {"primary_key": [id]}
+
+
+class UrlKey(Base):
+    """
+    URL normalizada internada: id estable por proyecto entre crawls.
+    """
+    __tablename__ = "url_keys"
+    __table_args__ = (UniqueConstraint("project_id", "url_hash", name="uq_url_keys_project_hash"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    url_hash = Column(BigInteger, nullable=False)  # url_norm.url_hash (64 bits)
+    normalized_url = Column(Text, nullable=False)
 
 
 class IssueType(Base):
@@ -79,10 +187,15 @@ class IssueType(Base):
 
 class Issue(Base):
     __tablename__ = "issues"
+    __table_args__ = (
+        Index("ix_issues_crawl_fingerprint", "crawl_id", "fingerprint"),
+        *([ForeignKeyConstraint(["url_id", "crawl_id"], ["urls.id", "urls.crawl_id"])] if PARTITIONED else []),
+        _PARTITION_BY,
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    crawl_id = Column(Integer, ForeignKey("crawls.id"), nullable=False)
-    url_id = Column(Integer, ForeignKey("urls.id"), nullable=False)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    crawl_id = Column(Integer, ForeignKey("crawls.id"), nullable=False, primary_key=PARTITIONED)
+    url_id = Column(Integer, *([] if PARTITIONED else [ForeignKey("urls.id")]), nullable=False)
     issue_type_id = Column(Integer, ForeignKey("issue_types.id"), nullable=False)
 
     status = Column(String(50), default="pending")  # pending | in_progress | done
@@ -90,9 +203,60 @@ class Issue(Base):
     details = Column(Text, nullable=True)  # JSON string si quieres más data
     comment = Column(Text, nullable=True)
 
+    # Huella estable entre crawls (issue_lifecycle.py) y crawl donde apareció por primera vez
+    fingerprint = Column(BigInteger, nullable=True)
+    first_seen_crawl_id = Column(Integer, ForeignKey("crawls.id"), nullable=True)
+
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
 
-    crawl = relationship("Crawl", back_populates="issues")
-    url = relationship("Url", back_populates="issues")
+    # overlaps: con particiones, issues.crawl_id también forma parte de la FK a urls
+    crawl = relationship("Crawl", back_populates="issues", foreign_keys=[crawl_id], overlaps="issues,url")
+    url = relationship("Url", back_populates="issues", overlaps="crawl,issues")
     issue_type = relationship("IssueType", back_populates="issues")
+
+    __mapper_args__ = {"primary_key": [id]}
+
+
+# -------------------------------------------------------------------
+# ROLLUPS POR CRAWL (tendencias, ver rollups.py)
+# -------------------------------------------------------------------
+
+class CrawlRollup(Base):
+    """
+    Resumen de un crawl terminado: totales y percentiles PSI.
+    """
+    __tablename__ = "crawl_rollups"
+    __table_args__ = (Index("ix_crawl_rollups_project_finished", "project_id", "finished_at"),)
+
+    crawl_id = Column(Integer, ForeignKey("crawls.id"), primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    site_health = Column(Float, nullable=True)
+    total_urls = Column(Integer, nullable=False, default=0)
+    total_issues = Column(Integer, nullable=False, default=0)
+
+    # Percentiles PSI sobre las URLs con métricas (incluidas las estimadas)
+    lcp_p50 = Column(Float, nullable=True)
+    lcp_p75 = Column(Float, nullable=True)
+    lcp_p95 = Column(Float, nullable=True)
+    cls_p50 = Column(Float, nullable=True)
+    cls_p75 = Column(Float, nullable=True)
+    cls_p95 = Column(Float, nullable=True)
+    tbt_p50 = Column(Float, nullable=True)
+    tbt_p75 = Column(Float, nullable=True)
+    tbt_p95 = Column(Float, nullable=True)
+
+
+class CrawlIssueRollup(Base):
+    """
+    Nº de issues por (proyecto, crawl, tipo de issue, severidad).
+    """
+    __tablename__ = "crawl_issue_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    crawl_id = Column(Integer, ForeignKey("crawl_rollups.crawl_id"), nullable=False, index=True)
+    issue_type_id = Column(Integer, ForeignKey("issue_types.id"), nullable=False)
+    severity = Column(String(50), nullable=False)  # severidad en el momento del crawl
+    issue_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,80 @@
+# backend/pagerank.py
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from . import models
+from .link_graph import LinkGraph
+
+"""
+PageRank interno (link equity) por URL, calculado sobre el grafo CSR de
+link_graph.py con iteración de potencias sobre una matriz dispersa de SciPy.
+
+- Cada enlace reparte 1/out_degree del PageRank de su origen.
+- Los nodos sin enlaces salientes (dangling) reparten su PageRank de forma
+  uniforme entre todos los nodos, para que la suma siga siendo 1.
+- Se guarda normalizado a media 1.0 (Url.pagerank): > 1 recibe más equidad
+  que la página media del sitio.
+"""
+
+DAMPING = 0.85
+TOLERANCE = 1e-6
+MAX_ITERATIONS = 100
+
+
+def compute_pagerank(
+    graph: LinkGraph,
+    damping: float = DAMPING,
+    tol: float = TOLERANCE,
+    max_iter: int = MAX_ITERATIONS,
+) -> np.ndarray:
+    """
+    Devuelve el PageRank de cada nodo (suma 1). Converge cuando la norma L1
+    entre dos iteraciones baja de `tol`.
+    """
+    n = graph.num_nodes
+    if n == 0:
+        return np.zeros(0)
+
+    out_degree = graph.out_degree()
+    dangling = out_degree == 0
+    weights = np.repeat(1.0 / np.where(dangling, 1, out_degree), out_degree)
+
+    # Matriz de transición transpuesta: fila = destino, columna = origen.
+    transition = sparse.csr_matrix((weights, graph.indices, graph.indptr), shape=(n, n))
+    transition_t = transition.T.tocsr()
+
+    rank = np.full(n, 1.0 / n)
+    teleport = (1.0 - damping) / n
+    for _ in range(max_iter):
+        dangling_mass = rank[dangling].sum()
+        new_rank = damping * (transition_t @ rank) + (damping * dangling_mass / n + teleport)
+        delta = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if delta < tol:
+            break
+    return rank
+
+
+def store_pagerank(db: Session, graph: LinkGraph) -> None:
+    """
+    Calcula el PageRank del grafo y lo guarda en Url.pagerank (media 1.0 sobre
+    las URLs rastreadas).
+    """
+    rank = compute_pagerank(graph)
+    crawled = graph.url_ids >= 0
+    if not crawled.any():
+        return
+
+    rank = rank / rank[crawled].mean()
+    # Las filas alias (misma URL normalizada) reciben el PageRank de su nodo
+    url_ids = np.concatenate([graph.url_ids[crawled], graph.alias_url_ids])
+    scores = np.concatenate([rank[crawled], rank[graph.alias_nodes]])
+    db.bulk_update_mappings(
+        models.Url,
+        [
+            {"id": int(url_id), "pagerank": float(score)}
+            for url_id, score in zip(url_ids, scores)
+        ],
+    )
+    db.commit()
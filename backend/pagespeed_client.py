@@ -1,12 +1,25 @@
 # backend/pagespeed_client.py
+import json
+import zlib
 import requests
-from typing import Dict, Any
-from .config import PAGESPEED_API_KEY, PAGESPEED_ENDPOINT
+from typing import Dict, Any, List, Optional
+from .cache import cache
+from .config import PAGESPEED_API_KEY, PAGESPEED_ENDPOINT, PSI_CACHE_TTL
+from .metrics import external_request
+from .payloads import PsiResponse, decode_psi, pack_psi, unpack_psi
 
+# Posiciones dentro de cada fila de auditoría compacta (ver extract_lighthouse_audits)
+AUDIT_SCORE = 0
+AUDIT_NUMERIC_VALUE = 1
+AUDIT_SAVINGS_MS = 2
+AUDIT_SAVINGS_BYTES = 3
 
-def fetch_pagespeed(url: str, strategy: str = "mobile") -> Dict[str, Any]:
+
+def fetch_pagespeed(url: str, strategy: str = "mobile") -> PsiResponse:
     """
-    Llama a PageSpeed Insights y devuelve los datos brutos.
+    Llama a PageSpeed Insights y devuelve sólo los campos que usamos
+    (ver payloads.PsiResponse); el resto del JSON se descarta al parsear.
+    La respuesta recortada se cachea PSI_CACHE_TTL segundos por URL y estrategia.
     """
     if not PAGESPEED_API_KEY:
         raise RuntimeError("Configura PAGESPEED_API_KEY en el .env")
@@ -16,24 +29,63 @@ def fetch_pagespeed(url: str, strategy: str = "mobile") -> Dict[str, Any]:
         "key": PAGESPEED_API_KEY,
         "strategy": strategy
     }
-    resp = requests.get(PAGESPEED_ENDPOINT, params=params)
-    resp.raise_for_status()
-    return resp.json()
+
+    def load() -> bytes:
+        with external_request("pagespeed", strategy, url=url):
+            resp = requests.get(PAGESPEED_ENDPOINT, params=params)
+            resp.raise_for_status()
+        return pack_psi(decode_psi(resp.content))
+
+    return unpack_psi(cache.get_or_load("psi", f"{strategy}:{url}", load, PSI_CACHE_TTL))
+
+
+def extract_lighthouse_audits(psi_data: PsiResponse) -> Dict[str, List[Optional[float]]]:
+    """
+    Recorre una sola vez las auditorías de Lighthouse y devuelve una forma compacta:
+    audit_id -> [score, numericValue, ahorro_ms, ahorro_bytes]
+    Se omiten las auditorías sin ningún valor numérico (informativas).
+    """
+    compact: Dict[str, List[Optional[float]]] = {}
+
+    for audit_id, audit in psi_data.lighthouseResult.audits.items():
+        details = audit.details
+        row = [
+            audit.score,
+            audit.numericValue,
+            details.overallSavingsMs if details else None,
+            details.overallSavingsBytes if details else None,
+        ]
+        if any(v is not None for v in row):
+            compact[audit_id] = row
+
+    return compact
+
+
+def pack_audits(audits: Dict[str, List[Optional[float]]]) -> bytes:
+    """
+    Serializa las auditorías compactas para Url.lighthouse_audits (JSON + zlib).
+    """
+    return zlib.compress(json.dumps(audits, separators=(",", ":")).encode("utf-8"))
+
+
+def unpack_audits(blob: Optional[bytes]) -> Dict[str, List[Optional[float]]]:
+    if not blob:
+        return {}
+    return json.loads(zlib.decompress(blob))
 
 
-def extract_performance_metrics(psi_data: Dict[str, Any]) -> Dict[str, float]:
+def extract_performance_metrics(psi_data: PsiResponse) -> Dict[str, Any]:
     """
-    Extrae performance_score, LCP, CLS, TBT desde la respuesta de PSI.
+    Extrae performance_score, LCP, CLS, TBT desde la respuesta de PSI, junto con
+    el set completo de auditorías en forma compacta (clave "audits").
     """
-    lighthouse = psi_data.get("lighthouseResult", {})
-    categories = lighthouse.get("categories", {})
-    perf_score = categories.get("performance", {}).get("score")
+    performance = psi_data.lighthouseResult.categories.performance
+    perf_score = performance.score if performance else None
     perf_score_scaled = perf_score * 100 if perf_score is not None else None
 
-    audits = lighthouse.get("audits", {})
+    audits = extract_lighthouse_audits(psi_data)
     def metric_value(id_: str):
-        audit = audits.get(id_, {})
-        return audit.get("numericValue")
+        return audits.get(id_, [None, None])[AUDIT_NUMERIC_VALUE]
 
     lcp = metric_value("largest-contentful-paint")
     cls = metric_value("cumulative-layout-shift")
@@ -44,4 +96,5 @@ def extract_performance_metrics(psi_data: Dict[str, Any]) -> Dict[str, float]:
         "lcp": lcp,
         "cls": cls,
         "tbt": tbt,
+        "audits": audits,
     }
@@ -0,0 +1,138 @@
+# backend/payloads.py
+from typing import Dict, List, Optional
+
+import msgspec
+
+"""
+Decodificación tipada de las respuestas de PageSpeed Insights y DataForSEO.
+
+Las respuestas de PSI pesan 0.5–1 MB (trazas, screenshots, tablas de detalles)
+y sólo leemos unas decenas de campos. Con msgspec declaramos únicamente esos
+campos: el parser salta el resto del JSON sin construir objetos Python, lo que
+reduce CPU y memoria pico frente a `resp.json()` + dicts.
+
+Si necesitas un campo nuevo, añádelo al Struct correspondiente.
+"""
+
+
+# -------------------------------------------------------------------
+# PAGESPEED INSIGHTS
+# -------------------------------------------------------------------
+
+class PsiAuditDetails(msgspec.Struct):
+    overallSavingsMs: Optional[float] = None
+    overallSavingsBytes: Optional[float] = None
+
+
+class PsiAudit(msgspec.Struct):
+    score: Optional[float] = None
+    numericValue: Optional[float] = None
+    details: Optional[PsiAuditDetails] = None
+
+
+class PsiCategory(msgspec.Struct):
+    score: Optional[float] = None
+
+
+class PsiCategories(msgspec.Struct):
+    performance: Optional[PsiCategory] = None
+
+
+class PsiLighthouseResult(msgspec.Struct):
+    categories: PsiCategories = msgspec.field(default_factory=PsiCategories)
+    audits: Dict[str, PsiAudit] = {}
+
+
+class PsiResponse(msgspec.Struct):
+    lighthouseResult: PsiLighthouseResult = msgspec.field(default_factory=PsiLighthouseResult)
+
+
+# -------------------------------------------------------------------
+# DATAFORSEO ON_PAGE
+# -------------------------------------------------------------------
+
+class OnPageMeta(msgspec.Struct):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    canonical: Optional[str] = None
+    htags: Optional[Dict[str, List[str]]] = None
+    scripts_count: Optional[int] = None
+    stylesheets_count: Optional[int] = None
+    render_blocking_scripts_count: Optional[int] = None
+    render_blocking_stylesheets_count: Optional[int] = None
+
+
+class OnPageContent(msgspec.Struct):
+    word_count: Optional[int] = None
+
+
+class OnPagePage(msgspec.Struct):
+    url: Optional[str] = None
+    status_code: Optional[int] = None
+    location: Optional[str] = None      # destino de la redirección (3xx)
+    meta: Optional[OnPageMeta] = None
+    content: Optional[OnPageContent] = None
+
+
+class DataForSEOTask(msgspec.Struct):
+    id: Optional[str] = None
+    result: Optional[List[OnPagePage]] = None
+
+
+class DataForSEOResponse(msgspec.Struct):
+    tasks: List[DataForSEOTask] = []
+
+
+class OnPageLink(msgspec.Struct):
+    type: Optional[str] = None          # anchor | image | script | ...
+    link_from: Optional[str] = None
+    link_to: Optional[str] = None
+    direction: Optional[str] = None     # internal | external
+    is_broken: Optional[bool] = None
+
+
+class OnPageLinksResult(msgspec.Struct):
+    total_items_count: Optional[int] = None
+    items_count: Optional[int] = None
+    items: Optional[List[OnPageLink]] = None
+
+
+class DataForSEOLinksTask(msgspec.Struct):
+    id: Optional[str] = None
+    result: Optional[List[OnPageLinksResult]] = None
+
+
+class DataForSEOLinksResponse(msgspec.Struct):
+    tasks: List[DataForSEOLinksTask] = []
+
+
+# -------------------------------------------------------------------
+# DECODERS (reutilizables, se construyen una vez)
+# -------------------------------------------------------------------
+
+_psi_decoder = msgspec.json.Decoder(PsiResponse)
+_dataforseo_decoder = msgspec.json.Decoder(DataForSEOResponse)
+_dataforseo_links_decoder = msgspec.json.Decoder(DataForSEOLinksResponse)
+# PSI ya recortado a PsiResponse, en msgpack, para la caché (cache.py)
+_psi_packer = msgspec.msgpack.Encoder()
+_psi_unpacker = msgspec.msgpack.Decoder(PsiResponse)
+
+
+def decode_psi(raw: bytes) -> PsiResponse:
+    return _psi_decoder.decode(raw)
+
+
+def pack_psi(psi: PsiResponse) -> bytes:
+    return _psi_packer.encode(psi)
+
+
+def unpack_psi(raw: bytes) -> PsiResponse:
+    return _psi_unpacker.decode(raw)
+
+
+def decode_dataforseo(raw: bytes) -> DataForSEOResponse:
+    return _dataforseo_decoder.decode(raw)
+
+
+def decode_dataforseo_links(raw: bytes) -> DataForSEOLinksResponse:
+    return _dataforseo_links_decoder.decode(raw)
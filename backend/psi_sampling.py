@@ -0,0 +1,207 @@
+# backend/psi_sampling.py
+import hashlib
+import logging
+import re
+from collections import defaultdict
+from statistics import median
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+from . import models
+from .metrics import error_class
+from .pagespeed_client import pack_audits
+from .payloads import OnPageMeta, OnPagePage
+
+"""
+Muestreo de URLs por plantilla para PageSpeed Insights.
+
+La mayoría de las páginas de un sitio comparten unas pocas plantillas (producto,
+categoría, artículo...) y sus métricas de PSI apenas varían dentro de una misma
+plantilla. En lugar de llamar a PSI por cada URL:
+
+1) Agrupamos las URLs por patrón de ruta + firma de plantilla (datos DataForSEO).
+2) Medimos N URLs representativas por grupo.
+3) Proyectamos la mediana de sus métricas al resto del grupo, marcándolas como
+   estimadas (Url.psi_estimated = True). Las auditorías de Lighthouse sólo se
+   guardan en las representativas: no se pueden estimar por mediana.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Métricas de PSI que se proyectan de las representativas al resto del grupo.
+PROJECTED_METRICS = ("performance_score", "performance_score_desktop", "lcp", "cls", "tbt")
+
+# Segmentos que parecen identificadores: números, hashes, UUIDs.
+_ID_SEGMENT_RE = re.compile(r"^(\d+|[0-9a-f]{12,}|[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12})$", re.I)
+# Slugs con un id numérico embebido: "producto-1234", "p123".
+_SLUG_WITH_ID_RE = re.compile(r"\d{3,}")
+_EXTENSION_RE = re.compile(r"(\.[a-z0-9]{1,5})$", re.I)
+
+
+# -------------------------------------------------------------------
+# CLAVE DE PLANTILLA
+# -------------------------------------------------------------------
+
+def path_pattern(url: str) -> str:
+    """
+    Convierte la ruta de una URL en un patrón genérico:
+    /producto/zapatilla-roja-123.html -> /producto/{slug}.html
+    /blog/2024/05/mi-post            -> /blog/{id}/{id}/{slug}
+    """
+    parts = urlsplit(url)
+    segments = [s for s in parts.path.split("/") if s]
+    if not segments:
+        return "/"
+
+    pattern: List[str] = []
+    last = len(segments) - 1
+    for i, seg in enumerate(segments):
+        if _ID_SEGMENT_RE.match(seg):
+            pattern.append("{id}")
+            continue
+
+        ext_match = _EXTENSION_RE.search(seg)
+        ext = ext_match.group(1).lower() if ext_match else ""
+
+        # El último segmento de una ruta con varios niveles suele ser el slug de
+        # la página concreta; los niveles intermedios definen la sección.
+        if (i == last and i > 0) or _SLUG_WITH_ID_RE.search(seg):
+            pattern.append("{slug}" + ext)
+        else:
+            pattern.append(seg.lower())
+
+    result = "/" + "/".join(pattern)
+    if parts.query:
+        result += "?"
+    return result
+
+
+def template_signature(page: OnPagePage) -> str:
+    """
+    Firma de plantilla a partir del resultado on_page de DataForSEO:
+    scripts, hojas de estilo, recursos bloqueantes y estructura de encabezados.
+    Dos páginas con la misma plantilla comparten casi siempre estos valores.
+    """
+    meta = page.meta or OnPageMeta()
+    htags = meta.htags or {}
+
+    features = (
+        meta.scripts_count,
+        meta.stylesheets_count,
+        meta.render_blocking_scripts_count,
+        meta.render_blocking_stylesheets_count,
+        tuple(sorted(k for k, v in htags.items() if v)),
+    )
+    return hashlib.sha1(repr(features).encode("utf-8")).hexdigest()[:12]
+
+
+def template_key(url: str, page: OnPagePage) -> str:
+    """
+    Clave de agrupación que se guarda en Url.template_key.
+    """
+    return f"{path_pattern(url)}#{template_signature(page)}"[:512]
+
+
+# -------------------------------------------------------------------
+# SELECCIÓN DE REPRESENTATIVAS Y PROYECCIÓN
+# -------------------------------------------------------------------
+
+def group_by_template(urls: Iterable[models.Url]) -> Dict[str, List[models.Url]]:
+    clusters: Dict[str, List[models.Url]] = defaultdict(list)
+    for u in urls:
+        clusters[u.template_key or u.url].append(u)
+    return clusters
+
+
+def pick_representatives(members: List[models.Url], per_template: int) -> List[models.Url]:
+    """
+    Elige hasta `per_template` URLs del grupo, repartidas de forma uniforme y
+    priorizando las que respondieron 200 (las demás no tienen métricas útiles).
+    per_template <= 0 desactiva el muestreo y devuelve todo el grupo.
+    """
+    if per_template <= 0 or len(members) <= per_template:
+        return list(members)
+
+    candidates = sorted(
+        (u for u in members if u.status_code == 200),
+        key=lambda u: u.url,
+    ) or sorted(members, key=lambda u: u.url)
+
+    if len(candidates) <= per_template:
+        return candidates
+
+    step = len(candidates) / per_template
+    return [candidates[int(i * step)] for i in range(per_template)]
+
+
+def project_metrics(measurements: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Mediana por métrica de las mediciones del grupo (ignorando valores nulos).
+    """
+    projected: Dict[str, Any] = {}
+    for key in PROJECTED_METRICS:
+        values = [m[key] for m in measurements if m.get(key) is not None]
+        projected[key] = median(values) if values else None
+    return projected
+
+
+def apply_metrics(u: models.Url, perf: Dict[str, Any], estimated: bool) -> None:
+    u.performance_score_mobile = perf.get("performance_score")
+    u.performance_score_desktop = perf.get("performance_score_desktop")
+    u.lcp = perf.get("lcp")
+    u.cls = perf.get("cls")
+    u.tbt = perf.get("tbt")
+    u.lighthouse_audits = perf.get("audits_blob")
+    u.psi_estimated = estimated
+
+
+def measure_sampled(
+    urls: Iterable[models.Url],
+    measure: Callable[[str], Dict[str, Any]],
+    per_template: int,
+    on_cluster_done: Optional[Callable[[Dict[str, int]], None]] = None,
+) -> Dict[str, int]:
+    """
+    Ejecuta PSI (vía `measure`) sólo sobre las representativas de cada plantilla
+    y proyecta las métricas al resto de URLs con status 200. Si `measure` falla
+    para una URL, se omite.
+    Devuelve contadores: clusters, clusters_total, measured, estimated, failed
+    (on_cluster_done los recibe tras cada plantilla, para el progreso).
+    """
+    clusters = group_by_template(urls)
+    stats = {"clusters": 0, "clusters_total": len(clusters), "measured": 0, "estimated": 0, "failed": 0}
+
+    for members in clusters.values():
+        stats["clusters"] += 1
+        reps = pick_representatives(members, per_template)
+        measurements: List[Dict[str, Any]] = []
+
+        for u in reps:
+            try:
+                perf = measure(u.url)
+            except Exception as exc:
+                # Si PSI falla, seguimos con el resto de representativas, pero
+                # queda registrado (log + contador; la clase de error va a /metrics).
+                logger.warning("PSI falló para %s: %s", u.url, error_class(exc))
+                stats["failed"] += 1
+                continue
+            # Las auditorías se guardan comprimidas y sólo en las URLs medidas.
+            perf["audits_blob"] = pack_audits(perf.pop("audits", None) or {})
+            apply_metrics(u, perf, estimated=False)
+            measurements.append(perf)
+            stats["measured"] += 1
+
+        if measurements and len(reps) < len(members):
+            projected = project_metrics(measurements)
+            rep_ids = {id(u) for u in reps}
+            for u in members:
+                # Redirecciones y errores no renderizan la plantilla: sin métricas.
+                if id(u) in rep_ids or u.status_code != 200:
+                    continue
+                apply_metrics(u, projected, estimated=True)
+                stats["estimated"] += 1
+
+        if on_cluster_done is not None:
+            on_cluster_done(stats)
+
+    return stats
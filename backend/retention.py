@@ -0,0 +1,333 @@
+# backend/retention.py
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import (
+    MAINTENANCE_INTERVAL_HOURS, PARTITION_CRAWLS, RETENTION_FULL_CRAWLS, RETENTION_FULL_DAYS,
+)
+from .http_cache import invalidate_crawl
+from .link_graph import graph_path
+from .metrics import RETENTION_COMPACTED
+from .rollups import build_crawl_rollup
+from .sitemap import report_path
+from .tracing import profile_path, trace_path
+
+"""
+Retención de los datos de crawl y job de mantenimiento.
+
+Cada crawl escribe todas sus filas Url e Issue; con crawls semanales de
+sitios grandes esas tablas crecen sin límite. Por proyecto (configuración de
+crawl, RETENTION_FULL_CRAWLS / RETENTION_FULL_DAYS por defecto) se conservan
+con detalle:
+- los N últimos crawls terminados (como mínimo 1: el anterior hace falta para
+  arrastrar el estado de los issues y para el diff), y
+- todos los crawls empezados en los últimos D días.
+
+El resto (terminados o fallidos, nunca uno en curso) se compacta: se asegura
+su rollup (CrawlRollup / CrawlIssueRollup, lo que usan las tendencias), se
+borran sus urls e issues y los ficheros por crawl (grafo de enlaces, informe
+de sitemaps, traza y perfil) y se marca Crawl.compacted_at. La fila del crawl
+se queda (la referencian los rollups y issues.first_seen_crawl_id).
+
+El borrado es por conjuntos, nunca con las cascadas del ORM (que cargan y
+borran objeto a objeto):
+- DELETE FROM issues / urls WHERE crawl_id IN (...);
+- en Postgres con DB_PARTITIONING, urls e issues están particionadas por
+  rangos de PARTITION_CRAWLS crawl_ids (urls_c<desde>, issues_c<desde>);
+  una partición cuyos crawls ya están todos compactados o en la tanda actual
+  se suelta entera (DETACH + DROP), sin recorrer filas.
+
+run_maintenance() hace una pasada sobre todos los proyectos;
+MaintenanceJob la repite cada MAINTENANCE_INTERVAL_HOURS en un hilo en
+segundo plano. Con varios workers, en Postgres sólo uno la ejecuta a la vez
+(advisory lock).
+"""
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("urls", "issues")
+# Clave del advisory lock de Postgres del job de mantenimiento
+_MAINTENANCE_LOCK_KEY = 0x5E0_2E7E
+# Primera pasada tras arrancar (no esperar un intervalo completo en cada despliegue)
+_FIRST_RUN_DELAY_S = 300
+
+
+# -------------------------------------------------------------------
+# POLÍTICA
+# -------------------------------------------------------------------
+
+def retention_of(config: Optional[models.CrawlConfig]) -> Tuple[int, int]:
+    """
+    (crawls terminados con detalle, días con detalle) del proyecto.
+    """
+    full_crawls = config.retention_full_crawls if config and config.retention_full_crawls is not None \
+        else RETENTION_FULL_CRAWLS
+    full_days = config.retention_full_days if config and config.retention_full_days is not None \
+        else RETENTION_FULL_DAYS
+    return max(1, full_crawls), max(0, full_days)
+
+
+def crawls_to_compact(db: Session, now: Optional[datetime] = None) -> Dict[int, List[int]]:
+    """
+    project_id -> ids de los crawls que hay que compactar, del más antiguo al más nuevo.
+    """
+    now = now or datetime.utcnow()
+    configs = {c.project_id: c for c in db.query(models.CrawlConfig)}
+    crawls = (
+        db.query(models.Crawl.id, models.Crawl.project_id, models.Crawl.status, models.Crawl.started_at)
+        .filter(models.Crawl.compacted_at.is_(None))
+        .order_by(models.Crawl.project_id, models.Crawl.id.desc())
+        .all()
+    )
+
+    plan: Dict[int, List[int]] = {}
+    finished_seen: Dict[int, int] = {}
+    for crawl_id, project_id, status, started_at in crawls:
+        full_crawls, full_days = retention_of(configs.get(project_id))
+        if status == "finished":
+            finished_seen[project_id] = finished_seen.get(project_id, 0) + 1
+            if finished_seen[project_id] <= full_crawls:
+                continue
+        elif status != "failed":
+            continue  # en curso
+        if started_at is not None and started_at >= now - timedelta(days=full_days):
+            continue
+        plan.setdefault(project_id, []).append(crawl_id)
+    for ids in plan.values():
+        ids.reverse()
+    return plan
+
+
+# -------------------------------------------------------------------
+# PARTICIONES (POSTGRES)
+# -------------------------------------------------------------------
+
+def partition_range(crawl_id: int) -> Tuple[int, int]:
+    start = crawl_id // PARTITION_CRAWLS * PARTITION_CRAWLS
+    return start, start + PARTITION_CRAWLS
+
+
+def is_partitioned(db: Session) -> bool:
+    """
+    True si `urls` es una tabla particionada (no basta con DB_PARTITIONING: las
+    tablas creadas antes de activarlo siguen siendo normales).
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return bool(db.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'urls'"
+    )).scalar())
+
+
+def ensure_default_partitions(db: Session) -> None:
+    """
+    Partición DEFAULT de cada tabla (filas de crawls sin partición propia).
+    """
+    if not is_partitioned(db):
+        return
+    for table in PARTITIONED_TABLES:
+        db.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+    db.commit()
+
+
+def ensure_crawl_partitions(db: Session, crawl_id: int) -> None:
+    """
+    Crea las particiones del rango del crawl antes de escribir sus filas. Si
+    falla (p.ej. la partición DEFAULT ya tiene filas de ese rango) las filas
+    acaban en DEFAULT y se purgan con DELETE.
+    """
+    if not is_partitioned(db):
+        return
+    start, end = partition_range(crawl_id)
+    try:
+        for table in PARTITIONED_TABLES:
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {table}_c{start} PARTITION OF {table} "
+                f"FOR VALUES FROM ({start}) TO ({end})"
+            ))
+        db.commit()
+    except DBAPIError:
+        db.rollback()
+        logger.warning("No se pudo crear la partición de crawls [%s, %s)", start, end, exc_info=True)
+
+
+def _existing_partitions(db: Session) -> Set[int]:
+    rows = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'urls'"
+    )).scalars()
+    return {int(name[len("urls_c"):]) for name in rows if name.startswith("urls_c")}
+
+
+def _droppable_partitions(db: Session, compacting: Set[int]) -> List[int]:
+    """
+    Rangos cuyos crawls están todos compactados o en `compacting`, y que ya no
+    pueden recibir crawls nuevos.
+    """
+    existing = _existing_partitions(db)
+    if not existing:
+        return []
+    max_id = db.query(func.max(models.Crawl.id)).scalar() or 0
+    droppable = []
+    for start in sorted(existing):
+        end = start + PARTITION_CRAWLS
+        if end > max_id:
+            continue
+        alive = (
+            db.query(models.Crawl.id)
+            .filter(models.Crawl.id >= start, models.Crawl.id < end, models.Crawl.compacted_at.is_(None))
+            .all()
+        )
+        if all(crawl_id in compacting for crawl_id, in alive):
+            droppable.append(start)
+    return droppable
+
+
+def _drop_partition(db: Session, start: int) -> None:
+    # issues primero: su FK apunta a urls
+    for table in reversed(PARTITIONED_TABLES):
+        db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {table}_c{start}"))
+        db.execute(text(f"DROP TABLE {table}_c{start}"))
+
+
+# -------------------------------------------------------------------
+# COMPACTACIÓN
+# -------------------------------------------------------------------
+
+def _remove_crawl_files(crawl_id: int) -> None:
+    for path in (graph_path(crawl_id), report_path(crawl_id), trace_path(crawl_id), profile_path(crawl_id)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _delete_detail_rows(db: Session, crawl_ids: List[int]) -> Dict[str, int]:
+    issues = db.query(models.Issue).filter(models.Issue.crawl_id.in_(crawl_ids)).delete(synchronize_session=False)
+    urls = db.query(models.Url).filter(models.Url.crawl_id.in_(crawl_ids)).delete(synchronize_session=False)
+    return {"issues": issues, "urls": urls}
+
+
+def compact_crawls(db: Session, crawl_ids: List[int], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Compacta los crawls dados (ver docstring del módulo). Cada crawl se cierra
+    en su propia transacción, salvo las particiones que se sueltan enteras.
+    """
+    now = now or datetime.utcnow()
+    report: Dict[str, Any] = {"crawls": [], "partitions_dropped": [], "deleted": {"urls": 0, "issues": 0}}
+    if not crawl_ids:
+        return report
+
+    compacting = set(crawl_ids)
+    for crawl in db.query(models.Crawl).filter(models.Crawl.id.in_(crawl_ids)):
+        has_rollup = db.query(models.CrawlRollup.crawl_id).filter_by(crawl_id=crawl.id).first()
+        if crawl.status == "finished" and not has_rollup:
+            build_crawl_rollup(db, crawl)  # antes de borrar: lo necesitan las tendencias
+
+    dropped_crawls: Set[int] = set()
+    if is_partitioned(db):
+        for start in _droppable_partitions(db, compacting):
+            _drop_partition(db, start)
+            dropped_crawls.update(i for i in compacting if start <= i < start + PARTITION_CRAWLS)
+            report["partitions_dropped"].append(start)
+            RETENTION_COMPACTED.labels("drop_partition").inc()
+
+    for crawl_id in crawl_ids:
+        if crawl_id not in dropped_crawls:
+            for table, count in _delete_detail_rows(db, [crawl_id]).items():
+                report["deleted"][table] += count
+            RETENTION_COMPACTED.labels("delete").inc()
+        db.query(models.Crawl).filter(models.Crawl.id == crawl_id).update(
+            {models.Crawl.compacted_at: now}, synchronize_session=False,
+        )
+        invalidate_crawl(db, crawl_id)  # las respuestas cacheadas del crawl ya no valen
+        db.commit()
+        _remove_crawl_files(crawl_id)
+        report["crawls"].append(crawl_id)
+    return report
+
+
+# -------------------------------------------------------------------
+# JOB DE MANTENIMIENTO
+# -------------------------------------------------------------------
+
+def _try_lock(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    return bool(db.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _MAINTENANCE_LOCK_KEY}).scalar())
+
+
+def _unlock(db: Session) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _MAINTENANCE_LOCK_KEY})
+        db.commit()
+
+
+def run_maintenance(db: Session, dry_run: bool = False, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Una pasada de retención sobre todos los proyectos. Con dry_run sólo
+    devuelve el plan. Forma de schemas.MaintenanceReport.
+    """
+    now = now or datetime.utcnow()
+    if not _try_lock(db):
+        return {"skipped": True, "dry_run": dry_run, "plan": {}, "crawls": [],
+                "partitions_dropped": [], "deleted": {"urls": 0, "issues": 0}}
+    try:
+        plan = crawls_to_compact(db, now)
+        crawl_ids = sorted(i for ids in plan.values() for i in ids)
+        if dry_run:
+            report = {"crawls": [], "partitions_dropped": [], "deleted": {"urls": 0, "issues": 0}}
+        else:
+            report = compact_crawls(db, crawl_ids, now)
+        return {"skipped": False, "dry_run": dry_run, "plan": plan, **report}
+    finally:
+        _unlock(db)
+
+
+class MaintenanceJob:
+    """
+    Hilo en segundo plano que llama a run_maintenance() cada `interval_hours`.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], interval_hours: float = MAINTENANCE_INTERVAL_HOURS):
+        self.session_factory = session_factory
+        self.interval_s = interval_hours * 3600
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval_s <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        delay = min(self.interval_s, _FIRST_RUN_DELAY_S)
+        while not self._stop.wait(delay):
+            db = self.session_factory()
+            try:
+                report = run_maintenance(db)
+                if report["crawls"]:
+                    logger.info(
+                        "Mantenimiento: %d crawls compactados, %d particiones eliminadas",
+                        len(report["crawls"]), len(report["partitions_dropped"]),
+                    )
+            except Exception:
+                db.rollback()
+                logger.exception("Fallo en el job de mantenimiento")
+            finally:
+                db.close()
+            delay = self.interval_s
@@ -0,0 +1,137 @@
+# backend/rollups.py
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+
+"""
+Rollups por crawl para las tendencias entre crawls.
+
+Al terminar un crawl se escribe:
+- una fila CrawlRollup con totales, Site Health y percentiles p50/p75/p95 de
+  LCP, CLS y TBT;
+- una fila CrawlIssueRollup por (tipo de issue, severidad) con su recuento.
+
+GET /projects/{id}/trends lee meses de historial con una sola consulta sobre
+el índice (project_id, finished_at), sin volver a recorrer las tablas Issue/Url.
+"""
+
+PSI_METRICS = ("lcp", "cls", "tbt")
+PERCENTILES = (50, 75, 95)
+
+
+def _percentiles(values: np.ndarray) -> List[Optional[float]]:
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return [None] * len(PERCENTILES)
+    return [float(v) for v in np.percentile(values, PERCENTILES)]
+
+
+def build_crawl_rollup(db: Session, crawl: models.Crawl) -> models.CrawlRollup:
+    """
+    (Re)escribe los rollups del crawl. Se llama cuando el crawl ya está terminado.
+    """
+    db.query(models.CrawlIssueRollup).filter_by(crawl_id=crawl.id).delete(synchronize_session=False)
+    db.query(models.CrawlRollup).filter_by(crawl_id=crawl.id).delete(synchronize_session=False)
+
+    metric_rows = (
+        db.query(models.Url.lcp, models.Url.cls, models.Url.tbt)
+        .filter(models.Url.crawl_id == crawl.id)
+        .all()
+    )
+    metrics = np.array(metric_rows, dtype=np.float64).reshape(-1, len(PSI_METRICS))
+
+    rollup = models.CrawlRollup(
+        crawl_id=crawl.id,
+        project_id=crawl.project_id,
+        finished_at=crawl.finished_at or datetime.utcnow(),
+        site_health=crawl.site_health,
+        total_urls=len(metric_rows),
+    )
+    for col, metric in enumerate(PSI_METRICS):
+        for pct, value in zip(PERCENTILES, _percentiles(metrics[:, col])):
+            setattr(rollup, f"{metric}_p{pct}", value)
+
+    counts = (
+        db.query(models.Issue.issue_type_id, models.IssueType.severity, func.count(models.Issue.id))
+        .join(models.IssueType, models.Issue.issue_type_id == models.IssueType.id)
+        .filter(models.Issue.crawl_id == crawl.id)
+        .group_by(models.Issue.issue_type_id, models.IssueType.severity)
+        .all()
+    )
+    rollup.total_issues = sum(count for _, _, count in counts)
+    db.add(rollup)
+    db.flush()
+
+    db.bulk_insert_mappings(models.CrawlIssueRollup, [
+        {
+            "project_id": crawl.project_id,
+            "crawl_id": crawl.id,
+            "issue_type_id": issue_type_id,
+            "severity": severity,
+            "issue_count": count,
+        }
+        for issue_type_id, severity, count in counts
+    ])
+    db.commit()
+    return rollup
+
+
+def load_trends(
+    db: Session,
+    project_id: int,
+    since: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> List[dict]:
+    """
+    Serie temporal del proyecto (un punto por crawl, del más antiguo al más reciente).
+    """
+    # Los `limit` crawls más recientes se eligen en SQL: sólo se leen sus filas
+    latest = db.query(models.CrawlRollup.crawl_id).filter(models.CrawlRollup.project_id == project_id)
+    if since is not None:
+        latest = latest.filter(models.CrawlRollup.finished_at >= since)
+    if limit:
+        latest = latest.order_by(
+            models.CrawlRollup.finished_at.desc(), models.CrawlRollup.crawl_id.desc(),
+        ).limit(limit)
+    latest = latest.subquery()
+
+    query = (
+        db.query(
+            models.CrawlRollup,
+            models.IssueType.code,
+            models.CrawlIssueRollup.severity,
+            models.CrawlIssueRollup.issue_count,
+        )
+        .join(latest, latest.c.crawl_id == models.CrawlRollup.crawl_id)
+        .outerjoin(models.CrawlIssueRollup, models.CrawlIssueRollup.crawl_id == models.CrawlRollup.crawl_id)
+        .outerjoin(models.IssueType, models.IssueType.id == models.CrawlIssueRollup.issue_type_id)
+        .order_by(models.CrawlRollup.finished_at, models.CrawlRollup.crawl_id)
+    )
+
+    points: Dict[int, dict] = {}
+    for rollup, code, severity, count in query:
+        point = points.get(rollup.crawl_id)
+        if point is None:
+            point = points[rollup.crawl_id] = {
+                "crawl_id": rollup.crawl_id,
+                "finished_at": rollup.finished_at,
+                "site_health": rollup.site_health,
+                "total_urls": rollup.total_urls,
+                "total_issues": rollup.total_issues,
+                "issues_by_severity": {},
+                "issues_by_type": {},
+                "psi": {
+                    metric: {f"p{pct}": getattr(rollup, f"{metric}_p{pct}") for pct in PERCENTILES}
+                    for metric in PSI_METRICS
+                },
+            }
+        if code is not None:
+            by_severity = point["issues_by_severity"]
+            by_severity[severity] = by_severity.get(severity, 0) + count
+            point["issues_by_type"][code] = count
+    return list(points.values())
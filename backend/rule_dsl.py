@@ -0,0 +1,225 @@
+# backend/rule_dsl.py
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    Boolean, DateTime, Float, Integer, String, Text, and_, bindparam, case, cast, insert, literal, or_, select,
+)
+from sqlalchemy.orm import Session
+
+from . import models
+
+"""
+Condiciones declarativas del catálogo compiladas a SQL.
+
+Muchas reglas son simples predicados sobre columnas de `urls` (TITLE_MISSING,
+TITLE_TOO_LONG, CONTENT_THIN, CRAWL_ERROR_4XX, PERF_LCP_SLOW...). Una entrada de
+DEFAULT_ISSUE_TYPES puede llevar una "condition":
+
+    "condition": {
+        "where": [
+            ("status_code", "between", 200, 299),
+            ("title_length", ">", "max_length"),
+        ],
+        "params": {"max_length": 60},
+        "details": {"length": "title_length", "max": "max_length"},
+    }
+
+- where: lista de (columna de Url, operador, operandos...) unidas con AND.
+  Operadores: = != < <= > >= between, is_null, not_null, empty (NULL o ''),
+  not_empty. Un operando que es el nombre de un parámetro se sustituye por
+  su valor; el resto son literales.
+- params: umbrales con su valor por defecto, configurables por proyecto
+  (crawl_config.rule_thresholds).
+- details: objeto JSON del issue; cada valor es una columna numérica o
+  booleana de Url o un parámetro.
+
+compile_rules() convierte cada condición, una vez al importar el catálogo, en
+un INSERT INTO issues (...) SELECT ... FROM urls WHERE crawl_id = :crawl_id
+AND ..., con los umbrales como parámetros enlazados. run_sql_rules() ejecuta
+una sentencia por regla: las filas de `urls` no salen de la base de datos.
+"""
+
+_COMPARISONS = {
+    "=": lambda col, v: col == v,
+    "!=": lambda col, v: col != v,
+    "<": lambda col, v: col < v,
+    "<=": lambda col, v: col <= v,
+    ">": lambda col, v: col > v,
+    ">=": lambda col, v: col >= v,
+}
+_UNARY = {
+    "is_null": lambda col: col.is_(None),
+    "not_null": lambda col: col.isnot(None),
+    "empty": lambda col: or_(col.is_(None), col == ""),
+    "not_empty": lambda col: and_(col.isnot(None), col != ""),
+}
+
+_URL_COLUMNS = models.Url.__table__.columns
+# Columnas que pueden ir en details sin escapar texto: números y booleanos
+_DETAIL_TYPES = (Integer, Boolean, Float)
+
+
+class SqlRule:
+    """
+    Regla compilada: INSERT ... SELECT con parámetros enlazados.
+    """
+
+    def __init__(self, code: str, params: Dict[str, float], statement):
+        self.code = code
+        self.params = params
+        self.statement = statement
+
+    def bind(self, crawl_id: int, issue_type_id: int, now: datetime, thresholds: Mapping[str, float]) -> Dict[str, Any]:
+        values = {**self.params, **{k: v for k, v in thresholds.items() if k in self.params and v is not None}}
+        bound: Dict[str, Any] = {"crawl_id": crawl_id, "issue_type_id": issue_type_id, "now": now}
+        for name, value in values.items():
+            bound[f"p_{name}"] = value
+            bound[f"j_{name}"] = json.dumps(value)  # el mismo valor como texto JSON para details
+        return bound
+
+
+# -------------------------------------------------------------------
+# COMPILADOR
+# -------------------------------------------------------------------
+
+def _column(code: str, name: str):
+    if name not in _URL_COLUMNS:
+        raise ValueError(f"{code}: columna desconocida en condition: {name}")
+    return _URL_COLUMNS[name]
+
+
+def _operand(value: Any, params: Dict[str, float]):
+    if isinstance(value, str) and value in params:
+        return bindparam(f"p_{value}", type_=Float)
+    return literal(value)
+
+
+def _predicate(code: str, clause: Sequence[Any], params: Dict[str, float]):
+    name, op, *operands = clause
+    col = _column(code, name)
+    if op in _UNARY and not operands:
+        return _UNARY[op](col)
+    if op in _COMPARISONS and len(operands) == 1:
+        return _COMPARISONS[op](col, _operand(operands[0], params))
+    if op == "between" and len(operands) == 2:
+        return col.between(_operand(operands[0], params), _operand(operands[1], params))
+    raise ValueError(f"{code}: cláusula no válida en condition: {tuple(clause)}")
+
+
+def _details_expr(code: str, details: Optional[Dict[str, str]], params: Dict[str, float]):
+    """
+    Texto JSON concatenado en SQL ('{"length": ' || CAST(title_length AS TEXT) || ...).
+    """
+    if not details:
+        return literal(None, Text)
+    parts: List[Any] = []
+    for i, (key, source) in enumerate(details.items()):
+        parts.append(literal(("{" if i == 0 else ", ") + json.dumps(key) + ": "))
+        if source in params:
+            parts.append(bindparam(f"j_{source}", type_=String))
+            continue
+        col = _column(code, source)
+        if not isinstance(col.type, _DETAIL_TYPES):
+            raise ValueError(f"{code}: details sólo admite columnas numéricas o booleanas: {source}")
+        if isinstance(col.type, Boolean):
+            parts.append(case((col.is_(True), "true"), (col.is_(False), "false"), else_="null"))
+        else:
+            parts.append(case((col.is_(None), "null"), else_=cast(col, Text)))
+    parts.append(literal("}"))
+    expr = parts[0]
+    for part in parts[1:]:
+        expr = expr.concat(part)
+    return expr
+
+
+def compile_condition(code: str, condition: Dict[str, Any]) -> SqlRule:
+    """
+    ValueError si la condición no es válida (se detecta al importar el catálogo).
+    """
+    params = dict(condition.get("params") or {})
+    where = [_predicate(code, clause, params) for clause in condition["where"]]
+    url = models.Url
+    query = select(
+        bindparam("crawl_id", type_=Integer),
+        url.id,
+        bindparam("issue_type_id", type_=Integer),
+        literal("pending", String),
+        literal(False, Boolean),
+        _details_expr(code, condition.get("details"), params),
+        bindparam("now", type_=DateTime),
+        bindparam("now", type_=DateTime),
+        bindparam("crawl_id", type_=Integer),
+    ).where(url.crawl_id == bindparam("crawl_id", type_=Integer), *where)
+
+    issue = models.Issue.__table__.c
+    statement = insert(models.Issue.__table__).from_select(
+        [
+            issue.crawl_id, issue.url_id, issue.issue_type_id, issue.status, issue.implemented,
+            issue.details, issue.created_at, issue.updated_at, issue.first_seen_crawl_id,
+        ],
+        query,
+    )
+    return SqlRule(code, params, statement)
+
+
+def compile_rules(issue_types: Sequence[Dict[str, Any]]) -> Dict[str, SqlRule]:
+    return {
+        it["code"]: compile_condition(it["code"], it["condition"])
+        for it in issue_types
+        if it.get("condition")
+    }
+
+
+# -------------------------------------------------------------------
+# EJECUCIÓN
+# -------------------------------------------------------------------
+
+def validate_thresholds(rules: Mapping[str, SqlRule], thresholds: Mapping[str, Mapping[str, Any]]) -> None:
+    """
+    ValueError si algún umbral no corresponde a un parámetro de una regla SQL.
+    """
+    for code, values in thresholds.items():
+        rule = rules.get(code)
+        if rule is None:
+            raise ValueError(f"{code} has no configurable thresholds")
+        for name, value in values.items():
+            if name not in rule.params:
+                raise ValueError(f"{code} has no threshold '{name}' (valid: {', '.join(rule.params)})")
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise ValueError(f"{code}.{name} must be a number")
+
+
+def effective_thresholds(
+    rules: Mapping[str, SqlRule], overrides: Optional[Mapping[str, Mapping[str, float]]],
+) -> Dict[str, Dict[str, float]]:
+    overrides = overrides or {}
+    return {
+        code: {**rule.params, **{k: v for k, v in (overrides.get(code) or {}).items() if v is not None}}
+        for code, rule in rules.items()
+        if rule.params
+    }
+
+
+def run_sql_rules(
+    db: Session,
+    crawl: models.Crawl,
+    rules: Mapping[str, SqlRule],
+    issue_type_ids: Dict[str, int],
+    thresholds: Optional[Mapping[str, Mapping[str, float]]] = None,
+) -> List[Tuple[str, int]]:
+    """
+    Inserta los issues de cada regla SQL (sin commit). Devuelve (código, filas)
+    por regla. Los issues quedan sin fingerprint (ver
+    issue_lifecycle.fill_fingerprints).
+    """
+    thresholds = thresholds or {}
+    now = datetime.utcnow()
+    counts: List[Tuple[str, int]] = []
+    for code, rule in rules.items():
+        if code not in issue_type_ids:
+            continue
+        result = db.execute(rule.statement, rule.bind(crawl.id, issue_type_ids[code], now, thresholds.get(code) or {}))
+        counts.append((code, result.rowcount or 0))
+    return counts
@@ -1,6 +1,6 @@
 # backend/schemas.py
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 
@@ -26,11 +26,57 @@ class CrawlOut(BaseModel):
     finished_at: Optional[datetime]
     status: str
     site_health: float
+    estimated_cost_usd: Optional[float] = None
+    estimated_duration_s: Optional[float] = None
+    compacted_at: Optional[datetime] = None  # sin urls / issues: sólo quedan los rollups
 
     class Config:
         orm_mode = True
 
 
+class CrawlConfigOut(BaseModel):
+    max_pages: int
+    enable_javascript: bool
+    load_resources: bool
+    psi_samples_per_template: Optional[int]  # None = valor global (PSI_SAMPLES_PER_TEMPLATE)
+    psi_strategies: List[str]
+    include_patterns: List[str]
+    exclude_patterns: List[str]
+    rule_thresholds: Dict[str, Dict[str, float]]  # código -> umbral -> valor efectivo
+    retention_full_crawls: int  # crawls terminados que conservan urls / issues
+    retention_full_days: int  # y crawls de los últimos N días
+
+
+class CrawlConfigUpdate(BaseModel):
+    max_pages: Optional[int] = None
+    enable_javascript: Optional[bool] = None
+    load_resources: Optional[bool] = None
+    psi_samples_per_template: Optional[int] = None
+    psi_strategies: Optional[List[str]] = None
+    include_patterns: Optional[List[str]] = None
+    exclude_patterns: Optional[List[str]] = None
+    rule_thresholds: Optional[Dict[str, Dict[str, Optional[float]]]] = None  # null = valor por defecto
+    retention_full_crawls: Optional[int] = None
+    retention_full_days: Optional[int] = None
+
+
+class CrawlEstimate(BaseModel):
+    pages: int
+    psi_calls: int
+    cost_usd: float
+    duration_s: float
+    basis: str  # "defaults" o "crawl <id>" si se usó el histórico del proyecto
+
+
+class MaintenanceReport(BaseModel):
+    skipped: bool  # otro worker ya estaba ejecutando el mantenimiento
+    dry_run: bool
+    plan: Dict[int, List[int]]  # project_id -> crawls a compactar
+    crawls: List[int]  # crawls compactados
+    partitions_dropped: List[int]  # primer crawl_id de cada partición eliminada
+    deleted: Dict[str, int]  # filas borradas con DELETE por tabla
+
+
 class IssueTypeOut(BaseModel):
     id: int
     code: str
@@ -49,16 +95,30 @@ class IssueTypeOut(BaseModel):
 class IssueOut(BaseModel):
     id: int
     url_id: int
+    url: Optional[str] = None  # URL afectada (details sólo guarda los datos de la regla)
     issue_type: IssueTypeOut
     status: str
     implemented: bool
     details: Optional[str]
     comment: Optional[str]
+    pagerank: Optional[float] = None  # PageRank interno de la URL (media 1.0)
+    first_seen_crawl_id: Optional[int] = None
 
     class Config:
         orm_mode = True
 
 
+class IssueQueueItem(BaseModel):
+    id: int
+    url_id: int
+    url: str
+    code: str
+    severity: str
+    status: str
+    pagerank: Optional[float]
+    priority: float
+
+
 class IssueUpdate(BaseModel):
     implemented: Optional[bool] = None
     status: Optional[str] = None
@@ -72,6 +132,7 @@ class UrlOut(BaseModel):
     title: Optional[str]
     performance_score_mobile: Optional[float]
     performance_score_desktop: Optional[float]
+    psi_estimated: Optional[bool]
 
     class Config:
         orm_mode = True
@@ -84,3 +145,44 @@ class CrawlSummary(BaseModel):
     issues_by_severity: dict
     issues_by_category: dict
     site_health: float
+
+
+class PsiPercentiles(BaseModel):
+    p50: Optional[float]
+    p75: Optional[float]
+    p95: Optional[float]
+
+
+class TrendPoint(BaseModel):
+    crawl_id: int
+    finished_at: datetime
+    site_health: Optional[float]
+    total_urls: int
+    total_issues: int
+    issues_by_severity: dict
+    issues_by_type: dict
+    psi: Dict[str, PsiPercentiles]  # lcp | cls | tbt
+
+
+class DiffTypeCount(BaseModel):
+    code: str
+    severity: str
+    new: int
+    persisting: int
+    resolved: int
+
+
+class DiffItem(BaseModel):
+    issue_id: int
+    crawl_id: int
+    url: str
+    code: str
+    status: str
+
+
+class CrawlDiff(BaseModel):
+    crawl_id: int
+    previous_crawl_id: int
+    summary: Dict[str, int]  # new | persisting | resolved
+    by_type: List[DiffTypeCount]
+    items: Optional[List[DiffItem]] = None
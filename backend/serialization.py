@@ -0,0 +1,79 @@
+# backend/serialization.py
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from . import models
+
+"""
+Serialización rápida para los endpoints de listados grandes.
+
+En lugar de cargar objetos ORM y pasarlos por los modelos Pydantic (orm_mode) y
+el encoder JSON por defecto de FastAPI, consultamos sólo las columnas necesarias
+(tuplas) y las convertimos a dicts que orjson serializa directamente
+(datetimes incluidos). La forma del JSON es la misma que la de los schemas.
+"""
+
+# Columnas en el mismo orden y con los mismos nombres que schemas.CrawlOut
+CRAWL_COLUMNS = (
+    models.Crawl.id,
+    models.Crawl.project_id,
+    models.Crawl.started_at,
+    models.Crawl.finished_at,
+    models.Crawl.status,
+    models.Crawl.site_health,
+    models.Crawl.estimated_cost_usd,
+    models.Crawl.estimated_duration_s,
+    models.Crawl.compacted_at,
+)
+
+# Columnas de schemas.IssueOut (sin el issue_type anidado).
+# Url.url y Url.pagerank requieren hacer join con urls en la consulta.
+ISSUE_COLUMNS = (
+    models.Issue.id,
+    models.Issue.url_id,
+    models.Url.url,
+    models.Issue.status,
+    models.Issue.implemented,
+    models.Issue.details,
+    models.Issue.comment,
+    models.Url.pagerank,
+    models.Issue.first_seen_crawl_id,
+)
+
+# Columnas de schemas.IssueTypeOut
+ISSUE_TYPE_COLUMNS = (
+    models.IssueType.id,
+    models.IssueType.code,
+    models.IssueType.name,
+    models.IssueType.severity,
+    models.IssueType.category,
+    models.IssueType.description,
+    models.IssueType.fix_template_for_impl,
+    models.IssueType.why_it_matters,
+    models.IssueType.technical_notes,
+)
+
+
+def column_keys(columns: Sequence[Any]) -> Tuple[str, ...]:
+    return tuple(c.key for c in columns)
+
+
+CRAWL_KEYS = column_keys(CRAWL_COLUMNS)
+ISSUE_KEYS = column_keys(ISSUE_COLUMNS)
+ISSUE_TYPE_KEYS = column_keys(ISSUE_TYPE_COLUMNS)
+
+
+def rows_to_dicts(keys: Tuple[str, ...], rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def issue_rows_to_dicts(rows: Iterable[Sequence[Any]], issue_type: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Todas las filas de un listado por tipo comparten el mismo issue_type:
+    se construye una vez y se referencia desde cada issue.
+    """
+    out = []
+    for row in rows:
+        item = dict(zip(ISSUE_KEYS, row))
+        item["issue_type"] = issue_type
+        out.append(item)
+    return out
@@ -0,0 +1,241 @@
+# backend/sitemap.py
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Iterator, List, Optional, Set, Tuple
+from xml.etree.ElementTree import iterparse, ParseError
+
+import requests
+
+from .config import SITEMAPS_DIR
+from .robots import RobotsMatcher, fetch_robots
+
+"""
+Análisis en streaming de sitemaps (índices, urlsets y .xml.gz).
+
+Cada sitemap se descarga en streaming y se parsea con iterparse, liberando cada
+<url>/<sitemap> al terminar de leerlo: la memoria es constante aunque el fichero
+tenga 50.000 URLs. Los sitemaps hijos de un índice se descargan en paralelo.
+
+El resultado (estado de robots.txt, estadísticas por sitemap y el conjunto de
+URLs listadas) se guarda por crawl en SITEMAPS_DIR/crawl_<id>.json.gz para que
+las reglas lo crucen con las filas Url del crawl.
+"""
+
+# Límites de Google por fichero de sitemap
+SITEMAP_MAX_URLS = 50_000
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+
+REQUEST_TIMEOUT = 30
+MAX_WORKERS = 8
+MAX_SITEMAPS = 1000  # tope de ficheros por sitio, por seguridad
+
+_GZIP_MAGIC = b"\x1f\x8b"
+# Sólo los <loc> de este espacio de nombres (o sin espacio de nombres) hijos de
+# <url>/<sitemap> son páginas o sitemaps; <image:loc>, <video:loc>... no cuentan.
+_SITEMAP_NAMESPACES = ("http://www.sitemaps.org/schemas/sitemap/0.9", "")
+
+
+@dataclass
+class SitemapStats:
+    url: str
+    status_code: Optional[int] = None
+    kind: Optional[str] = None       # urlset | sitemapindex
+    url_count: int = 0
+    uncompressed_bytes: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class SiteFilesReport:
+    robots_status: Optional[int] = None
+    robots_txt: str = ""
+    sitemaps: List[SitemapStats] = field(default_factory=list)
+    urls: Set[str] = field(default_factory=set)
+
+    @property
+    def sitemap_found(self) -> bool:
+        return any(s.kind == "urlset" and s.error is None for s in self.sitemaps)
+
+
+class _CountingReader:
+    """
+    Envuelve el stream para contar bytes descomprimidos mientras parsea iterparse.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.count = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._raw.read(size)
+        self.count += len(data)
+        return data
+
+
+def _split_tag(tag: str) -> Tuple[str, str]:
+    """
+    "{ns}nombre" -> (ns, nombre); sin espacio de nombres -> ("", nombre).
+    """
+    if tag.startswith("{"):
+        ns, _, name = tag[1:].partition("}")
+        return ns, name
+    return "", tag
+
+
+class _PrefixedReader:
+    """
+    Devuelve primero los bytes ya leídos (para detectar gzip) y luego el resto del stream.
+    """
+
+    def __init__(self, prefix: bytes, raw):
+        self._prefix = prefix
+        self._raw = raw
+
+    def read(self, size: int = -1) -> bytes:
+        if self._prefix:
+            if size is None or size < 0:
+                data, self._prefix = self._prefix + self._raw.read(), b""
+                return data
+            data, self._prefix = self._prefix[:size], self._prefix[size:]
+            if len(data) < size:
+                data += self._raw.read(size - len(data))
+            return data
+        return self._raw.read(size)
+
+
+def _open_stream(resp: requests.Response):
+    """
+    urllib3 ya quita el Content-Encoding: gzip; un .xml.gz servido así llega
+    descomprimido, de modo que sólo los bytes mágicos deciden si hay otra capa.
+    """
+    resp.raw.decode_content = True
+    head = resp.raw.read(2)
+    rest = _PrefixedReader(head, resp.raw)
+    if head == _GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=rest)
+    return rest
+
+
+def iter_sitemap(url: str, stats: SitemapStats) -> Iterator[Tuple[str, str]]:
+    """
+    Itera un sitemap devolviendo ("url", loc) o ("sitemap", loc) sin cargarlo
+    entero en memoria. Rellena `stats` (status, tipo, nº de URLs, bytes).
+    """
+    try:
+        resp = requests.get(url, stream=True, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as exc:
+        stats.error = type(exc).__name__
+        return
+    stats.status_code = resp.status_code
+    if resp.status_code != 200:
+        stats.error = f"HTTP {resp.status_code}"
+        resp.close()
+        return
+
+    reader = _CountingReader(_open_stream(resp))
+    root = None
+    path: List[Tuple[str, str]] = []  # (ns, nombre) de los elementos abiertos
+    try:
+        for event, elem in iterparse(reader, events=("start", "end")):
+            if event == "start":
+                path.append(_split_tag(elem.tag))
+                if root is None:
+                    root, stats.kind = elem, path[0][1]
+                continue
+            ns, name = path.pop()
+            parent = path[-1] if path else ("", "")
+            if (
+                name == "loc"
+                and ns in _SITEMAP_NAMESPACES
+                and parent[0] in _SITEMAP_NAMESPACES
+                and parent[1] in ("url", "sitemap")
+            ):
+                loc = (elem.text or "").strip()
+                if loc:
+                    stats.url_count += 1
+                    yield ("sitemap" if stats.kind == "sitemapindex" else "url"), loc
+            if name in ("url", "sitemap") and ns in _SITEMAP_NAMESPACES:
+                # Liberar lo ya procesado mantiene la memoria constante.
+                root.clear()
+    except (ParseError, OSError, EOFError) as exc:
+        stats.error = type(exc).__name__
+    finally:
+        stats.uncompressed_bytes = reader.count
+        resp.close()
+
+
+def _process_sitemap(url: str) -> Tuple[SitemapStats, List[str], List[str]]:
+    stats = SitemapStats(url=url)
+    urls: List[str] = []
+    children: List[str] = []
+    for kind, loc in iter_sitemap(url, stats):
+        (children if kind == "sitemap" else urls).append(loc)
+    return stats, urls, children
+
+
+def base_url(domain: str) -> str:
+    return domain.rstrip("/") if "://" in domain else f"https://{domain.rstrip('/')}"
+
+
+def analyze_site_files(domain: str, max_workers: int = MAX_WORKERS) -> SiteFilesReport:
+    """
+    Descarga robots.txt, descubre los sitemaps (directivas Sitemap: o /sitemap.xml)
+    y recorre índices y sitemaps hijos en paralelo, nivel a nivel.
+    """
+    base = base_url(domain)
+    report = SiteFilesReport()
+    report.robots_status, report.robots_txt = fetch_robots(base)
+
+    pending = RobotsMatcher(report.robots_txt).sitemaps or [f"{base}/sitemap.xml"]
+    seen: Set[str] = set()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending and len(seen) < MAX_SITEMAPS:
+            batch = [u for u in dict.fromkeys(pending) if u not in seen][:MAX_SITEMAPS - len(seen)]
+            seen.update(batch)
+            pending = []
+            for stats, urls, children in pool.map(_process_sitemap, batch):
+                report.sitemaps.append(stats)
+                report.urls.update(urls)
+                pending.extend(children)
+
+    return report
+
+
+# -------------------------------------------------------------------
+# PERSISTENCIA
+# -------------------------------------------------------------------
+
+def report_path(crawl_id: int) -> str:
+    return os.path.join(SITEMAPS_DIR, f"crawl_{crawl_id}.json.gz")
+
+
+def save_report(crawl_id: int, report: SiteFilesReport) -> str:
+    os.makedirs(SITEMAPS_DIR, exist_ok=True)
+    path = report_path(crawl_id)
+    payload = {
+        "robots_status": report.robots_status,
+        "robots_txt": report.robots_txt,
+        "sitemaps": [asdict(s) for s in report.sitemaps],
+        "urls": sorted(report.urls),
+    }
+    with gzip.open(path, "wt", encoding="utf-8") as fh:
+        json.dump(payload, fh)
+    return path
+
+
+def load_report(crawl_id: int) -> Optional[SiteFilesReport]:
+    path = report_path(crawl_id)
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        payload = json.load(fh)
+    return SiteFilesReport(
+        robots_status=payload["robots_status"],
+        robots_txt=payload["robots_txt"],
+        sitemaps=[SitemapStats(**s) for s in payload["sitemaps"]],
+        urls=set(payload["urls"]),
+    )
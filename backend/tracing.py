@@ -0,0 +1,134 @@
+# backend/tracing.py
+import cProfile
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+import orjson
+
+from .config import PROFILES_DIR, TRACES_DIR
+
+"""
+Trazas por crawl (spans al estilo OpenTelemetry) y perfilado opcional.
+
+crawl_trace() abre una traza para un crawl: cada span (etapa de run_crawl,
+llamada a DataForSEO o PSI) se escribe al terminar como una línea JSON en
+TRACES_DIR/crawl_<id>.jsonl con trace_id, span_id, parent_id, nombre, inicio
+(unix ns), duración, estado y atributos. Se escribe span a span, así que la
+traza de un crawl que se cae a mitad también queda en disco.
+
+Fuera de una traza, span() no hace nada (un ContextVar.get()), por lo que se
+puede dejar en los caminos calientes.
+
+Con profile=True, las etapas marcadas con profiled() (ingesta y motor de
+reglas) se perfilan con cProfile y el resultado (formato pstats) se guarda en
+PROFILES_DIR/crawl_<id>.prof para descargarlo.
+"""
+
+
+class _Trace:
+    def __init__(self, crawl_id: int, profile: bool):
+        self.trace_id = secrets.token_hex(16)
+        self.crawl_id = crawl_id
+        os.makedirs(TRACES_DIR, exist_ok=True)
+        self._fh = open(trace_path(crawl_id), "wb")
+        self._lock = threading.Lock()
+        self.profiler: Optional[cProfile.Profile] = cProfile.Profile() if profile else None
+
+    def export(self, record: Dict[str, Any]) -> None:
+        line = orjson.dumps(record, default=str) + b"\n"
+        with self._lock:
+            self._fh.write(line)
+            self._fh.flush()
+
+    def close(self) -> None:
+        self._fh.close()
+        if self.profiler is not None:
+            os.makedirs(PROFILES_DIR, exist_ok=True)
+            self.profiler.dump_stats(profile_path(self.crawl_id))
+
+
+_current_trace: ContextVar[Optional[_Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+
+
+def trace_path(crawl_id: int) -> str:
+    return os.path.join(TRACES_DIR, f"crawl_{crawl_id}.jsonl")
+
+
+def profile_path(crawl_id: int) -> str:
+    return os.path.join(PROFILES_DIR, f"crawl_{crawl_id}.prof")
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Span hijo del span actual. Devuelve el dict de atributos para que el
+    llamador pueda añadir datos (p.ej. el status HTTP) antes de cerrarlo.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield attributes
+        return
+
+    span_id = secrets.token_hex(8)
+    parent_id = _current_span.get()
+    token = _current_span.set(span_id)
+    start_ns = time.time_ns()
+    start = time.perf_counter()
+    status, error = "ok", None
+    try:
+        yield attributes
+    except BaseException as exc:
+        status = "error"
+        error = attributes.pop("error", None) or type(exc).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        trace.export({
+            "trace_id": trace.trace_id,
+            "span_id": span_id,
+            "parent_id": parent_id,
+            "name": name,
+            "start_unix_ns": start_ns,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            "status": status,
+            "error": error,
+            "attributes": attributes,
+        })
+
+
+@contextmanager
+def crawl_trace(crawl_id: int, profile: bool = False) -> Iterator[None]:
+    """
+    Traza de un crawl completo (span raíz "crawl").
+    """
+    trace = _Trace(crawl_id, profile)
+    token = _current_trace.set(trace)
+    try:
+        with span("crawl", crawl_id=crawl_id, profile=profile):
+            yield
+    finally:
+        _current_trace.reset(token)
+        trace.close()
+
+
+@contextmanager
+def profiled() -> Iterator[None]:
+    """
+    Perfila el bloque con cProfile si la traza actual se abrió con profile=True.
+    """
+    trace = _current_trace.get()
+    profiler = trace.profiler if trace is not None else None
+    if profiler is None:
+        yield
+        return
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
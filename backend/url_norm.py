@@ -0,0 +1,175 @@
+# backend/url_norm.py
+import hashlib
+import posixpath
+import re
+from typing import Dict, Iterable, List
+from urllib.parse import quote, unquote, urlsplit, urlunsplit
+
+from sqlalchemy.orm import Session
+
+from . import models
+
+"""
+Normalización canónica de URLs e internado (URL -> id entero estable por proyecto).
+
+Comparar URLs como TEXT falla por diferencias irrelevantes (barra final,
+mayúsculas en el host, puerto por defecto, parámetros de tracking, fragmentos) y
+repite cadenas largas en todas partes. Aquí:
+- normalize_url() produce una forma canónica;
+- url_hash() es un hash de 64 bits de esa forma (columna BigInteger indexada);
+- intern_urls() asigna a cada URL normalizada un id estable en `url_keys`
+  por proyecto, de modo que cruces y diffs entre crawls se hacen con enteros.
+"""
+
+# Parámetros de tracking que no cambian el contenido de la página
+TRACKING_PARAMS = {
+    "gclid", "dclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "igshid", "ref_src",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Caracteres que no hace falta codificar en ruta y query (RFC 3986 + sub-delims)
+_PATH_SAFE = "/:@!$&'()*+,;=-._~"
+_QUERY_SAFE = "/:@!$'()*+,;-._~?"
+_MULTI_SLASH_RE = re.compile(r"/{2,}")
+# Un escape %XX o cualquier carácter que no sea alfanumérico ASCII
+_ESCAPE_OR_CHAR_RE = re.compile(r"%[0-9A-Fa-f]{2}|[^A-Za-z0-9]")
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+# Tamaño de lote para las consultas IN del internado
+INTERN_BATCH_SIZE = 500
+
+
+def _is_tracking(param: str) -> bool:
+    name = param.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def _normalize_escapes(text: str, safe: str) -> str:
+    """
+    Normaliza el percent-encoding sin cambiar el significado (RFC 3986, 6.2.2):
+    hex de los escapes en mayúsculas, sólo se decodifican los no reservados
+    (%7E -> ~) y se codifica lo que no es seguro (espacios, no ASCII, % suelto).
+    %2F, %2B, %26, %3D... se conservan: /a%2Fb no es /a/b ni q=a%2Bb es q=a+b.
+    """
+    def fix(match: "re.Match[str]") -> str:
+        token = match.group(0)
+        if len(token) == 3:
+            char = chr(int(token[1:], 16))
+            return char if char in _UNRESERVED else token.upper()
+        return token if token in safe else quote(token, safe="")
+
+    return _ESCAPE_OR_CHAR_RE.sub(fix, text)
+
+
+def normalize_domain(domain: str) -> str:
+    """
+    Forma canónica de Project.domain: host en minúsculas, sin esquema, ruta,
+    puerto por defecto ni punto final. "https://Example.com:443/" -> "example.com"
+    ValueError si no hay host o el puerto no es válido ("example.com:abc").
+    """
+    value = domain.strip()
+    parts = urlsplit(value if "://" in value else f"//{value}")
+    host = (parts.hostname or "").rstrip(".")
+    port = parts.port  # ValueError si no es un número entre 0 y 65535
+    if not host:
+        raise ValueError(f"Invalid domain: {domain!r}")
+    if port and port not in DEFAULT_PORTS.values():
+        host = f"{host}:{port}"
+    return host
+
+
+def normalize_url(url: str) -> str:
+    """
+    Forma canónica de una URL absoluta:
+    - esquema y host en minúsculas, sin puerto por defecto ni punto final en el host;
+    - ruta sin segmentos ./.., sin barras repetidas ni barra final (salvo la raíz),
+      con el percent-encoding normalizado;
+    - query sin parámetros de tracking y ordenada por nombre (los valores de un
+      parámetro repetido mantienen su orden); sin fragmento.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    port = parts.port
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        host = f"{host}:{port}"
+
+    path = _normalize_escapes(parts.path, _PATH_SAFE) or "/"
+    path = _MULTI_SLASH_RE.sub("/", path)
+    if path != "/":
+        path = posixpath.normpath(path)
+        if not path.startswith("/"):
+            path = "/" + path
+        path = path.rstrip("/") or "/"
+
+    query = ""
+    if parts.query:
+        params = []
+        for pair in parts.query.split("&"):
+            if not pair:
+                continue
+            name, _, value = pair.partition("=")
+            if _is_tracking(unquote(name)):
+                continue
+            params.append((
+                _normalize_escapes(name, _QUERY_SAFE),
+                _normalize_escapes(value, _QUERY_SAFE + "="),
+                "=" in pair,
+            ))
+        # Orden estable sólo por nombre: los valores de un parámetro repetido
+        # conservan su orden (?a=1&a=0 no es ?a=0&a=1)
+        params.sort(key=lambda p: p[0])
+        query = "&".join(f"{n}={v}" if has_eq else n for n, v, has_eq in params)
+
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def url_hash(normalized_url: str) -> int:
+    """
+    Hash de 64 bits con signo (cabe en BigInteger) de una URL ya normalizada.
+    """
+    digest = hashlib.blake2b(normalized_url.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def url_key(url: str) -> int:
+    return url_hash(normalize_url(url))
+
+
+# -------------------------------------------------------------------
+# INTERNADO EN BD
+# -------------------------------------------------------------------
+
+def intern_urls(db: Session, project_id: int, urls: Iterable[str]) -> Dict[str, models.UrlKey]:
+    """
+    Devuelve URL original -> UrlKey (id estable por proyecto) para cada URL,
+    creando en bloque las claves que aún no existen.
+    """
+    normalized_by_url = {u: normalize_url(u) for u in urls}
+    hash_of = {n: url_hash(n) for n in set(normalized_by_url.values())}
+    by_hash = {h: n for n, h in hash_of.items()}
+
+    existing: Dict[int, models.UrlKey] = {}
+    hashes: List[int] = list(by_hash)
+    for i in range(0, len(hashes), INTERN_BATCH_SIZE):
+        chunk = hashes[i:i + INTERN_BATCH_SIZE]
+        for key in (
+            db.query(models.UrlKey)
+            .filter(models.UrlKey.project_id == project_id, models.UrlKey.url_hash.in_(chunk))
+        ):
+            existing[key.url_hash] = key
+
+    missing = [
+        models.UrlKey(project_id=project_id, url_hash=h, normalized_url=n)
+        for h, n in by_hash.items() if h not in existing
+    ]
+    if missing:
+        db.add_all(missing)
+        db.flush()
+        for key in missing:
+            existing[key.url_hash] = key
+
+    return {u: existing[hash_of[n]] for u, n in normalized_by_url.items()}
@@ -0,0 +1,330 @@
+# backend/url_rules.py
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import unquote
+
+import numpy as np
+
+from .config import RULES_PARALLEL_MIN_URLS, RULES_WORKERS, URL_MAX_LENGTH, URL_MAX_PARAMS
+
+"""
+Reglas de texto sobre URL, title y meta description (URL_TOO_LONG,
+URL_TOO_MANY_PARAMS, URL_SPECIAL_CHARS, URL_UPPERCASE, URL_UNDERSCORES,
+HTTP_ON_HTTPS_SITE, CHARSET_ISSUES), repartidas entre procesos en crawls grandes.
+
+Lint en una pasada: cada URL se tokeniza una sola vez (una regex en lugar de
+urlsplit + una comprobación por regla) y el resultado de todas las reglas de
+la fila es una máscara de bits (RULE_BITS). Los issues se escriben desde las
+máscaras: los details sólo se calculan para las filas con algún bit activo.
+
+Son reglas de regex / str por URL que no se vectorizan con numpy y que, con
+el GIL, no escalan con hilos. Para crawls de RULES_PARALLEL_MIN_URLS URLs o más:
+
+1) Las tres columnas de texto se empaquetan una vez en un bloque de memoria
+   compartida (multiprocessing.shared_memory): los bytes UTF-8 concatenados y
+   una tabla de offsets int64 por columna, al estilo de las columnas string de
+   Arrow.
+2) Cada worker del ProcessPoolExecutor recibe sólo (nombre del bloque, rango
+   de filas): se adjunta al bloque y lee sus filas sin copiarlas por pickle.
+3) Los workers devuelven sus máscaras (un byte por fila), que se concatenan
+   en orden; los disparos salen de ahí y acaban en la única inserción masiva de
+   issues_logic.generate_issues_for_crawl.
+
+Por debajo del umbral (o con RULES_WORKERS=1) se evalúa en el propio proceso
+con el mismo código.
+"""
+
+TEXT_COLUMNS = ("url", "title", "meta_description")
+
+# Un bit por regla: la pasada sobre cada fila produce una máscara uint8 y los
+# issues (con sus details) sólo se construyen para las filas con algún bit.
+URL_TOO_LONG = 1 << 0
+URL_TOO_MANY_PARAMS = 1 << 1
+URL_SPECIAL_CHARS = 1 << 2
+URL_UPPERCASE = 1 << 3
+URL_UNDERSCORES = 1 << 4
+HTTP_ON_HTTPS_SITE = 1 << 5
+CHARSET_ISSUES = 1 << 6
+
+RULE_BITS: Tuple[Tuple[str, int], ...] = (
+    ("URL_TOO_LONG", URL_TOO_LONG),
+    ("URL_TOO_MANY_PARAMS", URL_TOO_MANY_PARAMS),
+    ("URL_SPECIAL_CHARS", URL_SPECIAL_CHARS),
+    ("URL_UPPERCASE", URL_UPPERCASE),
+    ("URL_UNDERSCORES", URL_UNDERSCORES),
+    ("HTTP_ON_HTTPS_SITE", HTTP_ON_HTTPS_SITE),
+    ("CHARSET_ISSUES", CHARSET_ISSUES),
+)
+
+# Tokenizador de URL en una sola llamada a la regex (en C), en lugar de
+# urlsplit (varias pasadas en Python por URL): esquema, ruta y query.
+_URL_RE = re.compile(r"(?:([A-Za-z][A-Za-z0-9+.\-]*):)?(?://[^/?#]*)?([^?#]*)(?:\?([^#]*))?")
+# Caracteres "interesantes" de la ruta: todo lo que no es minúscula, dígito o
+# -.~/ . Una sola búsqueda por ruta; la gran mayoría de URLs no tiene ninguno.
+_PATH_SCAN_RE = re.compile(r"[^a-z0-9\-.~/]")
+# Caracteres permitidos en la ruta ya decodificada (sin %xx): ASCII no reservado
+_SPECIAL_CHARS_RE = re.compile(r"[^A-Za-z0-9\-._~/]")
+# Mojibake típico de UTF-8 leído como Latin-1 / Windows-1252 ("Ã©", "â€™") y
+# el carácter de sustitución U+FFFD
+_MOJIBAKE_RE = re.compile("[ÂÃ][\u0080-¿]|â€|�")
+
+# Filas por shard: suficientes para amortizar el envío de la tarea
+_MIN_SHARD_ROWS = 5_000
+_SHARDS_PER_WORKER = 4
+
+Hit = Tuple[int, str, Dict[str, Any]]  # (fila, código de issue, details)
+Row = Tuple[str, Optional[str], Optional[str]]  # (url, title, meta_description)
+
+
+# -------------------------------------------------------------------
+# LINT DE UNA FILA (UNA PASADA -> MÁSCARA DE BITS)
+# -------------------------------------------------------------------
+
+def lint_url(
+    url: str,
+    https_site: bool = False,
+    max_length: int = URL_MAX_LENGTH,
+    max_params: int = URL_MAX_PARAMS,
+) -> int:
+    """
+    Todas las reglas URL_* y HTTP_ON_HTTPS_SITE con un único parseo de la URL.
+    """
+    if not url:
+        return 0
+    flags = URL_TOO_LONG if len(url) > max_length else 0
+    scheme, path, query = _URL_RE.match(url).groups()
+
+    if https_site and scheme and scheme.lower() == "http":
+        flags |= HTTP_ON_HTTPS_SITE
+    # Cota barata antes de contar parámetros no vacíos
+    if query and query.count("&") >= max_params and sum(1 for p in query.split("&") if p) > max_params:
+        flags |= URL_TOO_MANY_PARAMS
+
+    found = _PATH_SCAN_RE.findall(path)
+    if found:
+        if "%" in found:
+            # Ruta con %xx: se clasifica la ruta decodificada
+            path = unquote(path)
+            found = _PATH_SCAN_RE.findall(path)
+        for char in found:
+            if "A" <= char <= "Z":
+                flags |= URL_UPPERCASE
+            elif char == "_":
+                flags |= URL_UNDERSCORES
+            else:
+                flags |= URL_SPECIAL_CHARS
+    return flags
+
+
+def lint_row(
+    url: str,
+    title: Optional[str],
+    meta_description: Optional[str],
+    https_site: bool = False,
+    max_length: int = URL_MAX_LENGTH,
+    max_params: int = URL_MAX_PARAMS,
+) -> int:
+    flags = lint_url(url, https_site, max_length, max_params)
+    if (title and _MOJIBAKE_RE.search(title)) or (meta_description and _MOJIBAKE_RE.search(meta_description)):
+        flags |= CHARSET_ISSUES
+    return flags
+
+
+def lint_rows(
+    rows: Sequence[Row],
+    https_site: bool = False,
+    max_length: int = URL_MAX_LENGTH,
+    max_params: int = URL_MAX_PARAMS,
+) -> np.ndarray:
+    """
+    Máscara uint8 por fila.
+    """
+    return np.fromiter(
+        (lint_row(url, title, meta, https_site, max_length, max_params) for url, title, meta in rows),
+        dtype=np.uint8,
+        count=len(rows),
+    )
+
+
+def is_https_site(urls: Iterable[str]) -> bool:
+    """
+    El proyecto sólo guarda el dominio: el sitio se considera HTTPS si la
+    mayoría de sus URLs rastreadas lo son.
+    """
+    https = total = 0
+    for url in urls:
+        total += 1
+        https += url[:8].lower() == "https://"
+    return total > 0 and 2 * https > total
+
+
+def _details(code: str, row: Row, max_length: int, max_params: int) -> Optional[Dict[str, Any]]:
+    """
+    Details del issue; sólo se calculan para los bits activos.
+    """
+    url, title, meta_description = row
+    if code == "URL_TOO_LONG":
+        return {"length": len(url), "max": max_length}
+    if code == "URL_TOO_MANY_PARAMS":
+        query = _URL_RE.match(url).group(3) or ""
+        return {"params": sum(1 for p in query.split("&") if p), "max": max_params}
+    if code == "URL_SPECIAL_CHARS":
+        path = unquote(_URL_RE.match(url).group(2))
+        return {"chars": "".join(sorted(set(_SPECIAL_CHARS_RE.findall(path))))[:20]}
+    if code == "CHARSET_ISSUES":
+        return {"fields": [
+            field for field, text in (("title", title), ("meta_description", meta_description))
+            if text and _MOJIBAKE_RE.search(text)
+        ]}
+    return None
+
+
+def hits_from_masks(
+    rows: Sequence[Row],
+    masks: np.ndarray,
+    max_length: int = URL_MAX_LENGTH,
+    max_params: int = URL_MAX_PARAMS,
+) -> List[Hit]:
+    hits: List[Hit] = []
+    for index in np.flatnonzero(masks).tolist():
+        mask = int(masks[index])
+        for code, bit in RULE_BITS:
+            if mask & bit:
+                hits.append((index, code, _details(code, rows[index], max_length, max_params)))
+    return hits
+
+
+def evaluate_rows(
+    rows: Sequence[Row],
+    https_site: bool = False,
+    max_length: int = URL_MAX_LENGTH,
+    max_params: int = URL_MAX_PARAMS,
+) -> List[Hit]:
+    return hits_from_masks(rows, lint_rows(rows, https_site, max_length, max_params), max_length, max_params)
+
+
+# -------------------------------------------------------------------
+# COLUMNAS EN MEMORIA COMPARTIDA
+# -------------------------------------------------------------------
+# Bloque: [offsets int64 (columnas x (n + 1))][nulos uint8 (columnas x n)][bytes UTF-8]
+# Un valor nulo se guarda con longitud 0 y un 1 en la máscara de nulos.
+
+def _pack(rows: Sequence[Row]) -> Tuple[shared_memory.SharedMemory, int]:
+    n = len(rows)
+    columns = len(TEXT_COLUMNS)
+    encoded = [[(v.encode("utf-8") if v is not None else b"") for v in col] for col in zip(*rows)]
+    offsets = np.zeros((columns, n + 1), dtype=np.int64)
+    nulls = np.zeros((columns, n), dtype=np.uint8)
+    for c in range(columns):
+        np.cumsum([len(b) for b in encoded[c]], out=offsets[c, 1:])
+        nulls[c] = [v is None for v in (row[c] for row in rows)]
+    header = offsets.nbytes + nulls.nbytes
+    # Cada columna empieza donde acaba la anterior
+    starts = np.concatenate(([0], np.cumsum(offsets[:, -1])[:-1]))
+    offsets += starts[:, None]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, header + int(offsets[-1, -1])))
+    buf = shm.buf
+    buf[:offsets.nbytes] = offsets.tobytes()
+    buf[offsets.nbytes:header] = nulls.tobytes()
+    buf[header:header + int(offsets[-1, -1])] = b"".join(b"".join(col) for col in encoded)
+    return shm, header
+
+
+def _lint_shard(
+    name: str, n: int, header: int, start: int, end: int, https_site: bool, max_length: int, max_params: int,
+) -> bytes:
+    """
+    Se ejecuta en el worker: lee las filas [start, end) directamente del bloque
+    y devuelve sus máscaras (un byte por fila).
+    """
+    # Con "spawn" el worker comparte el resource tracker del padre: adjuntarse no
+    # crea otra entrada y el bloque sólo se libera con el unlink() del padre.
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        columns = len(TEXT_COLUMNS)
+        offsets = np.ndarray((columns, n + 1), dtype=np.int64, buffer=shm.buf)
+        nulls = np.ndarray((columns, n), dtype=np.uint8, buffer=shm.buf, offset=offsets.nbytes)
+        data = shm.buf[header:]
+
+        def column(c: int) -> List[Optional[str]]:
+            bounds = offsets[c, start:end + 1].tolist()
+            is_null = nulls[c, start:end].tolist()
+            return [
+                None if is_null[i] else str(data[bounds[i]:bounds[i + 1]], "utf-8")
+                for i in range(end - start)
+            ]
+
+        rows = list(zip(*(column(c) for c in range(columns))))
+        del offsets, nulls, data
+        return lint_rows(rows, https_site, max_length, max_params).tobytes()
+    finally:
+        shm.close()
+
+
+# -------------------------------------------------------------------
+# POOL DE PROCESOS
+# -------------------------------------------------------------------
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def worker_count() -> int:
+    return RULES_WORKERS if RULES_WORKERS > 0 else (os.cpu_count() or 1)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Pool compartido entre crawls (arrancar procesos cuesta). "spawn" porque el
+    proceso padre tiene hilos (threadpool de FastAPI) y fork no es seguro.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def evaluate_url_text_rules(
+    rows: Sequence[Row],
+    workers: Optional[int] = None,
+    min_parallel_rows: int = RULES_PARALLEL_MIN_URLS,
+    https_site: Optional[bool] = None,
+) -> List[Hit]:
+    """
+    Evalúa todas las reglas sobre filas (url, title, meta_description).
+    Devuelve los disparos ordenados por fila. https_site=None lo deduce de
+    las propias URLs (is_https_site).
+    """
+    if https_site is None:
+        https_site = is_https_site(url for url, _, _ in rows)
+    workers = workers or worker_count()
+    n = len(rows)
+    if workers <= 1 or n < max(min_parallel_rows, 2 * _MIN_SHARD_ROWS):
+        return evaluate_rows(rows, https_site)
+
+    shard_rows = max(_MIN_SHARD_ROWS, -(-n // (workers * _SHARDS_PER_WORKER)))
+    shm, header = _pack(rows)
+    try:
+        pool = _get_pool(workers)
+        futures = [
+            pool.submit(_lint_shard, shm.name, n, header, start, min(start + shard_rows, n),
+                        https_site, URL_MAX_LENGTH, URL_MAX_PARAMS)
+            for start in range(0, n, shard_rows)
+        ]
+        # En orden de shard: las máscaras quedan alineadas con las filas
+        masks = np.frombuffer(b"".join(future.result() for future in futures), dtype=np.uint8)
+        return hits_from_masks(rows, masks)
+    finally:
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,239 @@
+# benchmarks/bench_crawl.py
+"""
+Benchmark de extremo a extremo de run_crawl contra el servidor falso
+(benchmarks/fake_api.py) con sitios sintéticos (benchmarks/sites.py).
+
+Por cada tamaño de sitio se lanza un proceso limpio (BD SQLite y directorios
+temporales propios, para que el pico de RSS sea comparable) que mide:
+- e2e_s: POST /projects/{id}/crawl completo
+- ingest_rows_per_s: URLs / duración de la etapa ingest_urls
+- rules_s: duración del motor de reglas (etapa rules)
+- stages_s: duración de todas las etapas (leídas de la traza del crawl, tracing.py)
+- summary_p50_ms / summary_p95_ms: GET /projects/{id}/crawls/latest/summary
+- peak_rss_mb: memoria residente máxima del proceso
+
+Los resultados se guardan en benchmarks/results/ (JSON) y se pueden comparar
+con una ejecución anterior; el proceso sale con código 1 si alguna métrica
+empeora más que --tolerance.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_crawl [--sizes 1000,10000,100000,1000000]
+        [--latency-ms 50] [--error-rate 0.02] [--rate-limit-rate 0.01]
+        [--compare benchmarks/results/baseline.json] [--tolerance 0.15]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Métricas comparables: nombre -> True si "más alto es mejor"
+COMPARED_METRICS = {
+    "e2e_s": False,
+    "ingest_rows_per_s": True,
+    "rules_s": False,
+    "summary_p95_ms": False,
+    "peak_rss_mb": False,
+}
+
+
+# -------------------------------------------------------------------
+# PROCESO HIJO: un crawl completo
+# -------------------------------------------------------------------
+
+def _read_stage_durations(path: str) -> Dict[str, float]:
+    stages: Dict[str, float] = {}
+    with open(path, "rb") as fh:
+        for line in fh:
+            span = json.loads(line)
+            if span["name"].startswith("stage."):
+                name = span["name"][len("stage."):]
+                stages[name] = stages.get(name, 0.0) + span["duration_ms"] / 1000
+    return stages
+
+
+def run_worker(n_urls: int, summary_requests: int) -> Dict:
+    from fastapi.testclient import TestClient
+
+    from backend import main as backend_main, models
+    from backend.db import SessionLocal
+    from backend.issues_logic import ensure_issue_types
+    from backend.tracing import trace_path
+
+    db = SessionLocal()
+    ensure_issue_types(db)
+    db.close()
+
+    client = TestClient(backend_main.app)
+    # Dominio sin servidor: robots.txt / sitemaps fallan al instante sin salir a la red.
+    project = client.post("/projects", json={"name": "bench", "domain": "127.0.0.1:1"}).json()
+
+    start = time.perf_counter()
+    resp = client.post(f"/projects/{project['id']}/crawl")
+    e2e_s = time.perf_counter() - start
+    resp.raise_for_status()
+    crawl = resp.json()
+
+    stages = _read_stage_durations(trace_path(crawl["id"]))
+
+    latencies = []
+    for _ in range(summary_requests):
+        t0 = time.perf_counter()
+        client.get(f"/projects/{project['id']}/crawls/latest/summary").raise_for_status()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    latencies.sort()
+
+    db = SessionLocal()
+    issues = db.query(models.Issue).filter_by(crawl_id=crawl["id"]).count()
+    measured = db.query(models.Url).filter(
+        models.Url.crawl_id == crawl["id"], models.Url.psi_estimated.is_(False),
+        models.Url.performance_score_mobile.isnot(None),
+    ).count()
+    db.close()
+
+    ingest_s = stages.get("ingest_urls") or 0.0
+    return {
+        "urls": n_urls,
+        "issues": issues,
+        "psi_measured": measured,
+        "site_health": crawl["site_health"],
+        "e2e_s": round(e2e_s, 3),
+        "ingest_rows_per_s": round(n_urls / ingest_s, 1) if ingest_s else None,
+        "rules_s": round(stages.get("rules", 0.0), 3),
+        "stages_s": {name: round(value, 3) for name, value in stages.items()},
+        "summary_p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+        "summary_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else None,
+        # ru_maxrss está en KB en Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+# -------------------------------------------------------------------
+# PROCESO PRINCIPAL
+# -------------------------------------------------------------------
+
+def run_size(n_urls: int, args: argparse.Namespace) -> Dict:
+    from benchmarks.fake_api import FakeApiServer, FaultConfig
+    from benchmarks.sites import SyntheticSite
+
+    faults = FaultConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate)
+    with FakeApiServer(SyntheticSite(n_urls), faults) as server, tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.update(server.env())
+        env.update({
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "LINK_GRAPH_DIR": f"{tmp}/link_graphs",
+            "SITEMAPS_DIR": f"{tmp}/sitemaps",
+            "TRACES_DIR": f"{tmp}/traces",
+            "PROFILES_DIR": f"{tmp}/profiles",
+            "PSI_SAMPLES_PER_TEMPLATE": str(args.psi_samples),
+            # Sin nivel compartido: cada ejecución mide llamadas PSI reales, no aciertos de caché.
+            "CACHE_BACKEND": "memory",
+        })
+        cmd = [
+            sys.executable, "-m", "benchmarks.bench_crawl", "--worker",
+            "--urls", str(n_urls), "--summary-requests", str(args.summary_requests),
+        ]
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            sys.stderr.write(proc.stderr)
+            raise RuntimeError(f"El benchmark de {n_urls} URLs falló")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        result["fake_api"] = dict(server.stats)
+        return result
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: List[Dict], baseline: List[Dict], tolerance: float) -> bool:
+    """
+    Imprime la variación por métrica y tamaño. Devuelve True si hay regresiones.
+    """
+    by_size = {r["urls"]: r for r in baseline}
+    regressed = False
+    print(f"\n{'urls':>9}  {'metric':<20}{'baseline':>12}{'current':>12}{'delta':>9}")
+    for result in current:
+        base = by_size.get(result["urls"])
+        if base is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            delta = (new - old) / old
+            worse = -delta if higher_is_better else delta
+            flag = "  REGRESSION" if worse > tolerance else ""
+            regressed = regressed or bool(flag)
+            print(f"{result['urls']:>9}  {metric:<20}{old:>12.2f}{new:>12.2f}{delta:>+9.1%}{flag}")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000", help="tamaños de sitio separados por comas")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latencia de cada llamada PSI")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fracción de respuestas PSI 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fracción de respuestas PSI 429")
+    parser.add_argument("--psi-samples", type=int, default=3, help="PSI_SAMPLES_PER_TEMPLATE")
+    parser.add_argument("--summary-requests", type=int, default=50)
+    parser.add_argument("--output", help="fichero de resultados (por defecto benchmarks/results/<fecha>.json)")
+    parser.add_argument("--compare", help="resultados anteriores con los que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="empeoramiento tolerado (0.15 = 15%%)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--urls", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.urls, args.summary_requests)))
+        return
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = []
+    print(f"{'urls':>9}{'e2e s':>9}{'ingest rows/s':>15}{'rules s':>9}{'summary p95 ms':>16}{'peak RSS MB':>13}")
+    for n_urls in sizes:
+        r = run_size(n_urls, args)
+        results.append(r)
+        print(f"{n_urls:>9}{r['e2e_s']:>9.2f}{r['ingest_rows_per_s'] or 0:>15.0f}{r['rules_s']:>9.2f}"
+              f"{r['summary_p95_ms'] or 0:>16.2f}{r['peak_rss_mb']:>13.1f}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("worker", "urls")},
+        },
+        "results": results,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResultados guardados en {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
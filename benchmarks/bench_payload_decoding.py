@@ -0,0 +1,219 @@
+# benchmarks/bench_payload_decoding.py
+"""
+Compara CPU y memoria pico por payload entre:
+- baseline: json.loads (lo que hace requests.Response.json()) + lectura con dicts
+- msgspec:  backend.payloads (Structs tipados, descarta el resto del JSON)
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_payload_decoding [--repeat 20]
+
+Lee respuestas grabadas de benchmarks/fixtures/psi/*.json y
+benchmarks/fixtures/dataforseo/*.json. Si no hay ficheros, genera payloads
+sintéticos con la forma y el tamaño típicos (~800 KB PSI, 2000 páginas DataForSEO);
+el PSI sintético usa ids reales de auditorías (LCP, TBT, CLS y las de PERF_RULES).
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from backend.pagespeed_client import extract_performance_metrics
+from backend.payloads import decode_dataforseo, decode_psi
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+# -------------------------------------------------------------------
+# FIXTURES
+# -------------------------------------------------------------------
+
+# Ids reales de auditorías de Lighthouse (categoría performance): las métricas
+# que lee extract_performance_metrics, las de issues_logic.PERF_RULES y otras
+# oportunidades / diagnósticos habituales en una respuesta de PSI.
+PSI_METRIC_AUDITS = {
+    # id: (rango de numericValue, umbral a partir del cual el score baja de 0.9)
+    "first-contentful-paint": ((800, 4000), 1800),
+    "largest-contentful-paint": ((1200, 7000), 2500),
+    "speed-index": ((1500, 8000), 3400),
+    "total-blocking-time": ((0, 1500), 200),
+    "cumulative-layout-shift": ((0, 0.5), 0.1),
+    "interactive": ((2000, 12000), 7300),
+    "server-response-time": ((50, 1800), 600),
+    "max-potential-fid": ((20, 800), 130),
+}
+PSI_OPPORTUNITY_AUDITS = (
+    "render-blocking-resources", "unused-javascript", "unused-css-rules", "bootup-time",
+    "duplicated-javascript", "legacy-javascript", "uses-optimized-images", "modern-image-formats",
+    "uses-responsive-images", "offscreen-images", "efficient-animated-content", "uses-text-compression",
+    "uses-long-cache-ttl", "unminified-css", "unminified-javascript", "uses-rel-preconnect",
+    "redirects", "prioritize-lcp-image", "total-byte-weight", "dom-size", "mainthread-work-breakdown",
+    "third-party-summary", "font-display", "lcp-lazy-loaded", "non-composited-animations",
+    "unsized-images", "uses-passive-event-listeners", "no-document-write", "long-tasks",
+    "layout-shift-elements", "largest-contentful-paint-element", "critical-request-chains",
+    "network-requests", "network-rtt", "network-server-latency", "main-thread-tasks", "diagnostics",
+    "metrics", "screenshot-thumbnails", "final-screenshot", "resource-summary", "user-timings",
+    "bf-cache", "viewport", "third-party-facades", "uses-http2", "script-treemap-data",
+)
+
+
+def _synthetic_psi() -> bytes:
+    rnd = random.Random(42)
+    audits = {}
+    for audit_id, ((low, high), slow_from) in PSI_METRIC_AUDITS.items():
+        value = rnd.uniform(low, high)
+        audits[audit_id] = {
+            "id": audit_id,
+            "title": "Lorem ipsum " * 5,
+            "description": "Dolor sit amet " * 20,
+            "score": round(rnd.uniform(0.9, 1.0) if value <= slow_from else rnd.uniform(0.0, 0.89), 2),
+            "numericValue": value,
+            "numericUnit": "unitless" if audit_id == "cumulative-layout-shift" else "millisecond",
+        }
+    for i, audit_id in enumerate(PSI_OPPORTUNITY_AUDITS):
+        audits[audit_id] = {
+            "id": audit_id,
+            "title": "Lorem ipsum " * 5,
+            "description": "Dolor sit amet " * 20,
+            "score": round(rnd.random(), 2),
+            "numericValue": rnd.random() * 5000,
+            "details": {
+                "type": "opportunity",
+                "overallSavingsMs": rnd.random() * 1000,
+                "overallSavingsBytes": rnd.random() * 100000,
+                "items": [
+                    {"url": f"https://example.com/static/{i}/{j}.js", "totalBytes": j * 1000, "wastedMs": j}
+                    for j in range(85)
+                ],
+            },
+        }
+    payload = {
+        "lighthouseResult": {
+            "categories": {"performance": {"score": 0.61, "title": "Performance", "auditRefs": []}},
+            "audits": audits,
+            "fullPageScreenshot": {"screenshot": {"data": "x" * 200_000}},
+        },
+        "loadingExperience": {"metrics": {}},
+    }
+    return json.dumps(payload).encode("utf-8")
+
+
+def _synthetic_dataforseo() -> bytes:
+    pages = [
+        {
+            "url": f"https://example.com/producto/item-{i}",
+            "status_code": 200,
+            "meta": {
+                "title": f"Producto {i}",
+                "description": "Descripción " * 10,
+                "htags": {"h1": [f"Producto {i}"], "h2": ["Detalles", "Opiniones"]},
+                "scripts_count": 12,
+                "stylesheets_count": 4,
+                "render_blocking_scripts_count": 2,
+                "render_blocking_stylesheets_count": 1,
+                "social_media_tags": {"og:title": f"Producto {i}", "og:description": "x" * 100},
+            },
+            "content": {"word_count": 420, "plain_text_rate": 0.2, "automated_readability_index": 8.1},
+            "checks": {f"check_{k}": bool(k % 2) for k in range(60)},
+            "page_timing": {"time_to_interactive": 1200, "dom_complete": 1500},
+        }
+        for i in range(2000)
+    ]
+    return json.dumps({"tasks": [{"id": "task-1", "status_code": 20000, "result": pages}]}).encode("utf-8")
+
+
+def load_fixtures(kind: str, synthetic: Callable[[], bytes]) -> List[Tuple[str, bytes]]:
+    files = sorted((FIXTURES_DIR / kind).glob("*.json"))
+    if files:
+        return [(f.name, f.read_bytes()) for f in files]
+    return [("synthetic", synthetic())]
+
+
+# -------------------------------------------------------------------
+# CAMINOS A COMPARAR
+# -------------------------------------------------------------------
+
+def psi_baseline(raw: bytes):
+    data = json.loads(raw)
+    lighthouse = data.get("lighthouseResult", {})
+    score = lighthouse.get("categories", {}).get("performance", {}).get("score")
+    audits = {}
+    for audit_id, audit in lighthouse.get("audits", {}).items():
+        details = audit.get("details") or {}
+        audits[audit_id] = [
+            audit.get("score"), audit.get("numericValue"),
+            details.get("overallSavingsMs"), details.get("overallSavingsBytes"),
+        ]
+    return score, audits
+
+
+def psi_msgspec(raw: bytes):
+    return extract_performance_metrics(decode_psi(raw))
+
+
+def dataforseo_baseline(raw: bytes):
+    data = json.loads(raw)
+    out = []
+    for t in data.get("tasks", []):
+        for r in t.get("result", []) or []:
+            meta = r.get("meta", {}) or {}
+            out.append((r.get("url"), r.get("status_code"), meta.get("title"), meta.get("description")))
+    return out
+
+
+def dataforseo_msgspec(raw: bytes):
+    out = []
+    for t in decode_dataforseo(raw).tasks:
+        for r in t.result or []:
+            meta = r.meta
+            out.append((r.url, r.status_code, meta.title if meta else None, meta.description if meta else None))
+    return out
+
+
+# -------------------------------------------------------------------
+# MEDICIÓN
+# -------------------------------------------------------------------
+
+def measure(fn: Callable[[bytes], object], raw: bytes, repeat: int) -> Tuple[float, float]:
+    """
+    Devuelve (ms de CPU por payload, MB de memoria pico) para `fn(raw)`.
+    """
+    fn(raw)  # calentamiento
+
+    start = time.process_time()
+    for _ in range(repeat):
+        fn(raw)
+    cpu_ms = (time.process_time() - start) * 1000 / repeat
+
+    tracemalloc.start()
+    result = fn(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return cpu_ms, peak / (1024 * 1024)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    suites = [
+        ("psi", load_fixtures("psi", _synthetic_psi), psi_baseline, psi_msgspec),
+        ("dataforseo", load_fixtures("dataforseo", _synthetic_dataforseo), dataforseo_baseline, dataforseo_msgspec),
+    ]
+
+    print(f"{'payload':<32}{'KB':>8}{'path':>10}{'cpu ms':>10}{'peak MB':>10}")
+    for kind, fixtures, baseline, fast in suites:
+        for name, raw in fixtures:
+            label = f"{kind}/{name}"[:31]
+            for path, fn in (("dict", baseline), ("msgspec", fast)):
+                cpu_ms, peak_mb = measure(fn, raw, args.repeat)
+                print(f"{label:<32}{len(raw) / 1024:>8.0f}{path:>10}{cpu_ms:>10.2f}{peak_mb:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
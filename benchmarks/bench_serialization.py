@@ -0,0 +1,105 @@
+# benchmarks/bench_serialization.py
+"""
+Tiempo de serialización por cada 10k filas de los listados pesados:
+- orm:    objetos ORM -> schemas (orm_mode) -> jsonable_encoder -> json.dumps
+          (el camino por defecto de FastAPI con response_model)
+- tuples: tuplas SQL -> dicts (backend.serialization) -> orjson
+          (el camino actual de los endpoints de listados)
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_serialization [--rows 10000] [--repeat 5]
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Callable, List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from backend import models, schemas
+from backend.serialization import (
+    CRAWL_KEYS, ISSUE_TYPE_KEYS, issue_rows_to_dicts, rows_to_dicts,
+)
+
+
+def _issue_type_values() -> tuple:
+    return (
+        1, "TITLE_MISSING", "Title ausente", "critical", "content",
+        "La página no tiene etiqueta <title>.", "Añade un título único.", "Es clave para el CTR.", None,
+    )
+
+
+def issue_tuples(n: int) -> List[tuple]:
+    return [
+        (i, i * 3, "pending", False, '{"hint": "x"}', None, 1.0, 1)
+        for i in range(n)
+    ]
+
+
+def issue_orm_objects(n: int) -> List[models.Issue]:
+    issue_type = models.IssueType(**dict(zip(ISSUE_TYPE_KEYS, _issue_type_values())))
+    return [
+        models.Issue(
+            id=i, url_id=i * 3, status=status, implemented=implemented,
+            details=details, comment=comment, issue_type=issue_type,
+        )
+        for i, _, status, implemented, details, comment, _, _ in issue_tuples(n)
+    ]
+
+
+def crawl_tuples(n: int) -> List[tuple]:
+    now = datetime.utcnow()
+    return [(i, 1, now, now, "finished", 87.5) for i in range(n)]
+
+
+def crawl_orm_objects(n: int) -> List[models.Crawl]:
+    return [models.Crawl(**dict(zip(CRAWL_KEYS, row))) for row in crawl_tuples(n)]
+
+
+def from_orm(schema, obj):
+    # Compatible con pydantic v1 (orm_mode) y v2
+    if hasattr(schema, "model_validate"):
+        return schema.model_validate(obj, from_attributes=True)
+    return schema.from_orm(obj)
+
+
+def bench(fn: Callable[[], bytes], repeat: int) -> float:
+    fn()  # calentamiento
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    n = args.rows
+
+    issues_orm = issue_orm_objects(n)
+    issues_raw = issue_tuples(n)
+    issue_type = dict(zip(ISSUE_TYPE_KEYS, _issue_type_values()))
+    crawls_orm = crawl_orm_objects(n)
+    crawls_raw = crawl_tuples(n)
+
+    cases = [
+        ("issues", "orm", lambda: json.dumps(jsonable_encoder(
+            [from_orm(schemas.IssueOut, i) for i in issues_orm])).encode("utf-8")),
+        ("issues", "tuples", lambda: orjson.dumps(issue_rows_to_dicts(issues_raw, issue_type))),
+        ("crawls", "orm", lambda: json.dumps(jsonable_encoder(
+            [from_orm(schemas.CrawlOut, c) for c in crawls_orm])).encode("utf-8")),
+        ("crawls", "tuples", lambda: orjson.dumps(rows_to_dicts(CRAWL_KEYS, crawls_raw))),
+    ]
+
+    print(f"{'endpoint':<10}{'path':>8}{'ms / 10k rows':>16}")
+    for endpoint, path, fn in cases:
+        ms = bench(fn, args.repeat) * 10_000 / n
+        print(f"{endpoint:<10}{path:>8}{ms:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/bench_url_lint.py
+"""
+Coste por URL del lint de URLs (backend/url_rules.lint_url) frente a
+ejecutar las seis reglas URL_* / HTTP_ON_HTTPS_SITE como comprobaciones
+separadas, cada una con su urlsplit (el esquema anterior a la máscara de bits).
+
+Sólo mide el proceso actual (sin pool): el objetivo es el coste por URL de
+una pasada. Las URLs salen de benchmarks/sites.py con una parte "sucia"
+(mayúsculas, guiones bajos, parámetros, %xx, http://) para que todas las
+reglas disparen alguna vez. Comprueba que ambas variantes dan las mismas
+máscaras.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_url_lint [--urls 1000000] [--repeat 3]
+"""
+import argparse
+import re
+import time
+from typing import Callable, List
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+
+from backend.config import URL_MAX_LENGTH, URL_MAX_PARAMS
+from backend.url_rules import (
+    HTTP_ON_HTTPS_SITE, RULE_BITS, URL_SPECIAL_CHARS, URL_TOO_LONG, URL_TOO_MANY_PARAMS,
+    URL_UNDERSCORES, URL_UPPERCASE, lint_url,
+)
+from benchmarks.sites import SyntheticSite
+
+_SPECIAL_CHARS_RE = re.compile(r"[^A-Za-z0-9\-._~/]")
+_UPPERCASE_RE = re.compile(r"[A-Z]")
+
+
+def build_urls(n_urls: int) -> List[str]:
+    site = SyntheticSite(n_urls)
+    urls = []
+    for i in range(n_urls):
+        url = site.url(i)
+        if i % 17 == 0:
+            url = url.replace("item-", "Item_") + "?utm_source=a&utm_medium=b&ref=c&page=2"
+        elif i % 29 == 0:
+            url = url.replace("https://", "http://")
+        elif i % 31 == 0:
+            url += "/caf%C3%A9%20con%20leche"
+        elif i % 37 == 0:
+            url += "/" + "segmento-largo-" * 8
+        urls.append(url)
+    return urls
+
+
+# -------------------------------------------------------------------
+# REGLAS SEPARADAS (REFERENCIA)
+# -------------------------------------------------------------------
+
+def _too_long(url: str) -> bool:
+    return len(url) > URL_MAX_LENGTH
+
+
+def _too_many_params(url: str) -> bool:
+    query = urlsplit(url).query
+    return sum(1 for p in query.split("&") if p) > URL_MAX_PARAMS
+
+
+def _special_chars(url: str) -> bool:
+    return bool(_SPECIAL_CHARS_RE.search(unquote(urlsplit(url).path)))
+
+
+def _uppercase(url: str) -> bool:
+    return bool(_UPPERCASE_RE.search(unquote(urlsplit(url).path)))
+
+
+def _underscores(url: str) -> bool:
+    return "_" in unquote(urlsplit(url).path)
+
+
+def _http_on_https(url: str) -> bool:
+    return urlsplit(url).scheme == "http"
+
+
+_SEPARATE_RULES = (
+    (URL_TOO_LONG, _too_long),
+    (URL_TOO_MANY_PARAMS, _too_many_params),
+    (URL_SPECIAL_CHARS, _special_chars),
+    (URL_UPPERCASE, _uppercase),
+    (URL_UNDERSCORES, _underscores),
+    (HTTP_ON_HTTPS_SITE, _http_on_https),
+)
+
+
+def separate_masks(urls: List[str]) -> np.ndarray:
+    masks = np.zeros(len(urls), dtype=np.uint8)
+    for bit, rule in _SEPARATE_RULES:  # una pasada (y un parseo) por regla
+        masks |= np.fromiter((bit if rule(url) else 0 for url in urls), dtype=np.uint8, count=len(urls))
+    return masks
+
+
+def single_pass_masks(urls: List[str]) -> np.ndarray:
+    return np.fromiter((lint_url(url, True) for url in urls), dtype=np.uint8, count=len(urls))
+
+
+def best_of(repeat: int, fn: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    urls = build_urls(args.urls)
+    expected = separate_masks(urls)
+    masks = single_pass_masks(urls)
+    assert np.array_equal(expected, masks), "el lint en una pasada no coincide con las reglas separadas"
+
+    counts = ", ".join(f"{code}={int(np.count_nonzero(masks & bit))}" for code, bit in RULE_BITS if code != "CHARSET_ISSUES")
+    print(f"{len(urls)} URLs, {int(np.count_nonzero(masks))} con algún disparo ({counts})")
+    print(f"{'variante':>14}{'seconds':>10}{'ns/URL':>10}{'speedup':>9}")
+    baseline = best_of(args.repeat, lambda: separate_masks(urls))
+    print(f"{'separadas':>14}{baseline:>10.3f}{baseline / len(urls) * 1e9:>10.0f}{1.0:>9.2f}")
+    elapsed = best_of(args.repeat, lambda: single_pass_masks(urls))
+    print(f"{'una pasada':>14}{elapsed:>10.3f}{elapsed / len(urls) * 1e9:>10.0f}{baseline / elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
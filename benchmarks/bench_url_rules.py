@@ -0,0 +1,71 @@
+# benchmarks/bench_url_rules.py
+"""
+Escalado de las reglas de texto de URL (backend/url_rules.py) con el nº de
+procesos: filas/s en el propio proceso y con 1..N workers sobre las URLs,
+títulos y meta descriptions de un sitio sintético (benchmarks/sites.py),
+con algo de mojibake y URLs "sucias" añadidos.
+
+El arranque del pool se hace antes de medir (es una vez por proceso del
+backend, no por crawl). Con escalado ideal, speedup ~= workers.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_url_rules [--urls 200000] [--workers 1,2,4,8] [--repeat 3]
+"""
+import argparse
+import os
+import time
+from typing import List, Optional, Tuple
+
+from backend.url_rules import evaluate_rows, evaluate_url_text_rules, is_https_site
+from benchmarks.sites import SyntheticSite
+
+
+def build_rows(n_urls: int) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    site = SyntheticSite(n_urls)
+    rows = []
+    for i, page in enumerate(site.pages()):
+        url = page["url"]
+        if i % 17 == 0:
+            url = url.replace("item-", "Item_") + "?utm_source=a&utm_medium=b&ref=c&page=2"
+        title = page["meta"]["title"]
+        if title and i % 23 == 0:
+            title = title.replace("a", "Ã¡")
+        rows.append((url, title, page["meta"]["description"]))
+    return rows
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=200_000)
+    parser.add_argument("--workers", default=",".join(str(w) for w in (1, 2, 4, 8) if w <= (os.cpu_count() or 1)) or "1")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = build_rows(args.urls)
+    https_site = is_https_site(url for url, _, _ in rows)
+    baseline = best_of(args.repeat, lambda: evaluate_rows(rows, https_site))
+    expected = evaluate_rows(rows, https_site)
+    print(f"{len(rows)} URLs, {len(expected)} disparos, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'seconds':>10}{'rows/s':>12}{'speedup':>9}")
+    print(f"{'inline':>8}{baseline:>10.3f}{len(rows) / baseline:>12.0f}{1.0:>9.2f}")
+
+    for workers in (int(w) for w in args.workers.split(",") if w.strip()):
+        if workers < 2:
+            continue
+        # Calienta el pool (spawn + imports) fuera de la medición
+        assert evaluate_url_text_rules(rows, workers=workers, min_parallel_rows=0) == expected
+        elapsed = best_of(args.repeat, lambda: evaluate_url_text_rules(rows, workers=workers, min_parallel_rows=0))
+        print(f"{workers:>8}{elapsed:>10.3f}{len(rows) / elapsed:>12.0f}{baseline / elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
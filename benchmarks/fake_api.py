@@ -0,0 +1,205 @@
+# benchmarks/fake_api.py
+"""
+Servidor local que sustituye a DataForSEO y PageSpeed Insights en los benchmarks.
+
+Sirve un SyntheticSite (benchmarks/sites.py) por los mismos endpoints que usa el
+backend, así que run_crawl funciona sin llamar a APIs de pago:
+- POST /v3/on_page/task_post   -> id de tarea
+- GET  /v3/on_page/tasks_ready -> todas las páginas del sitio (tarea lista al instante)
+- POST /v3/on_page/links       -> enlaces paginados (limit / offset)
+- GET  /pagespeedonline/v5/runPagespeed -> respuesta PSI grabada
+
+Las respuestas PSI se reproducen desde benchmarks/fixtures/psi/*.json (o el
+payload sintético de bench_payload_decoding). La latencia, la tasa de errores
+500 y la de 429 son configurables. Los fallos sólo se inyectan en PSI, porque
+el backend tolera un PSI fallido pero aborta el crawl si falla DataForSEO.
+
+Uso independiente (desde la raíz del repo):
+    python -m benchmarks.fake_api --urls 10000 --port 8900 --latency-ms 50 --error-rate 0.02
+e imprime las variables de entorno para apuntar el backend al servidor.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.bench_payload_decoding import _synthetic_psi, load_fixtures
+from benchmarks.sites import SyntheticSite
+
+TASK_ID = "bench-task"
+
+
+class FaultConfig:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, seed: int = 42):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def roll(self) -> float:
+        with self._lock:
+            return self._rnd.random()
+
+    def delay(self) -> None:
+        if self.latency_ms or self.jitter_ms:
+            time.sleep(max(0.0, self.latency_ms + self.jitter_ms * (self.roll() * 2 - 1)) / 1000)
+
+
+class FakeApiServer:
+    """
+    Servidor en un hilo de fondo. `base_url` queda disponible tras start().
+    """
+
+    def __init__(self, site: SyntheticSite, faults: Optional[FaultConfig] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.site = site
+        self.faults = faults or FaultConfig()
+        self.stats: Dict[str, int] = {"requests": 0, "psi_errors": 0, "psi_429": 0}
+        self._psi_payloads = [raw for _, raw in load_fixtures("psi", _synthetic_psi)]
+        self._pages_payload: Optional[bytes] = None
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        """
+        Variables de entorno que apuntan el backend a este servidor.
+        """
+        return {
+            "DATAFORSEO_LOGIN": "bench",
+            "DATAFORSEO_PASSWORD": "bench",
+            "DATAFORSEO_ENDPOINT": f"{self.base_url}/v3/on_page/task_post",
+            "DATAFORSEO_TASK_GET_ENDPOINT": f"{self.base_url}/v3/on_page/tasks_ready",
+            "DATAFORSEO_LINKS_ENDPOINT": f"{self.base_url}/v3/on_page/links",
+            "PAGESPEED_API_KEY": "bench",
+            "PAGESPEED_ENDPOINT": f"{self.base_url}/pagespeedonline/v5/runPagespeed",
+        }
+
+    def pages_payload(self) -> bytes:
+        # Se serializa una vez: en sitios grandes es la respuesta más pesada.
+        if self._pages_payload is None:
+            result = list(self.site.pages())
+            self._pages_payload = json.dumps(
+                {"tasks": [{"id": TASK_ID, "status_code": 20000, "result": result}]}
+            ).encode("utf-8")
+        return self._pages_payload
+
+    def start(self) -> "FakeApiServer":
+        self.pages_payload()
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeApiServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):  # silencioso
+                pass
+
+            def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json_body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"null")
+
+            def do_POST(self):
+                server.stats["requests"] += 1
+                path = urlsplit(self.path).path
+                if path.endswith("/on_page/task_post"):
+                    self._send(200, json.dumps({"tasks": [{"id": TASK_ID, "status_code": 20100}]}).encode())
+                elif path.endswith("/on_page/links"):
+                    task = (self._json_body() or [{}])[0]
+                    offset, limit = int(task.get("offset", 0)), int(task.get("limit", 1000))
+                    items = server.site.links(offset, limit)
+                    body = {"tasks": [{"id": TASK_ID, "result": [{
+                        "total_items_count": server.site.total_links,
+                        "items_count": len(items),
+                        "items": items,
+                    }]}]}
+                    self._send(200, json.dumps(body).encode("utf-8"))
+                else:
+                    self._send(404, b"{}")
+
+            def do_GET(self):
+                server.stats["requests"] += 1
+                parts = urlsplit(self.path)
+                if parts.path.endswith("/on_page/tasks_ready"):
+                    self._send(200, server.pages_payload())
+                elif parts.path.endswith("/runPagespeed"):
+                    self._pagespeed(parse_qs(parts.query).get("url", [""])[0])
+                else:
+                    self._send(404, b"{}")
+
+            def _pagespeed(self, url: str) -> None:
+                faults = server.faults
+                faults.delay()
+                roll = faults.roll()
+                if roll < faults.rate_limit_rate:
+                    server.stats["psi_429"] += 1
+                    self._send(429, b'{"error": {"code": 429}}', {"Retry-After": "1"})
+                    return
+                if roll < faults.rate_limit_rate + faults.error_rate:
+                    server.stats["psi_errors"] += 1
+                    self._send(500, b'{"error": {"code": 500}}')
+                    return
+                payloads = server._psi_payloads
+                self._send(200, payloads[zlib.crc32(url.encode("utf-8")) % len(payloads)])
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=10_000)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    faults = FaultConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate)
+    server = FakeApiServer(SyntheticSite(args.urls), faults, port=args.port).start()
+    for name, value in server.env().items():
+        print(f"export {name}={value}")
+    print(f"# sirviendo {args.urls} URLs en {server.base_url} (Ctrl+C para parar)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
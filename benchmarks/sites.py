@@ -0,0 +1,140 @@
+# benchmarks/sites.py
+"""
+Sitios sintéticos deterministas para los benchmarks (de 1k a 1M URLs).
+
+Cada sitio tiene una home, unas cuantas secciones con su plantilla (firma
+DataForSEO distinta por sección) y una mezcla realista de problemas:
+~2% 404, ~3% redirecciones 301 (algunas encadenadas), ~2% canonicals hacia otra
+URL, títulos ausentes o largos y páginas con poco contenido.
+
+Los enlaces no se materializan: links(offset, limit) los calcula a partir del
+índice global del enlace, así que el servidor falso puede paginar 10M de
+enlaces sin tenerlos en memoria.
+"""
+from typing import Dict, Iterator, List, Optional
+
+SECTIONS = ("producto", "categoria", "blog", "ayuda", "marca")
+LINKS_PER_PAGE = 12
+
+# Firma de plantilla por sección: scripts, css, bloqueantes js/css, htags
+_TEMPLATES = {
+    "producto": (24, 6, 3, 1, ("h1", "h2", "h3")),
+    "categoria": (18, 5, 2, 1, ("h1", "h2")),
+    "blog": (12, 3, 1, 0, ("h1", "h2", "h3", "h4")),
+    "ayuda": (8, 2, 0, 0, ("h1", "h2")),
+    "marca": (15, 4, 2, 1, ("h1",)),
+}
+
+
+def _mix(i: int, salt: int) -> int:
+    """
+    Pseudo-aleatorio barato y determinista (hash entero de Knuth).
+    """
+    return ((i + 1) * 2654435761 + salt * 40503) % 4294967296
+
+
+class SyntheticSite:
+    def __init__(self, n_urls: int, domain: str = "bench.example", seed: int = 42):
+        if n_urls < len(SECTIONS) + 1:
+            raise ValueError(f"n_urls debe ser >= {len(SECTIONS) + 1}")
+        self.n_urls = n_urls
+        self.domain = domain
+        self.seed = seed
+        self.base = f"https://{domain}"
+
+    # --- URLs ---
+
+    def section(self, i: int) -> str:
+        return SECTIONS[(i - 1) % len(SECTIONS)]
+
+    def url(self, i: int) -> str:
+        if i == 0:
+            return f"{self.base}/"
+        section = self.section(i)
+        if i <= len(SECTIONS):
+            return f"{self.base}/{section}/"
+        return f"{self.base}/{section}/item-{i}"
+
+    def status(self, i: int) -> int:
+        if i <= len(SECTIONS):
+            return 200
+        r = _mix(i, self.seed) % 1000
+        if r < 20:
+            return 404
+        if r < 50:
+            return 301
+        return 200
+
+    # --- Páginas (forma de DataForSEO on_page) ---
+
+    def page(self, i: int) -> Dict:
+        status = self.status(i)
+        section = "home" if i == 0 else self.section(i)
+        scripts, css, block_js, block_css, htags = _TEMPLATES.get(section, (10, 3, 1, 0, ("h1",)))
+        r = _mix(i, self.seed + 1) % 1000
+
+        title: Optional[str] = f"{section.title()} {i} | Bench"
+        if r < 15:
+            title = None
+        elif r < 40:
+            title = title + " - " + "texto muy largo " * 6
+
+        page = {
+            "url": self.url(i),
+            "status_code": status,
+            "meta": {
+                "title": title,
+                "description": None if r % 7 == 0 else f"Descripción de la página {i}",
+                "canonical": None,
+                "htags": {h: [f"{h} {i}"] for h in htags},
+                "scripts_count": scripts,
+                "stylesheets_count": css,
+                "render_blocking_scripts_count": block_js,
+                "render_blocking_stylesheets_count": block_css,
+            },
+            "content": {"word_count": 80 if r % 11 == 0 else 300 + r},
+        }
+        if status == 301:
+            # La mitad de las redirecciones salta a otra redirección (cadena)
+            target = (i + 1) if r % 2 == 0 else len(SECTIONS) + 1 + (_mix(i, 7) % (self.n_urls - len(SECTIONS) - 1))
+            page["location"] = self.url(min(target, self.n_urls - 1))
+        elif status == 200 and 50 <= r < 70:
+            page["meta"]["canonical"] = self.url(max(len(SECTIONS) + 1, i - 1))
+        return page
+
+    def pages(self) -> Iterator[Dict]:
+        for i in range(self.n_urls):
+            yield self.page(i)
+
+    # --- Enlaces (forma de DataForSEO on_page/links) ---
+
+    @property
+    def total_links(self) -> int:
+        return self.n_urls * LINKS_PER_PAGE
+
+    def link(self, index: int) -> Dict:
+        src, k = divmod(index, LINKS_PER_PAGE)
+        external = k == LINKS_PER_PAGE - 1
+        if external:
+            return {
+                "type": "anchor",
+                "link_from": self.url(src),
+                "link_to": f"https://externo-{src % 50}.example/",
+                "direction": "external",
+                "is_broken": _mix(src, 3) % 100 == 0,
+            }
+        if k <= len(SECTIONS):
+            dst = k  # navegación: home + hubs de sección
+        else:
+            dst = _mix(src * LINKS_PER_PAGE + k, self.seed) % self.n_urls
+        return {
+            "type": "anchor",
+            "link_from": self.url(src),
+            "link_to": self.url(dst),
+            "direction": "internal",
+            "is_broken": self.status(dst) >= 400,
+        }
+
+    def links(self, offset: int, limit: int) -> List[Dict]:
+        end = min(offset + limit, self.total_links)
+        return [self.link(i) for i in range(offset, end)]
@@ -1,7 +1,8 @@
 "use client";
 
 import { useState } from "react";
-import type { Issue, IssueDetailsPayload } from "@/lib/types";
+import type { Issue } from "@/lib/types";
+import { parseIssueDetails } from "@/lib/issues";
 import Toggle from "@/components/ui/Toggle";
 import { updateIssue } from "@/lib/api";
 
@@ -9,18 +10,14 @@ interface Props {
   issues: Issue[];
 }
 
+// ms sin decimales; métricas pequeñas (CLS) con tres
+const formatMetric = (value: number) =>
+  Math.abs(value) >= 10 ? value.toFixed(0) : value.toFixed(3);
+
 export default function IssueTable({ issues: initialIssues }: Props) {
   const [rows, setRows] = useState<Issue[]>(initialIssues);
   const [savingId, setSavingId] = useState<number | null>(null);
 
-  const parseDetails = (issue: Issue): IssueDetailsPayload => {
-    try {
-      return JSON.parse(issue.details || "{}");
-    } catch {
-      return {} as IssueDetailsPayload;
-    }
-  };
-
   const handleToggleImplemented = async (issue: Issue, value: boolean) => {
     setSavingId(issue.id);
     try {
@@ -52,7 +49,7 @@ export default function IssueTable({ issues: initialIssues }: Props) {
         </thead>
         <tbody className="divide-y divide-slate-800">
           {rows.map((issue) => {
-            const d = parseDetails(issue);
+            const d = parseIssueDetails(issue);
             const status =
               typeof (d as any).status_code === "number"
                 ? (d as any).status_code
@@ -67,6 +64,15 @@ export default function IssueTable({ issues: initialIssues }: Props) {
               perf.push(
                 `Score mobile: ${(d as any).performance_score_mobile.toFixed(0)}`
               );
+            // PERF_LCP_SLOW / PERF_TBT_HIGH / PERF_CLS_HIGH se evalúan en SQL y
+            // guardan {value, threshold, estimated}; el resto de reglas PERF_* (y
+            // esas tres en crawls anteriores) guardan {audits: {id: {...}}, ...}.
+            for (const [auditId, audit] of Object.entries(d.audits || {})) {
+              if (typeof audit?.value === "number")
+                perf.push(`${auditId}: ${formatMetric(audit.value)}`);
+            }
+            if (typeof d.value === "number")
+              perf.push(`Valor: ${formatMetric(d.value)}`);
 
             const hint =
               d.hint || "Aplica el ajuste recomendado para este tipo de issue.";
@@ -79,7 +85,9 @@ export default function IssueTable({ issues: initialIssues }: Props) {
                   "issue_name",
                   "severity",
                   "category",
-                  "hint"
+                  "hint",
+                  "audits",
+                  "value"
                 ].includes(k)
             );
 
@@ -1,5 +1,6 @@
 import { getProject, getCrawls, getIssuesForType } from "@/lib/api";
 import type { Issue, IssueDetailsPayload } from "@/lib/types";
+import { parseIssueDetails } from "@/lib/issues";
 import Card from "@/components/ui/Card";
 import SeverityPill from "@/components/ui/SeverityPill";
 import CategoryPill from "@/components/ui/CategoryPill";
@@ -31,7 +32,7 @@ export default async function IssueTypePage({
   }
 
   const latestCrawl = crawls[0];
-  const issues: Issue[] = await getIssuesForType(latestCrawl.id, issueCode);
+  const issues: Issue[] = await getIssuesForType(latestCrawl.id, issueCode, "pagerank");
 
   if (!issues.length) {
     return (
@@ -48,7 +49,7 @@ export default async function IssueTypePage({
     );
   }
 
-  const firstDetails: IssueDetailsPayload = JSON.parse(issues[0].details || "{}");
+  const firstDetails: IssueDetailsPayload = parseIssueDetails(issues[0]);
 
   return (
     <AuthGuard>
@@ -3,7 +3,11 @@ const API_BASE = process.env.NEXT_PUBLIC_API_BASE_URL || "http://localhost:8000"
 import {
   Project,
   Crawl,
+  CrawlConfig,
+  CrawlEstimate,
+  CrawlEvent,
   CrawlSummary,
+  TrendPoint,
   IssueTypeGroup,
   Issue
 } from "./types";
@@ -33,15 +37,70 @@ export async function getProject(projectId: string | number): Promise<Project> {
   return api<Project>(`/projects/${projectId}`);
 }
 
+// Configuración de crawl
+export async function getCrawlConfig(projectId: string | number): Promise<CrawlConfig> {
+  return api<CrawlConfig>(`/projects/${projectId}/crawl-config`);
+}
+
+export async function updateCrawlConfig(
+  projectId: string | number,
+  payload: Partial<CrawlConfig>
+): Promise<CrawlConfig> {
+  return api<CrawlConfig>(`/projects/${projectId}/crawl-config`, {
+    method: "PATCH",
+    body: JSON.stringify(payload)
+  });
+}
+
+export async function getCrawlEstimate(projectId: string | number): Promise<CrawlEstimate> {
+  return api<CrawlEstimate>(`/projects/${projectId}/crawl-estimate`);
+}
+
 // Crawls
 export async function getCrawls(projectId: string | number): Promise<Crawl[]> {
   return api<Crawl[]>(`/projects/${projectId}/crawls`);
 }
 
+// Reutiliza la misma idempotencyKey al reintentar: el backend devuelve el crawl
+// ya creado en lugar de lanzar otro (y un doble clic se une al crawl en curso).
+export async function runCrawl(
+  projectId: string | number,
+  idempotencyKey: string = crypto.randomUUID()
+): Promise<Crawl> {
+  return api<Crawl>(`/projects/${projectId}/crawl`, {
+    method: "POST",
+    headers: { "Idempotency-Key": idempotencyKey }
+  });
+}
+
+// Progreso en vivo por Server-Sent Events; devuelve la función para cerrar el stream.
+// EventSource reconecta solo y manda Last-Event-ID, así que no se pierden eventos.
+export function subscribeCrawlEvents(
+  crawlId: number,
+  onEvent: (event: CrawlEvent) => void
+): () => void {
+  const source = new EventSource(`${API_BASE}/crawls/${crawlId}/events`);
+  for (const type of ["stage", "psi", "issues", "status", "estimate", "end"] as const) {
+    source.addEventListener(type, (msg) => {
+      onEvent({ type, ...JSON.parse((msg as MessageEvent).data) } as CrawlEvent);
+      if (type === "end") source.close();
+    });
+  }
+  return () => source.close();
+}
+
 export async function getLatestCrawlSummary(projectId: string | number): Promise<CrawlSummary> {
   return api<CrawlSummary>(`/projects/${projectId}/crawls/latest/summary`);
 }
 
+export async function getProjectTrends(
+  projectId: string | number,
+  limit?: number
+): Promise<TrendPoint[]> {
+  const query = limit ? `?limit=${limit}` : "";
+  return api<TrendPoint[]>(`/projects/${projectId}/trends${query}`);
+}
+
 // Issues
 export async function getIssuesByType(crawlId: number): Promise<IssueTypeGroup[]> {
   return api<IssueTypeGroup[]>(`/crawls/${crawlId}/issues/by-type`);
@@ -49,9 +108,10 @@ export async function getIssuesByType(crawlId: number): Promise<IssueTypeGroup[]
 
 export async function getIssuesForType(
   crawlId: number,
-  issueCode: string
+  issueCode: string,
+  sort: "id" | "pagerank" = "id"
 ): Promise<Issue[]> {
-  return api<Issue[]>(`/crawls/${crawlId}/issues/${issueCode}`);
+  return api<Issue[]>(`/crawls/${crawlId}/issues/${issueCode}?sort=${sort}`);
 }
 
 export async function updateIssue(
@@ -0,0 +1,23 @@
+import type { Issue, IssueDetailsPayload } from "./types";
+
+// El backend guarda en details sólo los datos de la regla (o null); la URL y
+// el tipo llegan como campos del issue. Se combinan en un IssueDetailsPayload,
+// con prioridad para lo que venga en details.
+export function parseIssueDetails(issue: Issue): IssueDetailsPayload {
+  let details: Record<string, any> = {};
+  try {
+    details = JSON.parse(issue.details || "{}") || {};
+  } catch {
+    details = {};
+  }
+  const type = issue.issue_type;
+  return {
+    url: issue.url ?? "",
+    issue_code: type?.code ?? "",
+    issue_name: type?.name ?? "",
+    severity: type?.severity ?? "minor",
+    category: type?.category ?? "",
+    hint: type?.fix_template_for_impl,
+    ...details
+  } as IssueDetailsPayload;
+}
@@ -14,8 +14,43 @@ export interface Crawl {
   site_health: number | null;
   started_at: string;
   finished_at: string | null;
+  estimated_cost_usd?: number | null;
+  estimated_duration_s?: number | null;
+  // Crawl compactado por la retención: sin URLs ni issues, sólo tendencias
+  compacted_at?: string | null;
 }
 
+export interface CrawlConfig {
+  max_pages: number;
+  enable_javascript: boolean;
+  load_resources: boolean;
+  psi_samples_per_template: number | null;
+  psi_strategies: ("mobile" | "desktop")[];
+  include_patterns: string[];
+  exclude_patterns: string[];
+  // Umbrales de las reglas SQL del catálogo: código -> umbral -> valor
+  rule_thresholds: Record<string, Record<string, number>>;
+  retention_full_crawls: number;
+  retention_full_days: number;
+}
+
+export interface CrawlEstimate {
+  pages: number;
+  psi_calls: number;
+  cost_usd: number;
+  duration_s: number;
+  basis: string;
+}
+
+// Eventos de GET /crawls/{id}/events (backend/events.py)
+export type CrawlEvent =
+  | { type: "stage"; stage: string; state: "started" | "finished" | "failed"; duration_ms?: number }
+  | { type: "psi"; clusters: number; clusters_total: number; measured: number; estimated: number; failed: number }
+  | { type: "issues"; rule_set: string; issues: number; by_severity: Partial<Record<Severity, number>> }
+  | { type: "status"; crawl_id: number; status: Crawl["status"]; site_health: number | null; started_at: string; finished_at: string | null }
+  | ({ type: "estimate" } & CrawlEstimate)
+  | { type: "end"; crawl_id: number };
+
 export interface CrawlSummary {
   crawl: Crawl;
   total_urls: number;
@@ -25,6 +60,23 @@ export interface CrawlSummary {
   site_health: number;
 }
 
+export interface PsiPercentiles {
+  p50: number | null;
+  p75: number | null;
+  p95: number | null;
+}
+
+export interface TrendPoint {
+  crawl_id: number;
+  finished_at: string;
+  site_health: number | null;
+  total_urls: number;
+  total_issues: number;
+  issues_by_severity: Record<string, number>;
+  issues_by_type: Record<string, number>;
+  psi: Record<"lcp" | "cls" | "tbt", PsiPercentiles>;
+}
+
 export interface IssueTypeGroup {
   code: string;
   name: string;
@@ -49,6 +101,16 @@ export interface Url {
   tbt: number | null;
 }
 
+// Auditoría de Lighthouse en los details de las reglas PERF_* evaluadas en Python
+export interface PerfAuditDetails {
+  score: number | null;
+  value: number | null;
+  savings_ms: number | null;
+  savings_bytes: number | null;
+}
+
+// details del issue junto con la URL y el tipo (ver lib/issues.ts: el backend
+// sólo guarda en details los datos propios de la regla)
 export interface IssueDetailsPayload {
   url: string;
   issue_code: string;
@@ -56,13 +118,32 @@ export interface IssueDetailsPayload {
   severity: Severity;
   category: string;
   hint?: string;
+  // PERF_*: reglas SQL (LCP / TBT / CLS) -> value; reglas Lighthouse -> audits
+  value?: number | null;
+  audits?: Record<string, PerfAuditDetails>;
+  threshold?: number;
+  estimated?: boolean;
   [key: string]: any;
 }
 
+export interface IssueType {
+  id: number;
+  code: string;
+  name: string;
+  severity: Severity;
+  category: string;
+  description: string;
+  fix_template_for_impl: string;
+  why_it_matters: string;
+  technical_notes: string | null;
+}
+
 export interface Issue {
   id: number;
   crawl_id: number;
   url_id: number;
+  url?: string | null;
+  issue_type?: IssueType;
   issue_type_id: number;
   implemented: boolean;
   status: "pending" | "in_progress" | "done";
@@ -70,4 +151,5 @@ export interface Issue {
   created_at: string;
   updated_at: string;
   details: string;
+  pagerank?: number | null;
 }
@@ -0,0 +1,222 @@
+# tests/test_site_files.py
+"""
+robots.txt y sitemaps (backend/robots.py, backend/sitemap.py) contra un
+servidor HTTP local (http.server) con ficheros de prueba.
+
+Uso (desde la raíz del repo):
+    python -m pytest -q tests
+"""
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.robots import RobotsMatcher, fetch_robots
+from backend.sitemap import SitemapStats, analyze_site_files, iter_sitemap
+
+SM_NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+IMAGE_NS = 'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1"'
+VIDEO_NS = 'xmlns:video="http://www.google.com/schemas/sitemap-video/1.1"'
+
+
+def _urlset(locs, extra=""):
+    body = "".join(f"<url><loc>{loc}</loc>{extra}</url>" for loc in locs)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {SM_NS} {IMAGE_NS} {VIDEO_NS}>{body}</urlset>'.encode()
+
+
+def _files(base):
+    """
+    ruta -> (cuerpo, cabeceras extra)
+    """
+    index = "".join(
+        f"<sitemap><loc>{base}{path}</loc></sitemap>"
+        for path in ("/pages.xml", "/posts.xml.gz", "/encoded.xml.gz", "/missing.xml")
+    )
+    images = (
+        "<image:image><image:loc>https://cdn.example.com/a.jpg</image:loc></image:image>"
+        "<video:video><video:content_loc>https://cdn.example.com/v.mp4</video:content_loc>"
+        "<video:loc>https://cdn.example.com/v2.mp4</video:loc></video:video>"
+    )
+    return {
+        "/robots.txt": (f"User-agent: *\nDisallow: /private\nSitemap: {base}/sitemap_index.xml\n".encode(), {}),
+        "/sitemap_index.xml": (
+            f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex {SM_NS}>{index}</sitemapindex>'.encode(), {},
+        ),
+        "/pages.xml": (_urlset([f"{base}/a", f"{base}/b"], extra=images), {}),
+        # .xml.gz servido tal cual (gzip en el cuerpo)
+        "/posts.xml.gz": (gzip.compress(_urlset([f"{base}/post-1", f"{base}/post-2"])), {}),
+        # .xml.gz servido con Content-Encoding: gzip (requests lo descomprime)
+        "/encoded.xml.gz": (
+            gzip.compress(_urlset([f"{base}/encoded-1"])), {"Content-Encoding": "gzip"},
+        ),
+    }
+
+
+@pytest.fixture(scope="module")
+def site():
+    files = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in files:
+                self.send_error(404)
+                return
+            body, headers = files[self.path]
+            self.send_response(200)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    files.update(_files(base))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield base
+    server.shutdown()
+    server.server_close()
+
+
+# -------------------------------------------------------------------
+# SITEMAPS
+# -------------------------------------------------------------------
+
+def test_sitemap_index_with_children(site):
+    report = analyze_site_files(site)
+
+    assert report.robots_status == 200
+    assert report.urls == {
+        f"{site}/a", f"{site}/b", f"{site}/post-1", f"{site}/post-2", f"{site}/encoded-1",
+    }
+    assert report.sitemap_found
+    by_url = {s.url.replace(site, ""): s for s in report.sitemaps}
+    assert set(by_url) == {"/sitemap_index.xml", "/pages.xml", "/posts.xml.gz", "/encoded.xml.gz", "/missing.xml"}
+    assert by_url["/sitemap_index.xml"].kind == "sitemapindex"
+    assert by_url["/sitemap_index.xml"].url_count == 4
+
+
+def test_gzip_children(site):
+    for path, count in (("/posts.xml.gz", 2), ("/encoded.xml.gz", 1)):
+        stats = SitemapStats(url=site + path)
+        locs = list(iter_sitemap(stats.url, stats))
+        assert stats.error is None, path
+        assert stats.kind == "urlset"
+        assert stats.url_count == count == len(locs)
+        assert stats.uncompressed_bytes > 0
+
+
+def test_missing_child(site):
+    stats = SitemapStats(url=f"{site}/missing.xml")
+    assert list(iter_sitemap(stats.url, stats)) == []
+    assert stats.status_code == 404
+    assert stats.error == "HTTP 404"
+    assert stats.url_count == 0
+
+
+def test_image_and_video_locs_are_not_pages(site):
+    stats = SitemapStats(url=f"{site}/pages.xml")
+    locs = [loc for _, loc in iter_sitemap(stats.url, stats)]
+    assert locs == [f"{site}/a", f"{site}/b"]
+    assert stats.url_count == 2
+
+
+# -------------------------------------------------------------------
+# ROBOTS.TXT
+# -------------------------------------------------------------------
+
+def test_fetch_robots(site):
+    status, text = fetch_robots(site)
+    assert status == 200
+    matcher = RobotsMatcher(text)
+    assert matcher.sitemaps == [f"{site}/sitemap_index.xml"]
+    assert not matcher.is_allowed(f"{site}/private/x")
+    assert matcher.is_allowed(f"{site}/public")
+
+
+def test_longest_rule_wins_and_allow_breaks_ties():
+    matcher = RobotsMatcher(
+        "User-agent: *\n"
+        "Disallow: /shop\n"
+        "Allow: /shop/public\n"
+        "Disallow: /page\n"
+        "Allow: /page\n"
+    )
+    assert not matcher.is_allowed("https://a.com/shop/cart")
+    assert matcher.is_allowed("https://a.com/shop/public/item")
+    assert matcher.is_allowed("https://a.com/page")  # misma longitud: gana Allow
+
+
+def test_wildcard_and_end_anchor():
+    matcher = RobotsMatcher(
+        "User-agent: *\n"
+        "Disallow: /*.pdf$\n"
+        "Disallow: /*?sessionid=\n"
+    )
+    assert not matcher.is_allowed("https://a.com/docs/file.pdf")
+    assert matcher.is_allowed("https://a.com/docs/file.pdf?download=1")
+    assert not matcher.is_allowed("https://a.com/list?sessionid=42")
+    assert matcher.is_allowed("https://a.com/list?page=2")
+
+
+def test_specific_agent_beats_star():
+    matcher = RobotsMatcher(
+        "User-agent: *\n"
+        "Disallow: /\n"
+        "\n"
+        "User-agent: Googlebot\n"
+        "Disallow: /private\n"
+    )
+    assert matcher.is_allowed("https://a.com/blog")
+    assert not matcher.is_allowed("https://a.com/private")
+    # Sin grupo propio, Googlebot usa el de "*"
+    assert not RobotsMatcher("User-agent: *\nDisallow: /\n").is_allowed("https://a.com/blog")
+
+
+def test_empty_agent_does_not_match():
+    matcher = RobotsMatcher(
+        "User-agent:\n"
+        "Disallow: /\n"
+        "\n"
+        "User-agent: *\n"
+        "Disallow: /private\n"
+    )
+    assert matcher.is_allowed("https://a.com/blog")
+    assert not matcher.is_allowed("https://a.com/private")
+
+
+def test_groups_with_same_agent_are_merged():
+    matcher = RobotsMatcher(
+        "User-agent: googlebot\n"
+        "Disallow: /a\n"
+        "\n"
+        "User-agent: *\n"
+        "Disallow: /\n"
+        "\n"
+        "User-agent: Googlebot\n"
+        "Disallow: /b\n"
+    )
+    assert not matcher.is_allowed("https://a.com/a")
+    assert not matcher.is_allowed("https://a.com/b")
+    assert matcher.is_allowed("https://a.com/c")
+
+
+def test_agent_matches_product_token_only():
+    matcher = RobotsMatcher(
+        "User-agent: bot\n"
+        "User-agent: google\n"
+        "Disallow: /\n"
+        "\n"
+        "User-agent: *\n"
+        "Disallow: /private\n"
+    )
+    assert matcher.is_allowed("https://a.com/blog")
+    assert not matcher.is_allowed("https://a.com/private")
+    # El token se compara sin mayúsculas y sin la versión del user-agent
+    matcher = RobotsMatcher("User-agent: GOOGLEBOT/2.1\nDisallow: /\n", "Googlebot/2.1 (+http://www.google.com/bot.html)")
+    assert not matcher.is_allowed("https://a.com/blog")